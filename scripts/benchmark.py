@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк этапов генерации commit message на синтетических репозиториях.
+
+Создает временные git репозитории с изменениями заданного размера и
+измеряет время каждого этапа отдельно: git status (он же проверка
+репозитория), пути репозитория (rev-parse без кэша), сбор данных git,
+определение типа, извлечение ключевых изменений, генерация сообщения и
+полный CommitTextGenerator.generate. Результат - JSON, который можно
+сравнить с результатом другой версии (--compare) для поиска регрессий.
+
+Примеры:
+    python scripts/benchmark.py --preset quick --output bench.json
+    python scripts/benchmark.py --case 50000:200M --repeat 3
+    python scripts/benchmark.py --preset quick --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp_get_text_commit import git_analyzer
+from mcp_get_text_commit.commit_generator import ConventionalCommitGenerator, KeyChangeCollector
+from mcp_get_text_commit.commit_text_generator import CommitTextGenerator
+from mcp_get_text_commit.commit_type_detector import CommitTypeDetector
+from mcp_get_text_commit.git_analyzer import GitAnalyzer
+from mcp_get_text_commit.log_context import LoggingContext
+
+# Наборы случаев: (число файлов, размер diff в байтах)
+PRESETS: Dict[str, List[Tuple[int, int]]] = {
+    "quick": [
+        (1, 1 << 10),
+        (10, 100 << 10),
+        (1000, 1 << 20),
+    ],
+    "full": [
+        (1, 1 << 10),
+        (10, 100 << 10),
+        (1000, 1 << 20),
+        (5000, 10 << 20),
+        (50000, 50 << 20),
+        (200, 200 << 20),
+    ],
+}
+
+STAGES = ("git_status", "repo_paths", "git_collection", "detection", "key_changes", "generation", "end_to_end")
+
+# Строки изменений: срабатывают паттерны детектора и извлечения ключевых изменений
+CHANGE_LINES = (
+    "def handler_{index}(self, request):",
+    "    return self.service.process(request)",
+    "class Model{index}:",
+    "    value = {index}  # fix null check",
+    "function render{index}() {{",
+    "const item{index} = new ItemController();",
+)
+
+SIZE_SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(value: str) -> int:
+    """Размер вида 100K / 5M / 1G / 2048 в байтах"""
+    value = value.strip().upper()
+    if value and value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def parse_case(value: str) -> Tuple[int, int]:
+    """Случай вида FILES:SIZE, например 1000:5M"""
+    files, _, size = value.partition(":")
+    if not size:
+        raise argparse.ArgumentTypeError(f"Ожидается FILES:SIZE, получено: {value}")
+    return int(files), parse_size(size)
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def _change_block(file_index: int, size: int) -> str:
+    """Добавляемый в файл текст размером около size байт"""
+    lines = []
+    total = 0
+    line_index = 0
+    while total < size:
+        template = CHANGE_LINES[line_index % len(CHANGE_LINES)]
+        line = template.format(index=file_index * 1000 + line_index) + "\n"
+        lines.append(line)
+        total += len(line) + 1  # + префикс "+" в diff
+        line_index += 1
+    return "".join(lines)
+
+
+def create_repository(root: Path, file_count: int, diff_bytes: int) -> Path:
+    """Создает репозиторий с коммитом и изменениями в рабочей копии"""
+    repo = root / f"repo_{file_count}_{diff_bytes}"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    _git(repo, "config", "user.email", "bench@example.com")
+    _git(repo, "config", "user.name", "Bench")
+    _git(repo, "config", "core.autocrlf", "false")
+
+    paths = []
+    for index in range(file_count):
+        path = repo / "src" / f"pkg_{index // 500}" / f"module_{index}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"import os\n\n\ndef base_{index}():\n    return {index}\n", encoding="utf-8")
+        paths.append(path)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "init")
+
+    per_file = max(diff_bytes // max(file_count, 1), 1)
+    for index, path in enumerate(paths):
+        with path.open("a", encoding="utf-8") as file:
+            file.write(_change_block(index, per_file))
+    return repo
+
+
+async def _time_stage(repeat: int, stage: Callable[[], Awaitable[object]]) -> Dict[str, float]:
+    """Выполняет этап repeat раз, возвращает min/median/max в миллисекундах"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await stage()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def extract_key_changes(diff: str) -> List[str]:
+    """Ключевые изменения diff через KeyChangeCollector, как при генерации"""
+    collector = KeyChangeCollector()
+    collector.feed(diff)
+    return collector.result()
+
+
+async def benchmark_repository(repo: Path, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Замеряет все этапы для одного репозитория"""
+    # Сообщения идут в logging, который отключен на время замеров
+    ctx = LoggingContext()
+    working_directory = str(repo)
+    git_data = await GitAnalyzer(working_directory).collect_git_data()
+    files = git_data["staged_files"]
+    diff = git_data["staged_diff"]
+    detector = CommitTypeDetector()
+    generator = ConventionalCommitGenerator(git_data["project_rules"])
+    commit_type, confidence = detector.detect_commit_type(files, diff)
+    key_changes = extract_key_changes(diff)
+
+    async def git_status():
+        # Первый вызов git в сборе данных: заодно проверяет, что это репозиторий
+        return await GitAnalyzer(working_directory)._run_git_status()
+
+    async def repo_paths():
+        # Пути кэшируются на процесс: замеряется первый запрос (rev-parse)
+        git_analyzer._REPO_PATHS.clear()
+        return await GitAnalyzer(working_directory).repo_paths()
+
+    async def git_collection():
+        return await GitAnalyzer(working_directory).collect_git_data()
+
+    async def detection():
+        return detector.detect_commit_type(files, diff)
+
+    async def extraction():
+        return extract_key_changes(diff)
+
+    async def generation():
+        return await generator.generate_commit_message(
+            commit_type, files, diff, confidence, ctx, key_changes=key_changes
+        )
+
+    async def end_to_end():
+        return await CommitTextGenerator.generate(working_directory, logger=ctx)
+
+    stages = dict(zip(
+        STAGES, (git_status, repo_paths, git_collection, detection, extraction, generation, end_to_end)
+    ))
+    return {name: await _time_stage(repeat, stage) for name, stage in stages.items()}
+
+
+def _environment() -> Dict[str, str]:
+    """Описание окружения для сопоставления результатов"""
+    try:
+        version = metadata.version("mcp-get-text-commit")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = "unknown"
+    git_version = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    return {
+        "package_version": version,
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": git_version,
+    }
+
+
+async def run_benchmark(cases: List[Tuple[int, int]], repeat: int, workdir: Optional[Path]) -> Dict:
+    """Создает репозитории и замеряет этапы для всех случаев"""
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir, prefix="mcp-commit-bench-") as root:
+        for file_count, diff_bytes in cases:
+            name = f"{file_count}files_{diff_bytes}B"
+            print(f"Создание репозитория {name}...", file=sys.stderr)
+            repo = create_repository(Path(root), file_count, diff_bytes)
+            print(f"Замеры {name}...", file=sys.stderr)
+            stages = await benchmark_repository(repo, repeat)
+            results.append({
+                "name": name,
+                "files": file_count,
+                "diff_bytes": diff_bytes,
+                "stages": stages,
+            })
+    return {"environment": _environment(), "repeat": repeat, "cases": results}
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Регрессии: медиана этапа выросла больше чем на threshold (доля)"""
+    baseline_cases = {case["name"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in current["cases"]:
+        base_case = baseline_cases.get(case["name"])
+        if base_case is None:
+            continue
+        for stage, timing in case["stages"].items():
+            base_timing = base_case["stages"].get(stage)
+            if base_timing is None or base_timing["median_ms"] <= 0:
+                continue
+            ratio = timing["median_ms"] / base_timing["median_ms"]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{case['name']} {stage}: {base_timing['median_ms']:.1f} ms -> "
+                    f"{timing['median_ms']:.1f} ms (x{ratio:.2f})"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Замеряет время этапов генерации commit message на синтетических репозиториях."
+    )
+    parser.add_argument(
+        "--preset",
+        choices=sorted(PRESETS),
+        default="quick",
+        help="Набор случаев (игнорируется, если задан --case). По умолчанию - quick."
+    )
+    parser.add_argument(
+        "--case",
+        action="append",
+        type=parse_case,
+        help="Случай FILES:SIZE (например, 1000:5M); можно указать несколько раз."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов каждого этапа. По умолчанию - 5.")
+    parser.add_argument("--workdir", type=Path, help="Каталог для временных репозиториев.")
+    parser.add_argument("--output", type=Path, help="Файл для JSON результата (по умолчанию - stdout).")
+    parser.add_argument("--compare", type=Path, help="JSON результат предыдущего запуска для сравнения.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Допустимый рост медианы при сравнении (доля). По умолчанию - 0.2."
+    )
+    args = parser.parse_args()
+
+    # Отладочные сообщения логгера искажают замеры коротких этапов
+    logging.disable(logging.INFO)
+
+    cases = args.case or PRESETS[args.preset]
+    result = asyncio.run(run_benchmark(cases, max(args.repeat, 1), args.workdir))
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare_results(baseline, result, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("Регрессий не обнаружено", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
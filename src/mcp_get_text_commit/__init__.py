@@ -5,10 +5,19 @@ MCP Get Text Commit - Git Commit Intelligence
 в формате Conventional Commits через Model Context Protocol.
 """
 
+from typing import Any
+
 __version__ = "0.3.0"
 __author__ = "MCP DevTools"
 __email__ = "dev@mcptools.com"
 
-from .server import create_server, main
-
 __all__ = ["create_server", "main", "__version__"]
+
+
+def __getattr__(name: str) -> Any:
+    # Сервер (и стек MCP) импортируется только при обращении: CLI и модули
+    # анализа загружаются без него
+    if name in ("create_server", "main"):
+        from . import server
+        return getattr(server, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,271 @@
+"""
+Change Set
+
+Компактное представление изменений: таблица файлов по столбцам (пути,
+коды статуса, numstat в array, переименования, смещения patch) и один
+общий буфер байт вывода git. Patch файла - срез memoryview буфера без копирования;
+текст декодируется только по запросу потребителя.
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .diff_stream import parse_diff_header_path
+
+# Значение счетчика numstat для бинарных файлов ("-" в выводе git)
+BINARY = -1
+
+# Коды --raw с двумя путями: переименование и копирование
+_RAW_TWO_PATHS = (b"R", b"C")
+
+# Заголовок файла в patch (после перевода строки)
+_FILE_HEADER = b"\ndiff --"
+_FILE_HEADER_KINDS = (b"git ", b"cc ")
+
+# Граница заголовка файла: начало первого hunk'а или сообщение о бинарном файле
+_HEADER_ENDS = (b"\n@@", b"\nBinary files ")
+
+
+def decode(data: Union[bytes, memoryview]) -> str:
+    """Декодирует байты вывода git (как и остальной вывод - с errors='ignore')"""
+    return str(data, 'utf-8', errors='ignore')
+
+
+class ChangeSet:
+    """Таблица измененных файлов с patch в общем буфере
+
+    Столбцы: paths, statuses (кортежи строк), added, removed (array, BINARY
+    для бинарных файлов), kinds (код изменения git diff --raw: M, A, D, R,
+    C...; пусто без --raw), origins (исходный путь переименования или
+    копирования, иначе пусто), similarities (процент сходства с origins,
+    -1 если нет), starts, ends (смещения patch файла в buffer, -1 если
+    patch не загружался). Порядок строк - порядок numstat git.
+
+    buffer - байты вывода git целиком; patch начинается со смещения
+    patch_offset (у from_numstat_z - после записей numstat), поэтому
+    буфер не копируется.
+    """
+
+    __slots__ = (
+        "paths", "statuses", "added", "removed", "kinds", "origins", "similarities",
+        "starts", "ends", "buffer", "patch_offset", "_rows"
+    )
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        statuses: Sequence[str],
+        added: "array[int]",
+        removed: "array[int]",
+        buffer: bytes = b"",
+        kinds: Optional[Sequence[str]] = None,
+        origins: Optional[Sequence[str]] = None,
+        similarities: Optional["array[int]"] = None,
+        patch_offset: int = 0
+    ):
+        self.paths: Tuple[str, ...] = tuple(paths)
+        self.statuses: Tuple[str, ...] = tuple(statuses)
+        self.added = added
+        self.removed = removed
+        self.kinds: Tuple[str, ...] = tuple(kinds) if kinds is not None else ("",) * len(self.paths)
+        self.origins: Tuple[str, ...] = tuple(origins) if origins is not None else ("",) * len(self.paths)
+        self.similarities = similarities if similarities is not None else array("q", [-1]) * len(self.paths)
+        self.starts = array("q", [-1]) * len(self.paths)
+        self.ends = array("q", [-1]) * len(self.paths)
+        self.buffer = b""
+        self.patch_offset = 0
+        self._rows = {path: row for row, path in enumerate(self.paths)}
+        if len(buffer) > patch_offset:
+            self.attach_patch(buffer, patch_offset)
+
+    @classmethod
+    def from_numstat_z(cls, output: bytes, file_status: Optional[Dict[str, str]] = None) -> "ChangeSet":
+        """Разбирает вывод git diff -z [--raw] --numstat [-p]; patch становится буфером
+
+        Записи --raw (идут перед numstat) дают код изменения и сходство
+        переименований и копирований.
+        """
+        file_status = file_status or {}
+        raw: Dict[str, Tuple[str, int]] = {}
+        paths: List[str] = []
+        origins: List[str] = []
+        added = array("q")
+        removed = array("q")
+        position = 0
+        while position < len(output):
+            end = output.find(b"\0", position)
+            if end == -1:
+                end = len(output)
+            record = output[position:end]
+            position = end + 1
+            if not record:
+                # Пустая запись отделяет numstat от patch
+                break
+
+            if record.startswith(b":"):
+                # :<режимы> <id> <id> <код><сходство>, далее один или два пути
+                status = record.rsplit(b" ", 1)[-1]
+                path_count = 2 if status[:1] in _RAW_TWO_PATHS else 1
+                raw_paths = []
+                for _ in range(path_count):
+                    end = output.find(b"\0", position)
+                    if end == -1:
+                        end = len(output)
+                    raw_paths.append(output[position:end])
+                    position = end + 1
+                raw[decode(raw_paths[-1])] = (decode(status[:1]), int(status[1:]) if status[1:] else -1)
+                continue
+
+            added_field, removed_field, path = record.split(b"\t", 2)
+            origin = b""
+            if not path:
+                # Переименование: далее идут исходный и новый пути
+                old_end = output.find(b"\0", position)
+                new_end = output.find(b"\0", old_end + 1)
+                if new_end == -1:
+                    new_end = len(output)
+                origin = output[position:old_end]
+                path = output[old_end + 1:new_end]
+                position = new_end + 1
+            paths.append(decode(path))
+            origins.append(decode(origin))
+            added.append(int(added_field) if added_field != b"-" else BINARY)
+            removed.append(int(removed_field) if removed_field != b"-" else BINARY)
+
+        statuses = [file_status.get(path, ".M") for path in paths]
+        kinds = [raw.get(path, ("", -1))[0] for path in paths]
+        similarities = array("q", (raw.get(path, ("", -1))[1] for path in paths))
+        # patch остается в выводе git: срез скопировал бы весь буфер
+        return cls(paths, statuses, added, removed, output, kinds, origins, similarities, position)
+
+    @classmethod
+    def merge(cls, first: "ChangeSet", second: "ChangeSet") -> "ChangeSet":
+        """Объединяет таблицы без patch второй (пути по возрастанию, как в git)"""
+        rows = sorted(
+            [(path, first, row) for row, path in enumerate(first.paths)]
+            + [(path, second, row) for row, path in enumerate(second.paths) if path not in first._rows]
+        )
+        merged = cls(
+            [path for path, _, _ in rows],
+            [source.statuses[row] for _, source, row in rows],
+            array("q", (source.added[row] for _, source, row in rows)),
+            array("q", (source.removed[row] for _, source, row in rows)),
+            kinds=[source.kinds[row] for _, source, row in rows],
+            origins=[source.origins[row] for _, source, row in rows],
+            similarities=array("q", (source.similarities[row] for _, source, row in rows))
+        )
+        if first.patch_bytes:
+            merged.attach_patch(first.buffer, first.patch_offset)
+        return merged
+
+    def attach_patch(self, buffer: bytes, offset: int = 0) -> None:
+        """Делает buffer общим буфером patch (начиная с offset) и размечает patch файлов
+
+        Patch файла сопоставляется по пути из заголовка; если путь в
+        заголовке не совпал (например, экранированный git), берется
+        следующий по порядку файл без patch.
+        """
+        self.buffer = buffer
+        self.patch_offset = offset
+        for row in range(len(self.paths)):
+            self.starts[row] = self.ends[row] = -1
+
+        boundaries = []
+        position = offset if buffer.startswith(b"diff --", offset) else buffer.find(_FILE_HEADER, offset)
+        while position != -1:
+            if buffer.startswith(b"\n", position):
+                position += 1
+            if buffer.startswith(_FILE_HEADER_KINDS, position + len("diff --")):
+                boundaries.append(position)
+            position = buffer.find(_FILE_HEADER, position)
+        boundaries.append(len(buffer))
+
+        previous = -1
+        for start, end in zip(boundaries, boundaries[1:]):
+            row = self._rows.get(parse_diff_header_path(decode(self._header(start, end))), -1)
+            if row == -1 or self.starts[row] != -1:
+                row = next((candidate for candidate in range(previous + 1, len(self.paths))
+                            if self.starts[candidate] == -1), -1)
+                if row == -1:
+                    continue
+            self.starts[row] = start
+            self.ends[row] = end
+            previous = row
+
+    def _header(self, start: int, end: int) -> memoryview:
+        """Заголовок файла в буфере (до первого hunk'а)"""
+        header_end = end
+        for marker in _HEADER_ENDS:
+            found = self.buffer.find(marker, start, header_end)
+            if found != -1:
+                header_end = found
+        return memoryview(self.buffer)[start:header_end]
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def patch_bytes(self) -> int:
+        """Размер загруженного patch в байтах"""
+        return len(self.buffer) - self.patch_offset
+
+    def patch(self, row: int) -> Optional[memoryview]:
+        """Patch файла без копирования; None, если patch не загружался"""
+        start = self.starts[row]
+        if start == -1:
+            return None
+        return memoryview(self.buffer)[start:self.ends[row]]
+
+    def patch_text(self, row: int) -> str:
+        """Текст patch файла (декодируется при вызове)"""
+        view = self.patch(row)
+        return decode(view) if view is not None else ""
+
+    def patch_rows(self) -> List[int]:
+        """Строки таблицы с patch в порядке буфера"""
+        return sorted((row for row in range(len(self.paths)) if self.starts[row] != -1),
+                      key=self.starts.__getitem__)
+
+    def iter_patches(self) -> Iterator[memoryview]:
+        """Patch файлов в порядке буфера"""
+        view = memoryview(self.buffer)
+        for row in self.patch_rows():
+            yield view[self.starts[row]:self.ends[row]]
+
+    def patch_view(self) -> memoryview:
+        """Весь patch без копирования"""
+        return memoryview(self.buffer)[self.patch_offset:]
+
+    def text(self) -> str:
+        """Весь patch одной строкой (как прежний staged_diff)"""
+        return decode(self.patch_view()).strip()
+
+    def numstat(self) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+        """{путь: (добавлено, удалено)}; None для бинарных файлов"""
+        return {
+            path: (
+                added if added != BINARY else None,
+                removed if removed != BINARY else None
+            )
+            for path, added, removed in zip(self.paths, self.added, self.removed)
+        }
+
+    def file_status(self) -> Dict[str, str]:
+        """{путь: код статуса XY}"""
+        return dict(zip(self.paths, self.statuses))
+
+    def renames(self) -> Dict[str, Tuple[str, int]]:
+        """{новый путь: (исходный путь, процент сходства)} для переименований
+
+        Без --raw переименование и копирование не различаются: учитываются
+        только строки с кодом R.
+        """
+        return {
+            path: (origin, similarity)
+            for path, kind, origin, similarity in zip(self.paths, self.kinds, self.origins, self.similarities)
+            if kind == "R" and origin
+        }
+
+    def is_pure_rename(self, row: int) -> bool:
+        """Файл переименован без изменения содержимого (patch - только заголовок)"""
+        return self.kinds[row] == "R" and self.similarities[row] == 100
@@ -0,0 +1,166 @@
+"""
+Интерфейс командной строки (CLI) для генерации сообщений коммитов.
+
+Генерирует commit message для указанной директории или для текущей
+директории по умолчанию. Стек MCP (FastMCP, starlette, uvicorn) не
+загружается. С --daemon запрос выполняет локальный демон (--serve-daemon)
+с прогретыми кэшами, а CLI импортирует только тонкий клиент; если демон
+не запущен, анализ выполняется в текущем процессе. С --range
+предложения для коммитов диапазона печатаются строками JSON по мере
+готовности.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from contextlib import aclosing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import daemon_client
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(
+        description="Генерирует сообщение для коммита на основе staged-изменений в Git."
+    )
+    parser.add_argument(
+        "directory",
+        nargs="?",
+        default=".",
+        help="Путь к Git-репозиторию. По умолчанию - текущая директория."
+    )
+    parser.add_argument(
+        "--style",
+        default="conventional",
+        help="Стиль коммита (например, 'conventional'). По умолчанию - 'conventional'."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Потоковая обработка diff (для очень больших изменений)."
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Ограничение времени анализа в секундах (результат по прочитанной части diff)."
+    )
+    parser.add_argument(
+        "--range",
+        dest="revision_range",
+        default=None,
+        metavar="REVISIONS",
+        help="Предложить сообщения для каждого коммита диапазона (например, main..feature); "
+             "результаты - строки JSON."
+    )
+    parser.add_argument(
+        "--max-count",
+        type=int,
+        default=None,
+        help="С --range: не больше N последних коммитов диапазона."
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Выполнить запрос в локальном демоне (если он не запущен - в текущем процессе)."
+    )
+    parser.add_argument(
+        "--serve-daemon",
+        action="store_true",
+        help="Запустить локальный демон и обслуживать запросы до Ctrl+C / SIGTERM."
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help="Путь Unix socket демона (по умолчанию - в XDG_RUNTIME_DIR или временном каталоге)."
+    )
+    return parser
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Генерирует commit message в текущем процессе"""
+    # Модули анализа загружаются только для анализа в текущем процессе
+    from .commit_text_generator import CommitTextGenerator
+
+    result = await CommitTextGenerator.generate(
+        working_directory=str(Path(args.directory).resolve()),
+        style=args.style,
+        streaming=args.stream,
+        deadline_seconds=args.deadline
+    )
+    return result.model_dump()
+
+
+async def run_range(args: argparse.Namespace) -> int:
+    """Печатает строку JSON для каждого коммита диапазона по мере готовности"""
+    from .commit_range import CommitRangeAnalyzer
+
+    analyzer = CommitRangeAnalyzer(str(Path(args.directory).resolve()))
+    async with aclosing(analyzer.iter_results(args.revision_range, args.max_count)) as results:
+        async for result in results:
+            print(json.dumps(result.model_dump(), ensure_ascii=False), flush=True)
+    return 0
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    """Печатает результат генерации"""
+    if not result["has_changes"]:
+        print("\nНет staged изменений для анализа.")
+        return
+
+    print("\n--- Сгенерированное сообщение ---")
+    print(result["commit_text"])
+    print("---------------------------------")
+    print(f"\nУверенность: {result['confidence']:.2f}")
+    print(f"Проанализировано файлов: {result['files_analyzed']}")
+    if result.get("partial"):
+        print("Анализ прерван по deadline: учтена только часть изменений.")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point CLI; возвращает код завершения"""
+    args = build_parser().parse_args(argv)
+
+    if args.serve_daemon:
+        from .daemon import run_daemon
+        run_daemon(args.socket)
+        return 0
+
+    if args.revision_range is not None:
+        # stdout - только строки JSON; ошибки - в stderr
+        try:
+            return asyncio.run(run_range(args))
+        except Exception as e:
+            print(f"Произошла ошибка: {e}", file=sys.stderr)
+            return 1
+
+    repo_path = Path(args.directory).resolve()
+    print(f"Анализирую staged изменения в: {repo_path}")
+
+    try:
+        result = None
+        if args.daemon:
+            params = {"working_directory": str(repo_path), "style": args.style, "streaming": args.stream}
+            if args.deadline is not None:
+                params["deadline_seconds"] = args.deadline
+            try:
+                result = daemon_client.request("get_text_commit", params, socket_path=args.socket)
+            except daemon_client.DaemonUnavailableError as e:
+                print(f"{e}; анализ в текущем процессе", file=sys.stderr)
+        if result is None:
+            result = asyncio.run(run(args))
+        print_result(result)
+        return 0
+
+    except Exception as e:
+        print(f"\nПроизошла ошибка: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
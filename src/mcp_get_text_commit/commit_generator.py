@@ -5,32 +5,48 @@ Message Generation with Context
 """
 
 import re
-from pathlib import Path
-from typing import List, Optional
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple, Union
 
-from mcp.server.fastmcp import Context
+from .log_context import LogContext
+from .project_rules import TODO_MARKER, ProjectRules
+from .scope_index import ScopeTrie
+from .symbol_index import SymbolIndex
 
 
 class ConventionalCommitGenerator:
     """Генератор commit messages в формате Conventional Commits"""
 
-    def __init__(self, project_rules: Optional[str] = None):
+    def __init__(
+        self,
+        project_rules: Union[ProjectRules, str, None] = None,
+        scopes: Optional[ScopeTrie] = None
+    ):
         self.project_rules = project_rules
+        self.scopes = scopes
 
     async def generate_commit_message(
         self,
         commit_type: str,
         staged_files: List[str],
-        staged_diff: str,
+        staged_diff: Optional[str],
         confidence: float,
-        ctx: Context
+        ctx: LogContext,
+        key_changes: Optional[List[str]] = None
     ) -> str:
-        """Генерирует полный commit message"""
+        """Генерирует полный commit message
+
+        key_changes передается при потоковой обработке, когда diff целиком
+        не хранится; иначе изменения извлекаются из staged_diff.
+        """
         await ctx.debug(f"Генерация commit message для типа: {commit_type}")
-        
-        subject = await self._generate_subject(commit_type, staged_files, staged_diff)
-        body = await self._generate_body(staged_files, staged_diff) if len(staged_files) > 3 or confidence < 0.7 else None
-        footer = await self._generate_footer() if self.project_rules and "TODO.md" in self.project_rules else None
+
+        if key_changes is None:
+            key_changes = self._extract_key_changes(staged_diff or "")
+
+        subject = await self._generate_subject(commit_type, staged_files, key_changes)
+        body = await self._generate_body(staged_files, key_changes) if len(staged_files) > 3 or confidence < 0.7 else None
+        footer = await self._generate_footer() if self._mentions_todo() else None
 
         commit_parts = [subject]
         if body:
@@ -42,10 +58,14 @@ class ConventionalCommitGenerator:
         await ctx.debug(f"Сгенерированный commit message: {commit_message[:100]}...")
         return commit_message
 
-    async def _generate_subject(self, commit_type: str, staged_files: List[str], staged_diff: str) -> str:
+    def _mentions_todo(self) -> bool:
+        """Упоминают ли правила проекта TODO.md (для ProjectRules - уже разобрано)"""
+        if isinstance(self.project_rules, ProjectRules):
+            return self.project_rules.mentions_todo
+        return self.project_rules is not None and TODO_MARKER in self.project_rules
+
+    async def _generate_subject(self, commit_type: str, staged_files: List[str], key_changes: List[str]) -> str:
         """Генерирует subject line коммита"""
-        key_changes = self._extract_key_changes(staged_diff)
-        
         if key_changes:
             description = key_changes[0]
         elif len(staged_files) == 1:
@@ -53,13 +73,15 @@ class ConventionalCommitGenerator:
             description = f"update {filename}"
         else:
             description = f"update {len(staged_files)} files"
-            
+
+        scope = self.scopes.scope_for(staged_files) if self.scopes is not None else None
+        if scope:
+            return f"{commit_type}({scope}): {description}"
         return f"{commit_type}: {description}"
 
-    async def _generate_body(self, staged_files: List[str], staged_diff: str) -> str:
+    async def _generate_body(self, staged_files: List[str], key_changes: List[str]) -> str:
         """Генерирует body коммита с деталями"""
-        changes = self._extract_key_changes(staged_diff)
-        return "\n".join(f"- {change}" for change in changes[:5])
+        return "\n".join(f"- {change}" for change in key_changes[:5])
 
     async def _generate_footer(self) -> str:
         """Генерирует footer на основе project rules"""
@@ -67,30 +89,172 @@ class ConventionalCommitGenerator:
 
     def _extract_key_changes(self, staged_diff: str) -> List[str]:
         """Извлекает ключевые изменения из git diff"""
-        changes = []
-        patterns = {
-            r'\+.*function\s+(\w+)': lambda m: f"add {m.group(1)}() function",
-            r'\+.*class\s+(\w+)': lambda m: f"create {m.group(1)} class",
-            r'\+.*def\s+(\w+)': lambda m: f"implement {m.group(1)}() method",
-            r'\-.*function\s+(\w+)': lambda m: f"remove {m.group(1)}() function",
-            r'\+.*import\s+(\w+)': lambda m: f"add {m.group(1)} dependency",
-        }
-        
-        for pattern, formatter in patterns.items():
-            for match in re.finditer(pattern, staged_diff, re.IGNORECASE):
-                change = formatter(match)
-                if change not in changes:
-                    changes.append(change)
+        collector = KeyChangeCollector()
+        collector.feed(staged_diff)
+        return collector.result()
+
+
+class KeyChangeCollector:
+    """Инкрементальное извлечение ключевых изменений из частей diff
+
+    Рассматриваются только добавленные (+) и удаленные (-) строки тела
+    diff. Строки-кандидаты находятся поиском ключевого слова паттерна в
+    приведенном к нижнему регистру тексте (str.find), regex проверяет
+    только найденную строку - без сканирования контекста и заголовков.
+    Для каждого паттерна хранится не больше limit уникальных изменений
+    (упорядоченный dict). Итоговый список берет первые limit элементов в
+    порядке паттернов, поэтому результат совпадает с обработкой diff одной
+    строкой, а паттерн ищется, только пока его новое изменение попадет в
+    эти limit элементов: как только предыдущие паттерны вместе с ним дают
+    limit изменений, поиск по нему (и по следующим) прекращается.
+
+    Изменения существующего кода описываются по символам из заголовков
+    hunk'ов (SymbolIndex) и идут после добавлений, переименования файлов
+    (add_renames) - в конце.
+    """
+
+    # (ключевое слово, маркер строки, regex строки, формат изменения)
+    PATTERNS = [
+        ("function", "+", re.compile(r'\+.*function[^\S\n]+(\w+)', re.IGNORECASE), "add {}() function"),
+        ("class", "+", re.compile(r'\+.*class[^\S\n]+(\w+)', re.IGNORECASE), "create {} class"),
+        ("def", "+", re.compile(r'\+.*def[^\S\n]+(\w+)', re.IGNORECASE), "implement {}() method"),
+        ("function", "-", re.compile(r'\-.*function[^\S\n]+(\w+)', re.IGNORECASE), "remove {}() function"),
+        ("import", "+", re.compile(r'\+.*import[^\S\n]+(\w+)', re.IGNORECASE), "add {} dependency"),
+    ]
+    KEYWORD_RES = {
+        keyword: re.compile(re.escape(keyword), re.IGNORECASE)
+        for keyword in dict.fromkeys(keyword for keyword, _, _, _ in PATTERNS)
+    }
+
+    def __init__(self, limit: int = 3):
+        self.limit = limit
+        self._changes: List[Dict[str, None]] = [{} for _ in self.PATTERNS]
+        self.symbols = SymbolIndex()
+        self.renames: Dict[str, None] = {}
+        self.added_lines = 0
+        self.removed_lines = 0
+
+    @property
+    def complete(self) -> bool:
+        """Изменения из кода определены: новое изменение любого паттерна
+        встанет после первых limit (первый паттерн заполнен)"""
+        return len(self._changes[0]) >= self.limit
+
+    def feed(self, diff_text: str) -> None:
+        """Учитывает очередную часть diff"""
+        if not diff_text:
+            return
+
+        if not self.complete:
+            if sum(len(changes) for changes in self._changes) < self.limit:
+                # Символы hunk'ов дополняют result(), только пока изменений меньше limit
+                self.symbols.feed(diff_text)
+            lowered = diff_text.lower()
+            # lower() может удлинить текст (например, "İ"): тогда позиции не
+            # совпадают, и ключевые слова ищутся regex без учета регистра
+            same_positions = len(lowered) == len(diff_text)
+            # Изменений предыдущих паттернов: новое изменение паттерна встает после них
+            preceding = 0
+            for (keyword, marker, regex, change_format), changes in zip(self.PATTERNS, self._changes):
+                position = 0
+                while preceding + len(changes) < self.limit:
+                    if same_positions:
+                        hit = lowered.find(keyword, position)
+                    else:
+                        match = self.KEYWORD_RES[keyword].search(diff_text, position)
+                        hit = match.start() if match else -1
+                    if hit == -1:
+                        break
+
+                    line_start = diff_text.rfind("\n", 0, hit) + 1
+                    line_end = diff_text.find("\n", hit)
+                    if line_end == -1:
+                        line_end = len(diff_text)
+                    position = line_end + 1
+
+                    if (diff_text.startswith(marker, line_start)
+                            and not diff_text.startswith(marker * 2, line_start)):
+                        match = regex.match(diff_text, line_start, line_end)
+                        if match:
+                            changes.setdefault(change_format.format(match.group(1)))
+                preceding += len(changes)
+                if preceding >= self.limit:
+                    break
+
+        self.added_lines += _count_body_lines(diff_text, "+")
+        self.removed_lines += _count_body_lines(diff_text, "-")
+
+    def add_line_counts(self, added: int, removed: int) -> None:
+        """Учитывает строки файлов, patch которых не загружался (по numstat)"""
+        self.added_lines += added
+        self.removed_lines += removed
+
+    def add_renames(self, renames: Dict[str, Tuple[str, int]]) -> None:
+        """Учитывает переименованные файлы {новый путь: (исходный путь, сходство)}"""
+        for path, (origin, _) in renames.items():
+            if len(self.renames) >= self.limit:
+                break
+            self.renames.setdefault(describe_rename(origin, path))
+
+    def merge(self, other: "KeyChangeCollector") -> None:
+        """Добавляет результаты коллектора следующей части diff
+
+        Слияние по порядку частей дает тот же результат, что и
+        последовательная обработка этих частей одним коллектором.
+        """
+        for changes, other_changes in zip(self._changes, other._changes):
+            for change in other_changes:
+                if len(changes) >= self.limit:
+                    break
+                changes.setdefault(change)
+        self.symbols.merge(other.symbols)
+        for change in other.renames:
+            if len(self.renames) >= self.limit:
+                break
+            self.renames.setdefault(change)
+
+        self.added_lines += other.added_lines
+        self.removed_lines += other.removed_lines
+
+    def result(self) -> List[str]:
+        """Возвращает до limit ключевых изменений"""
+        changes = [change for pattern_changes in self._changes for change in pattern_changes]
+        if len(changes) < self.limit:
+            changes.extend(self.symbols.changes(self.limit - len(changes)))
+        if len(changes) < self.limit:
+            changes.extend(self.renames)
 
         if not changes:
-            added_lines = len(re.findall(r'^\+[^+]', staged_diff, re.MULTILINE))
-            removed_lines = len(re.findall(r'^\-[^-]', staged_diff, re.MULTILINE))
-            
-            if added_lines > removed_lines * 2:
+            if self.added_lines > self.removed_lines * 2:
                 changes.append("add new functionality")
-            elif removed_lines > added_lines * 2:
+            elif self.removed_lines > self.added_lines * 2:
                 changes.append("remove unused code")
             else:
                 changes.append("update implementation")
 
-        return changes[:3]
+        return changes[:self.limit]
+
+
+def describe_rename(origin: str, path: str) -> str:
+    """Описание переименования или перемещения файла"""
+    old, new = PurePosixPath(origin), PurePosixPath(path)
+    if old.name == new.name:
+        target = f"{new.parent}/" if str(new.parent) != "." else "project root"
+        return f"move {new.name} to {target}"
+    if old.parent == new.parent:
+        return f"rename {old.name} to {new.name}"
+    return f"move {origin} to {path}"
+
+
+def _count_body_lines(text: str, marker: str) -> int:
+    """Число строк вида marker + символ, отличный от marker (как ^\\+[^+])
+
+    Считается через str.count без построчного разбора: начала строк с
+    marker минус строки с удвоенным marker и marker в самом конце текста.
+    """
+    count = text.count("\n" + marker) - text.count("\n" + marker * 2)
+    if text.endswith("\n" + marker):
+        count -= 1
+    if text[:1] == marker and text[1:2] not in ("", marker):
+        count += 1
+    return count
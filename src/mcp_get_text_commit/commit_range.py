@@ -0,0 +1,182 @@
+"""
+Commit Range
+
+Предложения commit messages для каждого коммита диапазона (main..feature,
+последние N коммитов): для переписывания истории и аудита импортов. Один
+процесс git log -p читается потоково и делится на коммиты, patch
+коммитов оцениваются пакетами в общем пуле воркеров (diff_scoring), а
+результаты отдаются по мере готовности в порядке git log.
+
+Тип и описание коммита определяются так же, как для изменений рабочей
+копии, но без индекса истории (он обучен на тех же коммитах) и без
+правил проекта для footer (они описывают текущее состояние).
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncGenerator, Deque, List, Optional, Tuple
+
+from .change_set import ChangeSet
+from .commit_generator import ConventionalCommitGenerator
+from .commit_text_generator import partial_confidence
+from .commit_type_detector import CommitTypeDetector
+from .config import Settings, get_settings
+from .diff_scoring import BATCHES_PER_WORKER, BatchResult, DiffScorer, FileDiff
+from .git_analyzer import GitAnalyzer
+from .log_context import LoggingContext
+from .models import GitCommandError, NotAGitRepositoryError, RangeCommitResult
+from .rule_registry import load_commit_types
+
+# Максимум коммитов в одной задаче воркера
+BATCH_MAX_COMMITS = 64
+
+
+@dataclass
+class LogCommit:
+    """Коммит из потока git log -p"""
+    sha: str
+    subject: str
+    changes: ChangeSet
+    truncated: bool
+
+
+def parse_commit(sha: str, subject: str, output: bytes, truncated: bool = False) -> LogCommit:
+    """Таблица изменений коммита по его выводу git log -z --raw --numstat -p
+
+    Если вывод обрезан до начала patch, разбираются только полные записи
+    numstat.
+    """
+    if truncated and b"\0\0" not in output:
+        output = output[:output.rfind(b"\0") + 1]
+    return LogCommit(sha, subject, ChangeSet.from_numstat_z(output), truncated)
+
+
+def _omitted_line_counts(changes: ChangeSet) -> Tuple[int, int]:
+    """Сумма numstat по файлам коммита, patch которых не прочитан"""
+    added = removed = 0
+    for row in range(len(changes)):
+        if changes.starts[row] == -1:
+            added += max(changes.added[row], 0)
+            removed += max(changes.removed[row], 0)
+    return added, removed
+
+
+class CommitRangeAnalyzer:
+    """Генерация commit messages для коммитов диапазона
+
+    Чтение git log и оценка пакетов в воркерах идут одновременно: в
+    работе не больше BATCHES_PER_WORKER пакетов на воркера, и пока самый
+    старый пакет не готов, поток git log не читается (git ждет на pipe).
+    Память ограничена этим окном, а не размером диапазона.
+    """
+
+    def __init__(self, working_directory: Optional[str] = None, settings: Optional[Settings] = None):
+        self.settings = settings or get_settings()
+        self.analyzer = GitAnalyzer(working_directory, self.settings)
+
+    async def iter_results(
+        self,
+        revision_range: str = "HEAD",
+        max_count: Optional[int] = None
+    ) -> AsyncGenerator[RangeCommitResult, None]:
+        """Отдает результаты коммитов в порядке git log по мере готовности
+
+        Raises:
+            NotAGitRepositoryError: директория не является git репозиторием
+            GitCommandError: неверный диапазон или ошибка git log
+        """
+        try:
+            _, toplevel = await self.analyzer.repo_paths()
+        except (GitCommandError, OSError) as e:
+            raise NotAGitRepositoryError(f"Not a git repository: {e}")
+        scopes, commit_types = await asyncio.gather(self.analyzer.scope_trie(), load_commit_types(toplevel))
+        detector = CommitTypeDetector(commit_types)
+        generator = ConventionalCommitGenerator(scopes=scopes)
+        scorer = DiffScorer(detector, self.settings)
+
+        window = scorer.workers * BATCHES_PER_WORKER
+        submitted = False
+        pending: Deque[Tuple[List[LogCommit], "asyncio.Future[List[BatchResult]]"]] = deque()
+
+        def submit(commits: List[LogCommit]) -> None:
+            nonlocal submitted
+            submitted = True
+            # Один пакет файлов на коммит: результат оценки - по коммиту
+            batches: List[List[FileDiff]] = [list(commit.changes.iter_patches()) for commit in commits]
+            pending.append((commits, scorer.submit_batches(batches)))
+
+        batch: List[LogCommit] = []
+        batch_bytes = 0
+        try:
+            async for sha, subject, output, truncated in self.analyzer.stream_log(
+                revision_range, max_count, self.settings.range_max_commit_bytes
+            ):
+                commit = parse_commit(sha, subject, output, truncated)
+                batch.append(commit)
+                batch_bytes += commit.changes.patch_bytes
+                if batch_bytes < self.settings.range_batch_bytes and len(batch) < BATCH_MAX_COMMITS:
+                    continue
+                submit(batch)
+                batch, batch_bytes = [], 0
+                while len(pending) >= window:
+                    commits, future = pending.popleft()
+                    for commit, result in zip(commits, await future):
+                        yield await self._result(commit, result, detector, generator, scorer)
+
+            if batch and not submitted:
+                # Диапазон уместился в один пакет: пул воркеров не нужен
+                for commit in batch:
+                    result = scorer.score_batch(commit.changes.iter_patches())
+                    yield await self._result(commit, result, detector, generator, scorer)
+                return
+            if batch:
+                submit(batch)
+            while pending:
+                commits, future = pending.popleft()
+                for commit, result in zip(commits, await future):
+                    yield await self._result(commit, result, detector, generator, scorer)
+        finally:
+            # Потребитель прервал чтение или ошибка git: ожидающие пакеты не нужны
+            for _, future in pending:
+                future.cancel()
+
+    async def _result(
+        self,
+        commit: LogCommit,
+        batch_result: BatchResult,
+        detector: CommitTypeDetector,
+        generator: ConventionalCommitGenerator,
+        scorer: DiffScorer
+    ) -> RangeCommitResult:
+        """Commit message коммита по результату оценки его patch"""
+        changes = commit.changes
+        paths = list(changes.paths)
+        if not paths:
+            return RangeCommitResult(
+                sha=commit.sha, subject=commit.subject, commit_text="", confidence=0.0, files_analyzed=0
+            )
+
+        renames = changes.renames()
+        score = scorer.merge(
+            detector.start_scan(paths, renames), [batch_result], _omitted_line_counts(changes), renames
+        )
+        confidence = score.confidence
+        if commit.truncated:
+            confidence = partial_confidence(confidence, len(changes.patch_rows()) / len(paths))
+        commit_text = await generator.generate_commit_message(
+            commit_type=score.commit_type,
+            staged_files=paths,
+            staged_diff=None,
+            confidence=confidence,
+            ctx=LoggingContext(),
+            key_changes=score.key_changes
+        )
+        return RangeCommitResult(
+            sha=commit.sha,
+            subject=commit.subject,
+            commit_text=commit_text,
+            confidence=confidence,
+            files_analyzed=len(paths),
+            partial=commit.truncated
+        )
@@ -0,0 +1,254 @@
+"""
+Commit Service
+
+Сервисный слой сервера: генерация commit messages с кэшированием
+результатов по состоянию репозитория и объединением одновременных
+одинаковых запросов, включая пакетные запросы и предложения для
+коммитов диапазона.
+"""
+
+import asyncio
+from contextlib import aclosing
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Tuple
+
+from . import metrics
+from .commit_range import CommitRangeAnalyzer
+from .commit_text_generator import CommitTextGenerator, _DummyContext
+from .config import Settings, get_settings
+from .git_analyzer import GitAnalyzer
+from .log_context import BroadcastContext, LogContext
+from .models import (
+    BatchItemResult,
+    GetTextCommitBatchParams,
+    GetTextCommitBatchResult,
+    GetTextCommitParams,
+    GetTextCommitRangeParams,
+    GetTextCommitRangeResult,
+    GetTextCommitResult,
+    ServerStats,
+)
+from .progress import AnalysisProgress
+from .repo_watcher import RepositoryWatcher
+from .result_cache import ResultCache
+from .single_flight import SingleFlight
+
+
+class CommitService:
+    """Генерация commit messages с общим кэшем результатов
+
+    При settings.watch_enabled запрошенные репозитории наблюдаются в фоне,
+    и результат пересчитывается в кэш сразу после изменения индекса, HEAD
+    или измененных файлов рабочей копии.
+
+    При settings.coalesce_requests одновременные запросы с одним ключом
+    (отпечаток состояния + стиль) ждут один анализ: git процессы не
+    конкурируют за один index.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None, cache: Optional[ResultCache] = None):
+        self.settings = settings or get_settings()
+        self.cache = cache or ResultCache(self.settings.result_cache_size)
+        self.metrics = metrics.MetricsAggregator(self.settings.metrics_window)
+        self.analyses = SingleFlight()
+        # Ожидающие выполняющихся общих анализов (по ключу)
+        self._listeners: Dict[Tuple[Hashable, ...], BroadcastContext] = {}
+        self.watcher: Optional[RepositoryWatcher] = None
+        if self.settings.watch_enabled and self.settings.result_cache_size > 0:
+            self.watcher = RepositoryWatcher(self, self.settings)
+
+    async def get_text_commit(
+        self,
+        params: GetTextCommitParams,
+        ctx: Optional[LogContext] = None
+    ) -> GetTextCommitResult:
+        """Возвращает commit message; повторный запрос без изменений берется из кэша"""
+        context: LogContext = ctx or _DummyContext()
+        try:
+            return await self.generate_result(params, context)
+        except Exception as e:
+            # Fallback результаты не кэшируются: ошибка может быть временной
+            return await CommitTextGenerator.error_result(e, context)
+
+    async def get_text_commit_batch(
+        self,
+        params: GetTextCommitBatchParams,
+        ctx: Optional[LogContext] = None
+    ) -> GetTextCommitBatchResult:
+        """Генерирует commit messages для нескольких репозиториев параллельно
+
+        Число одновременно анализируемых репозиториев ограничено семафором;
+        одинаковые пути анализируются один раз. Ошибка в одном репозитории
+        не влияет на остальные и возвращается в его элементе результата.
+        """
+        context: LogContext = ctx or _DummyContext()
+        semaphore = asyncio.Semaphore(params.max_concurrency or self.settings.batch_max_concurrency)
+
+        async def run_one(working_directory: str) -> BatchItemResult:
+            async with semaphore:
+                item_params = GetTextCommitParams(
+                    working_directory=working_directory,
+                    style=params.style,
+                    streaming=params.streaming,
+                    deadline_seconds=params.deadline_seconds
+                )
+                try:
+                    result = await self.generate_result(item_params, context)
+                except Exception as e:
+                    await context.error(f"{working_directory}: {str(e)}")
+                    return BatchItemResult(working_directory=working_directory, error=str(e) or type(e).__name__)
+                return BatchItemResult(working_directory=working_directory, result=result)
+
+        unique: Dict[str, asyncio.Task] = {}
+        for working_directory in params.working_directories:
+            key = str(Path(working_directory).resolve())
+            if key not in unique:
+                unique[key] = asyncio.ensure_future(run_one(working_directory))
+        await asyncio.gather(*unique.values())
+
+        results = []
+        for working_directory in params.working_directories:
+            item = unique[str(Path(working_directory).resolve())].result()
+            results.append(item.model_copy(update={"working_directory": working_directory}))
+        return GetTextCommitBatchResult(results=results)
+
+    async def get_text_commit_range(
+        self,
+        params: GetTextCommitRangeParams,
+        ctx: Optional[LogContext] = None
+    ) -> GetTextCommitRangeResult:
+        """Commit messages для каждого коммита диапазона
+
+        Готовые коммиты сообщаются через ctx.report_progress по мере
+        анализа. Ошибки (не репозиторий, неверный диапазон) пробрасываются.
+        """
+        progress = AnalysisProgress(ctx or _DummyContext())
+        progress.total = params.max_count or 0
+        results = []
+        analyzer = CommitRangeAnalyzer(params.working_directory, self.settings)
+        async with aclosing(analyzer.iter_results(params.revision_range, params.max_count)) as items:
+            async for item in items:
+                results.append(item)
+                await progress.commits_analyzed(len(results))
+        return GetTextCommitRangeResult(results=results)
+
+    async def generate_result(
+        self,
+        params: GetTextCommitParams,
+        ctx: LogContext,
+        record_metrics: bool = True
+    ) -> GetTextCommitResult:
+        """Результат из кэша или новый анализ; ошибки анализа пробрасываются
+
+        При включенных метриках результат содержит метрики запроса, а они
+        учитываются в статистике сервера (фоновые пересчеты - без метрик).
+        """
+        if not (record_metrics and self.settings.metrics_enabled):
+            return await self._cached_result(params, ctx)
+
+        with metrics.recording(self.settings.metrics_trace_memory) as recorder:
+            result = await self._cached_result(params, ctx)
+        request_metrics = recorder.result()
+        self.metrics.add(request_metrics)
+        return result.model_copy(update={"metrics": request_metrics})
+
+    def stats(self) -> ServerStats:
+        """Статистика сервера: перцентили этапов, кэш и фоновое наблюдение"""
+        return ServerStats(
+            metrics_enabled=self.settings.metrics_enabled,
+            requests=self.metrics.requests,
+            cache_hits=self.metrics.cache_hits,
+            stages=self.metrics.summary(),
+            cache=self.cache.stats(),
+            coalesced=self.analyses.joined,
+            watcher=self.watcher.stats() if self.watcher is not None else None
+        )
+
+    async def _cached_result(self, params: GetTextCommitParams, ctx: LogContext) -> GetTextCommitResult:
+        """Результат из кэша или новый анализ (в кэш попадает без метрик)
+
+        Deadline запроса включает вычисление ключа кэша; если ключ не
+        успел вычислиться, анализ идет без кэша с оставшимся временем.
+        Частичные (partial) результаты не кэшируются.
+
+        Запрос без deadline с ключом присоединяется к уже выполняющемуся
+        анализу с тем же ключом. Общий анализ не привязан к контексту
+        запроса: сообщения и прогресс получают все, кто ждет его в данный
+        момент, а уход любого из них (включая запустившего) анализ не
+        прерывает. Метрики этапов общего анализа записываются в запрос,
+        который его запустил. Запросы с deadline выполняются отдельно:
+        их частичный результат зависит от собственного deadline.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if params.deadline_seconds is None else loop.time() + params.deadline_seconds
+        with metrics.stage("fingerprint"):
+            try:
+                async with asyncio.timeout_at(deadline):
+                    key = await self.cache_key(params)
+            except TimeoutError:
+                key = None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                recorder = metrics.current_recorder()
+                if recorder is not None:
+                    recorder.cache_hit = True
+                await ctx.debug("Результат взят из кэша: состояние репозитория не изменилось")
+                if self.watcher is not None:
+                    await self.watcher.watch(params)
+                return cached
+
+        if key is not None and deadline is None and self.settings.coalesce_requests:
+            listeners = self._listeners.get(key)
+            if listeners is None:
+                listeners = self._listeners[key] = BroadcastContext()
+            listeners.add(ctx)
+            try:
+                result = await self.analyses.run(key, lambda: self._analyze(params, listeners, key))
+            finally:
+                listeners.remove(ctx)
+                if not listeners.listeners and self._listeners.get(key) is listeners:
+                    del self._listeners[key]
+            # У каждого ожидающего своя копия общего результата
+            return result.model_copy()
+        return await self._analyze(params, ctx, key, deadline)
+
+    async def _analyze(
+        self,
+        params: GetTextCommitParams,
+        ctx: LogContext,
+        key: Optional[Tuple[Hashable, ...]],
+        deadline: Optional[float] = None
+    ) -> GetTextCommitResult:
+        """Новый анализ; результат кладется в кэш по key (кроме partial)"""
+        loop = asyncio.get_running_loop()
+        result = await CommitTextGenerator.analyze(
+            params.working_directory,
+            params.style or "conventional",
+            ctx,
+            streaming=params.streaming,
+            deadline_seconds=None if deadline is None else max(deadline - loop.time(), 0.0)
+        )
+
+        if key is not None and not result.partial:
+            self.cache.put(key, result)
+            if self.watcher is not None:
+                await self.watcher.watch(params)
+        return result
+
+    async def cache_key(self, params: GetTextCommitParams) -> Optional[Tuple[Hashable, ...]]:
+        """Ключ кэша и объединения запросов: отпечаток состояния репозитория + стиль
+
+        Отпечаток вычисляется для каждого запроса: изменения, сделанные до
+        запроса, всегда учитываются. Режим streaming в ключ не входит: он
+        меняет только способ чтения diff, а не результат (частичные
+        результаты бывают только с deadline и не кэшируются и не
+        объединяются).
+        """
+        if self.settings.result_cache_size <= 0 and not self.settings.coalesce_requests:
+            return None
+        working_directory = params.working_directory or str(Path.cwd())
+        fingerprint = await GitAnalyzer(working_directory).state_fingerprint()
+        if fingerprint is None:
+            return None
+        return (fingerprint, params.style or "conventional")
@@ -4,15 +4,19 @@ Core Commit Text Generator
 Основной модуль для объединения всех компонентов генерации commit messages.
 """
 
+import asyncio
 import logging
-from typing import Optional
+from contextlib import aclosing
+from typing import Dict, Optional, Tuple
 
-from mcp.server.fastmcp import Context
-
-from .commit_generator import ConventionalCommitGenerator
+from . import metrics
+from .commit_generator import ConventionalCommitGenerator, KeyChangeCollector
 from .commit_type_detector import CommitTypeDetector
+from .diff_scoring import DiffScorer
 from .git_analyzer import GitAnalyzer
-from .models import GetTextCommitResult, GitAnalysisError, GitCommandError
+from .log_context import LogContext
+from .models import GetTextCommitResult, GitAnalysisError, GitCommandError, NotAGitRepositoryError
+from .progress import AnalysisProgress
 
 
 class CommitTextGenerator:
@@ -22,7 +26,9 @@ class CommitTextGenerator:
     async def generate(
         working_directory: Optional[str] = None,
         style: str = "conventional",
-        logger: Optional[Context] = None
+        logger: Optional[LogContext] = None,
+        streaming: bool = False,
+        deadline_seconds: Optional[float] = None
     ) -> GetTextCommitResult:
         logging.info("--- 2. Внутри CommitTextGenerator.generate ---")
         """
@@ -32,65 +38,169 @@ class CommitTextGenerator:
             working_directory: Путь к git репозиторию
             style: Стиль commit message (только 'conventional' пока)
             logger: Context для логирования
+            streaming: Потоковая обработка diff по hunk'ам без загрузки
+                всего diff в память
+            deadline_seconds: Ограничение времени анализа (см. analyze)
             
         Returns:
             GetTextCommitResult с готовым commit message
         """
-        ctx = logger or _DummyContext()
+        ctx: LogContext = logger or _DummyContext()
         
         try:
+            return await CommitTextGenerator.analyze(working_directory, style, ctx, streaming, deadline_seconds)
+        except Exception as e:
+            return await CommitTextGenerator.error_result(e, ctx)
 
-            await ctx.info("Анализ git изменений...")
+    @staticmethod
+    async def analyze(
+        working_directory: Optional[str],
+        style: str,
+        ctx: LogContext,
+        streaming: bool = False,
+        deadline_seconds: Optional[float] = None
+    ) -> GetTextCommitResult:
+        """
+        Выполняет анализ без graceful fallback: ошибки пробрасываются
 
-            if not await GitAnalyzer.is_git_repository(working_directory):
-                await ctx.error("Директория не является git репозиторием")
-                raise ValueError("Not a git repository")
+        Используется там, где нужно отличать настоящий результат от
+        fallback-ответа (например, при кэшировании результатов).
 
-            analyzer = GitAnalyzer(working_directory)
-            
-            logging.info("--- 3. Сейчас будет вызван GitAnalyzer ---")
-            git_data = await analyzer.collect_git_data()
-            logging.info("--- 4. GitAnalyzer успешно отработал! ---")
-
-            if not git_data["staged_files"]:
-                await ctx.warning("Нет staged изменений для коммита")
-                return GetTextCommitResult(
-                    commit_text="",
-                    confidence=0.0,
-                    files_analyzed=0,
-                    has_changes=False
-                )
+        С deadline_seconds diff читается потоково: по истечении времени
+        процессы git останавливаются, а результат строится по уже
+        прочитанным файлам (partial=True, confidence снижен). Отмена
+        запроса так же останавливает процессы git и пробрасывается.
 
-            await ctx.info(f"Найдено файлов: {len(git_data['staged_files'])}")
+        Ход анализа (файлы, прочитанный diff, оцененные файлы,
+        предварительный тип) отправляется через ctx.report_progress.
+        """
+        await ctx.info("Анализ git изменений...")
+        deadline = None
+        if deadline_seconds is not None:
+            deadline = asyncio.get_running_loop().time() + deadline_seconds
+            # Прочитанная часть diff сохраняется только при потоковой обработке
+            streaming = True
 
-            detector = CommitTypeDetector()
-            commit_type, type_confidence = detector.detect_commit_type(
-                git_data["staged_files"], 
-                git_data["staged_diff"]
+        analyzer = GitAnalyzer(working_directory)
+        
+        logging.info("--- 3. Сейчас будет вызван GitAnalyzer ---")
+        try:
+            # Проверка репозитория выполняется тем же вызовом git status
+            with metrics.stage("git_collection"):
+                async with asyncio.timeout_at(deadline):
+                    git_data = await analyzer.collect_git_data(include_diff=not streaming, diff_text=False)
+        except NotAGitRepositoryError:
+            await ctx.error("Директория не является git репозиторием")
+            raise ValueError("Not a git repository")
+        except TimeoutError:
+            await ctx.warning("Deadline истек до получения списка изменений")
+            return GetTextCommitResult(
+                commit_text="chore: update project files",
+                confidence=0.1,
+                files_analyzed=0,
+                has_changes=True,
+                partial=True
+            )
+        logging.info("--- 4. GitAnalyzer успешно отработал! ---")
+
+        if not git_data["staged_files"]:
+            await ctx.warning("Нет staged изменений для коммита")
+            return GetTextCommitResult(
+                commit_text="",
+                confidence=0.0,
+                files_analyzed=0,
+                has_changes=False
             )
 
-            await ctx.info(f"Определен тип: {commit_type} (confidence: {type_confidence:.2f})")
+        await ctx.info(f"Найдено файлов: {len(git_data['staged_files'])}")
+
+        detector = CommitTypeDetector(git_data.get("commit_types"))
+        generator = ConventionalCommitGenerator(git_data["project_rules"], git_data.get("scopes"))
+
+        omitted_line_counts = _omitted_line_counts(git_data)
+        if git_data.get("omitted_files"):
+            await ctx.info(f"Patch не загружался для {len(git_data['omitted_files'])} файлов (учтены по numstat)")
+
+        change_set = git_data.get("change_set")
+        patch_files = len(git_data["staged_files"]) - len(git_data.get("omitted_files") or [])
+        progress = AnalysisProgress(ctx)
+        await progress.files_collected(
+            patch_files, change_set.patch_bytes if change_set is not None and not streaming else None
+        )
+        # Тип по путям файлов доступен до разбора diff; тот же scan продолжается по diff
+        renames = git_data.get("renames") or {}
+        scan = detector.start_scan(git_data["staged_files"], renames, git_data.get("history_prior"))
+        await progress.provisional_type(*scan.result())
 
-            generator = ConventionalCommitGenerator(git_data["project_rules"])
+        partial = False
+        with metrics.stage("detection"):
+            if streaming:
+                # Детектор и генератор потребляют один поток записей diff
+                collector = KeyChangeCollector()
+                collector.add_line_counts(*omitted_line_counts)
+                files_started = 0
+                bytes_read = 0
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        async with aclosing(analyzer.stream_diff(git_data.get("patch_pathspecs"))) as chunks:
+                            async for chunk in chunks:
+                                files_started += chunk.is_file_header
+                                bytes_read += len(chunk.text)
+                                scan.feed(chunk.text)
+                                collector.feed(chunk.text)
+                                await progress.diff_read(files_started, bytes_read)
+                except TimeoutError:
+                    partial = True
+                collector.add_renames(renames)
+                commit_type, type_confidence = scan.result()
+                key_changes = collector.result()
+                if partial:
+                    # Последний начатый файл мог быть прочитан не полностью
+                    files_read = max(files_started - 1, 0)
+                    type_confidence = partial_confidence(type_confidence, files_read / max(patch_files, 1))
+                    await ctx.warning(f"Deadline истек: diff прочитан для {files_read} из {patch_files} файлов")
+            else:
+                # Большие diff оцениваются по файлам в пуле воркеров;
+                # patch из change_set декодируется по файлам при оценке
+                diff_score = await DiffScorer(detector).score(
+                    git_data["staged_files"],
+                    change_set if change_set is not None else git_data["staged_diff"],
+                    omitted_line_counts,
+                    scan=scan,
+                    progress=progress,
+                    renames=renames
+                )
+                commit_type, type_confidence = diff_score.commit_type, diff_score.confidence
+                key_changes = diff_score.key_changes
+
+        await ctx.info(f"Определен тип: {commit_type} (confidence: {type_confidence:.2f})")
+        await progress.finished(commit_type)
+
+        with metrics.stage("generation"):
             commit_text = await generator.generate_commit_message(
                 commit_type=commit_type,
                 staged_files=git_data["staged_files"],
-                staged_diff=git_data["staged_diff"],
+                staged_diff=git_data.get("staged_diff"),
                 confidence=type_confidence,
-                ctx=ctx
+                ctx=ctx,
+                key_changes=key_changes
             )
 
-            await ctx.info("Commit message готов!")
+        await ctx.info("Commit message готов!")
 
-            return GetTextCommitResult(
-                commit_text=commit_text,
-                confidence=type_confidence,
-                files_analyzed=len(git_data["staged_files"]),
-                has_changes=True
-            )
+        return GetTextCommitResult(
+            commit_text=commit_text,
+            confidence=type_confidence,
+            files_analyzed=len(git_data["staged_files"]),
+            has_changes=True,
+            partial=partial
+        )
 
-        except GitCommandError as e:
-            await ctx.error(f"Git ошибка: {str(e)}")
+    @staticmethod
+    async def error_result(error: Exception, ctx: LogContext) -> GetTextCommitResult:
+        """Graceful fallback результат для ошибки анализа"""
+        if isinstance(error, GitCommandError):
+            await ctx.error(f"Git ошибка: {str(error)}")
             return GetTextCommitResult(
                 commit_text="chore: misc changes",
                 confidence=0.2,
@@ -98,27 +208,51 @@ class CommitTextGenerator:
                 has_changes=True
             )
 
-        except Exception as e:
-            await ctx.error(f"Неожиданная ошибка: {str(e)}")
-            return GetTextCommitResult(
-                commit_text="chore: update project files",
-                confidence=0.1,
-                files_analyzed=0,
-                has_changes=True
-            )
+        await ctx.error(f"Неожиданная ошибка: {str(error)}")
+        return GetTextCommitResult(
+            commit_text="chore: update project files",
+            confidence=0.1,
+            files_analyzed=0,
+            has_changes=True
+        )
+
+
+def partial_confidence(confidence: float, fraction_read: float) -> float:
+    """Confidence результата по части diff: от половины до полного по доле прочитанных файлов"""
+    return round(confidence * (0.5 + 0.5 * min(max(fraction_read, 0.0), 1.0)), 3)
+
+
+def _omitted_line_counts(git_data: Dict) -> Tuple[int, int]:
+    """Сумма numstat по файлам, patch которых не загружался"""
+    numstat = git_data.get("numstat") or {}
+    added = removed = 0
+    for path in git_data.get("omitted_files") or []:
+        file_added, file_removed = numstat.get(path, (None, None))
+        added += file_added or 0
+        removed += file_removed or 0
+    return added, removed
 
 
 class _DummyContext:
     """Dummy Context для случаев когда нет настоящего логгера"""
     
-    async def info(self, message: str):
+    async def info(self, message: str) -> None:
         print(f"INFO: {message}")
         
-    async def warning(self, message: str):
+    async def warning(self, message: str) -> None:
         print(f"WARNING: {message}")
         
-    async def error(self, message: str):
+    async def error(self, message: str) -> None:
         print(f"ERROR: {message}")
         
-    async def debug(self, message: str):
+    async def debug(self, message: str) -> None:
         print(f"DEBUG: {message}")
+
+    async def report_progress(
+        self,
+        progress: float,
+        total: Optional[float] = None,
+        message: Optional[str] = None
+    ) -> None:
+        # Прогресс выводится только в MCP клиент
+        pass
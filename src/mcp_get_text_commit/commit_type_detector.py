@@ -6,7 +6,14 @@ Commit Type Detection with Pattern Matching
 
 import re
 from dataclasses import dataclass
-from typing import List, Pattern, Tuple
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Pattern, Set, Tuple, cast
+
+from .moved_lines import MovedLineIndex
+from .pattern_scanner import MultiPatternScanner, count_matching_paths
+
+# Перемещение кода: доля перемещенных строк и минимум строк для вывода refactor
+MOVED_CODE_FRACTION = 0.8
+MOVED_CODE_MIN_LINES = 6
 
 
 @dataclass
@@ -18,6 +25,64 @@ class CommitTypePattern:
     priority: int = 1
 
 
+# Наборы типов, собранные в процессе воркера пула: key -> набор
+_RESTORED: Dict[Hashable, "CompiledCommitTypes"] = {}
+MAX_RESTORED = 16
+
+
+class CompiledCommitTypes:
+    """Набор типов коммитов, скомпилированный в один сканер diff
+
+    Ключи целей сканера: (тип, "pattern"|"keyword", индекс). key -
+    идентификатор версии набора: при передаче в процессы пула
+    сериализуются только исходные типы, а сканер собирается в каждом
+    воркере один раз на key.
+    """
+
+    def __init__(self, commit_types: Dict[str, CommitTypePattern], key: Hashable = None):
+        self.commit_types = commit_types
+        self.key = key
+        self.scanner = MultiPatternScanner.build(
+            patterns=[
+                ((commit_type, "pattern", index), regex)
+                for commit_type, pattern in commit_types.items()
+                for index, regex in enumerate(pattern.patterns)
+            ],
+            keywords=[
+                ((commit_type, "keyword", index), keyword)
+                for commit_type, pattern in commit_types.items()
+                for index, keyword in enumerate(pattern.keywords)
+            ]
+        )
+
+    def count_file_hits(self, staged_files: List[str]) -> Dict[str, int]:
+        """Считает совпадения (файл, паттерн файла) для каждого типа"""
+        return {
+            commit_type: sum(
+                count_matching_paths(file_regex, staged_files)
+                for file_regex in pattern.file_patterns
+            )
+            for commit_type, pattern in self.commit_types.items()
+        }
+
+    def __reduce__(
+        self
+    ) -> Tuple[Callable[..., "CompiledCommitTypes"], Tuple[Dict[str, CommitTypePattern], Hashable]]:
+        return _restore_compiled, (self.commit_types, self.key)
+
+
+def _restore_compiled(commit_types: Dict[str, CommitTypePattern], key: Hashable) -> CompiledCommitTypes:
+    """Набор типов в процессе воркера (из кэша по key)"""
+    if key is None:
+        return CompiledCommitTypes(commit_types)
+    compiled = _RESTORED.get(key)
+    if compiled is None:
+        if len(_RESTORED) >= MAX_RESTORED:
+            _RESTORED.pop(next(iter(_RESTORED)))
+        compiled = _RESTORED[key] = CompiledCommitTypes(commit_types, key)
+    return compiled
+
+
 class CommitTypeDetector:
     """Детектор типа коммита с использованием pattern matching"""
 
@@ -85,38 +150,58 @@ class CommitTypeDetector:
         )
     }
 
+    _compiled: Optional[CompiledCommitTypes] = None
+
+    def __init__(self, commit_types: Optional[CompiledCommitTypes] = None):
+        """commit_types - реестр правил репозитория (rule_registry); None - COMMIT_TYPES"""
+        self._commit_types = commit_types
+
+    @classmethod
+    def compiled(cls) -> CompiledCommitTypes:
+        """Скомпилированные COMMIT_TYPES; компилируются один раз на класс"""
+        compiled = cls.__dict__.get("_compiled")
+        if compiled is None or compiled.commit_types is not cls.COMMIT_TYPES:
+            compiled = CompiledCommitTypes(cls.COMMIT_TYPES, key=f"{cls.__module__}.{cls.__qualname__}")
+            cls._compiled = compiled
+        return compiled
+
+    @property
+    def types(self) -> CompiledCommitTypes:
+        """Набор типов детектора: реестр репозитория или встроенные типы"""
+        return self._commit_types if self._commit_types is not None else self.compiled()
+
     def detect_commit_type(self, staged_files: List[str], staged_diff: str) -> Tuple[str, float]:
         """Определяет тип коммита на основе файлов и diff"""
-        scores = {
-            commit_type: self._calculate_type_score(commit_type, pattern, staged_files, staged_diff)
-            for commit_type, pattern in self.COMMIT_TYPES.items()
-        }
-        
-        if self._is_docs_only(staged_files):
-            return "docs", 0.95
-            
-        best_type = max(scores.items(), key=lambda x: x[1])
-        return best_type[0], min(best_type[1], 0.95)
+        scan = self.start_scan(staged_files)
+        scan.feed(staged_diff)
+        return scan.result()
+
+    def start_scan(
+        self,
+        staged_files: List[str],
+        renames: Optional[Dict[str, Tuple[str, int]]] = None,
+        prior: Optional[Dict[str, float]] = None
+    ) -> "CommitTypeScan":
+        """Начинает инкрементальное определение типа по частям diff
+
+        renames - переименованные файлы {новый путь: (исходный путь,
+        процент сходства)} из метаданных git (collect_git_data).
+        prior - добавки к score типов по истории коммитов тех же путей.
+        """
+        return CommitTypeScan(self, staged_files, renames, prior)
 
     def _calculate_type_score(
-        self, 
-        commit_type: str, 
-        pattern: CommitTypePattern, 
-        staged_files: List[str], 
-        staged_diff: str
+        self,
+        pattern: CommitTypePattern,
+        file_hits: int,
+        pattern_hits: int,
+        keyword_hits: int
     ) -> float:
         """Вычисляет score для конкретного типа коммита"""
-        score = sum(0.3 for regex in pattern.patterns if regex.search(staged_diff))
-        
-        score += sum(
-            0.4 for file_path in staged_files 
-            for file_regex in pattern.file_patterns 
-            if file_regex.search(file_path)
-        )
-        
-        diff_lower = staged_diff.lower()
-        score += sum(0.2 for keyword in pattern.keywords if keyword in diff_lower)
-        
+        # Пошаговое суммирование сохраняет прежнюю арифметику score
+        score = sum([0.3] * pattern_hits)
+        score += sum([0.4] * file_hits)
+        score += sum([0.2] * keyword_hits)
         score += pattern.priority * 0.1
         return min(score, 1.0)
 
@@ -127,3 +212,97 @@ class CommitTypeDetector:
             
         doc_pattern = re.compile(r'\.(md|txt|rst)$|README|TODO|CHANGELOG', re.IGNORECASE)
         return all(doc_pattern.search(file_path) for file_path in staged_files)
+
+
+class CommitTypeScan:
+    """Состояние определения типа коммита при потоковой обработке diff
+
+    Все паттерны и ключевые слова ищутся одним сканером за один проход
+    по каждой части diff; найденная цель дальше не проверяется, так как
+    score зависит только от факта совпадения.
+
+    Переименования и перемещения определяются по метаданным и строкам
+    diff, а не по словам: только переименованные без изменений файлы
+    или diff из перемещенного кода дают refactor, каждый переименованный
+    файл учитывается как совпадение файлового паттерна refactor.
+
+    Априорные добавки из истории (prior) прибавляются к score известных
+    типов: при равных признаках diff выигрывает тип, который команда
+    обычно использует для этих путей.
+    """
+
+    def __init__(
+        self,
+        detector: CommitTypeDetector,
+        staged_files: List[str],
+        renames: Optional[Dict[str, Tuple[str, int]]] = None,
+        prior: Optional[Dict[str, float]] = None
+    ):
+        self.detector = detector
+        self.staged_files = staged_files
+        self.renames = renames or {}
+        self.prior = prior or {}
+        compiled = detector.types
+        self._file_hits = compiled.count_file_hits(staged_files)
+        if "refactor" in self._file_hits:
+            self._file_hits["refactor"] += len(self.renames)
+        self._scan = compiled.scanner.start()
+        self._commit_types = compiled.commit_types
+        self.moved = MovedLineIndex()
+
+    def feed(self, diff_text: str) -> None:
+        """Учитывает очередную часть diff"""
+        self._scan.feed(diff_text)
+        self.moved.feed(diff_text)
+
+    @property
+    def found(self) -> Set[Hashable]:
+        """Найденные паттерны и ключевые слова"""
+        return self._scan.found
+
+    def merge(self, found: Iterable[Hashable], moved: Optional[MovedLineIndex] = None) -> None:
+        """Учитывает совпадения и строки, найденные в другой части diff"""
+        self._scan.update(found)
+        if moved is not None:
+            self.moved.merge(moved)
+
+    def result(self) -> Tuple[str, float]:
+        """Возвращает тип коммита и уверенность по накопленным данным"""
+        pattern_hits: Dict[str, int] = {}
+        keyword_hits: Dict[str, int] = {}
+        for key in self._scan.found:
+            # Ключи целей: (тип, "pattern"|"keyword", индекс)
+            commit_type, kind, _ = cast(Tuple[str, str, int], key)
+            hits = pattern_hits if kind == "pattern" else keyword_hits
+            hits[commit_type] = hits.get(commit_type, 0) + 1
+
+        scores = {
+            commit_type: self.detector._calculate_type_score(
+                pattern,
+                file_hits=self._file_hits[commit_type],
+                pattern_hits=pattern_hits.get(commit_type, 0),
+                keyword_hits=keyword_hits.get(commit_type, 0)
+            )
+            for commit_type, pattern in self._commit_types.items()
+        }
+        for commit_type, bonus in self.prior.items():
+            if commit_type in scores:
+                scores[commit_type] = min(scores[commit_type] + bonus, 1.0)
+
+        if "docs" in scores and self.detector._is_docs_only(self.staged_files):
+            return "docs", 0.95
+
+        if "refactor" in scores:
+            if self._is_pure_rename():
+                return "refactor", 0.9
+            if self.moved.lines >= MOVED_CODE_MIN_LINES and self.moved.moved_fraction() >= MOVED_CODE_FRACTION:
+                return "refactor", 0.85
+
+        best_type = max(scores.items(), key=lambda x: x[1])
+        return best_type[0], min(best_type[1], 0.95)
+
+    def _is_pure_rename(self) -> bool:
+        """Все файлы только переименованы (содержимое не менялось)"""
+        return bool(self.staged_files) and all(
+            self.renames.get(path, ("", -1))[1] == 100 for path in self.staged_files
+        )
@@ -0,0 +1,177 @@
+"""
+Настройки MCP Get Text Commit
+
+Параметры производительности и поведения, задаваемые через переменные
+окружения с префиксом MCP_GET_TEXT_COMMIT_.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from .exclusions import DEFAULT_EXCLUDE_GLOBS
+
+
+class Settings(BaseSettings):
+    """Настройки сервера и анализа"""
+
+    model_config = SettingsConfigDict(env_prefix="MCP_GET_TEXT_COMMIT_")
+
+    parallel_threshold_bytes: int = Field(
+        default=32 * 1024 * 1024,
+        ge=0,
+        description="Размер diff, начиная с которого файлы оцениваются в пуле процессов"
+    )
+    parallel_max_workers: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Число воркеров пула (по умолчанию: число CPU)"
+    )
+    patch_budget_bytes: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Бюджет байт patch: сначала numstat по всем файлам, затем patch "
+                    "только для крупнейших файлов в пределах бюджета (None - весь diff)"
+    )
+    patch_max_files: int = Field(
+        default=200,
+        ge=1,
+        description="Максимум файлов, для которых загружается patch в бюджетном режиме"
+    )
+    exclude_globs: List[str] = Field(
+        default_factory=lambda: list(DEFAULT_EXCLUDE_GLOBS),
+        description="Glob-паттерны файлов, patch которых не читается (lockfile'ы, "
+                    "минифицированные и сгенерированные файлы); учитываются по numstat"
+    )
+    exclude_generated: bool = Field(
+        default=True,
+        description="Исключать файлы с атрибутами linguist-generated и -diff из .gitattributes"
+    )
+    exclude_max_changed_lines: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Не читать patch файлов с большим числом измененных строк (None - без порога)"
+    )
+    rename_detection: bool = Field(
+        default=True,
+        description="Поиск переименований (git diff -M): переименованный файл дает "
+                    "только diff содержимого, а не удаление и добавление целиком"
+    )
+    rename_limit: int = Field(
+        default=1000,
+        ge=1,
+        description="Лимит файлов для поиска переименований по сходству (git diff -l); "
+                    "на больших деревьях сверх лимита ищутся только точные переименования"
+    )
+    detect_copies: bool = Field(
+        default=False,
+        description="Поиск копирований среди измененных файлов (git diff -C)"
+    )
+    scope_detection: bool = Field(
+        default=True,
+        description="Scope в subject (type(scope): ...) по пакету монорепозитория, "
+                    "которому принадлежат все измененные файлы"
+    )
+    scope_manifests: List[str] = Field(
+        default_factory=lambda: ["pyproject.toml", "package.json", "composer.json"],
+        description="Имена манифестов, каталоги которых считаются пакетами (scope - имя каталога)"
+    )
+    scope_map: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Дополнительная карта {префикс пути: scope}; переопределяет пакеты из манифестов"
+    )
+    history_enabled: bool = Field(
+        default=True,
+        description="Учитывать типы прошлых коммитов для тех же путей (индекс истории в .git)"
+    )
+    history_weight: float = Field(
+        default=0.3,
+        ge=0,
+        description="Вес распределения типов по истории в score детектора"
+    )
+    history_max_commits: int = Field(
+        default=5000,
+        ge=1,
+        description="Максимум коммитов, читаемых при построении или обновлении индекса истории"
+    )
+    history_max_files_per_commit: int = Field(
+        default=100,
+        ge=1,
+        description="Коммиты с большим числом файлов (массовые правки) не индексируются"
+    )
+    range_max_commit_bytes: int = Field(
+        default=4 * 1024 * 1024,
+        ge=1,
+        description="Максимум байт вывода git log -p одного коммита в режиме диапазона "
+                    "(остаток patch не читается, файлы учитываются по numstat)"
+    )
+    range_batch_bytes: int = Field(
+        default=256 * 1024,
+        ge=1,
+        description="Объем patch коммитов диапазона, передаваемых воркеру одной задачей"
+    )
+    batch_max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        description="Максимум одновременно анализируемых репозиториев в пакетном запросе"
+    )
+    result_cache_size: int = Field(
+        default=128,
+        ge=0,
+        description="Максимум результатов в LRU кэше сервера (0 - кэш отключен)"
+    )
+    metrics_enabled: bool = Field(
+        default=False,
+        description="Сбор метрик запросов (поле metrics результата и get_server_stats)"
+    )
+    metrics_trace_memory: bool = Field(
+        default=False,
+        description="Пик памяти запроса через tracemalloc (заметно замедляет анализ)"
+    )
+    metrics_window: int = Field(
+        default=1000,
+        ge=1,
+        description="Число последних запросов для расчета перцентилей"
+    )
+    coalesce_requests: bool = Field(
+        default=True,
+        description="Одновременные запросы для одного состояния репозитория и стиля "
+                    "ждут один общий анализ"
+    )
+    watch_enabled: bool = Field(
+        default=False,
+        description="Фоновый пересчет результата при изменении .git/index, HEAD или измененных файлов"
+    )
+    watch_poll_interval_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        description="Интервал опроса наблюдаемых репозиториев"
+    )
+    watch_debounce_seconds: float = Field(
+        default=0.5,
+        ge=0,
+        description="Пауза после последнего изменения перед фоновым пересчетом"
+    )
+    watch_max_repos: int = Field(
+        default=16,
+        ge=1,
+        description="Максимум наблюдаемых репозиториев (давно не запрашиваемые вытесняются)"
+    )
+    watch_max_concurrency: int = Field(
+        default=2,
+        ge=1,
+        description="Максимум одновременных фоновых пересчетов"
+    )
+    daemon_socket_path: Optional[str] = Field(
+        default=None,
+        description="Unix socket локального демона (по умолчанию - в XDG_RUNTIME_DIR или "
+                    "в личном каталоге 0700 во временном, см. daemon_client.default_socket_path)"
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Возвращает настройки процесса (читаются из окружения один раз)"""
+    return Settings()
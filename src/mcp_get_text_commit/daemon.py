@@ -0,0 +1,220 @@
+"""
+Local Daemon
+
+Долгоживущий локальный процесс с движком анализа и его прогретыми
+кэшами (результаты, отпечатки индекса, правила проекта, пул воркеров).
+Принимает запросы тонкого клиента (daemon_client) через Unix socket:
+повторные вызовы из CLI и git hook'ов не платят за запуск интерпретатора
+и холодные кэши.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import ValidationError
+
+from .commit_service import CommitService
+from .config import Settings, get_settings
+from .daemon_client import default_socket_path, private_socket_dir
+from .log_context import LoggingContext
+from .models import GetTextCommitBatchParams, GetTextCommitParams
+
+logger = logging.getLogger(__name__)
+
+# Максимальный размер строки запроса
+MAX_REQUEST_BYTES = 1 << 20
+
+
+class DaemonAlreadyRunningError(RuntimeError):
+    """На socket'е уже отвечает другой демон"""
+    pass
+
+
+class CommitDaemon:
+    """Сервер запросов CommitService на Unix socket
+
+    Каждое подключение - одна или несколько строк-запросов JSON, на
+    каждую отправляется строка-ответ. Socket доступен только владельцу.
+    """
+
+    def __init__(
+        self,
+        service: Optional[CommitService] = None,
+        socket_path: Optional[str] = None,
+        settings: Optional[Settings] = None
+    ):
+        self.settings = settings or get_settings()
+        self.service = service or CommitService(self.settings)
+        self.socket_path = Path(socket_path or self.settings.daemon_socket_path or default_socket_path())
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._methods: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+            "ping": self._ping,
+            "get_text_commit": self._get_text_commit,
+            "get_text_commit_batch": self._get_text_commit_batch,
+            "get_server_stats": self._get_server_stats,
+        }
+
+    async def start(self) -> None:
+        """Открывает socket (устаревший socket от завершившегося демона удаляется)
+
+        Socket создается сразу с правами 0600 (umask на время bind), а в
+        личном каталоге по умолчанию - только если каталог принадлежит
+        пользователю и закрыт для остальных.
+
+        Raises:
+            DaemonAlreadyRunningError: на socket'е уже отвечает демон
+            PermissionError: личный каталог socket'а доступен другим пользователям
+        """
+        directory = self.socket_path.parent
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if directory == Path(private_socket_dir()):
+            _check_private_dir(directory)
+
+        if self.socket_path.exists():
+            if await asyncio.to_thread(_is_listening, self.socket_path):
+                raise DaemonAlreadyRunningError(f"Daemon is already running at {self.socket_path}")
+            self.socket_path.unlink()
+
+        umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, path=str(self.socket_path), limit=MAX_REQUEST_BYTES
+            )
+        finally:
+            os.umask(umask)
+        logger.info("Демон слушает %s", self.socket_path)
+
+    async def serve_forever(self) -> None:
+        """Обслуживает запросы до отмены"""
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Закрывает socket и останавливает фоновое наблюдение"""
+        if self._server is not None:
+            self._server.close()
+            # Открытые подключения закрываются вместе с сервером
+            self._server.close_clients()
+            await self._server.wait_closed()
+            self._server = None
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+        if self.service.watcher is not None:
+            await self.service.watcher.close()
+
+    async def handle_request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Обрабатывает один запрос: {"result": ...} или {"error": ...}"""
+        name = message.get("method")
+        method = self._methods.get(name) if isinstance(name, str) else None
+        if method is None:
+            return {"error": f"Unknown method: {name!r}"}
+        params = message.get("params") or {}
+        if not isinstance(params, dict):
+            return {"error": "params must be an object"}
+        try:
+            return {"result": await method(params)}
+        except ValidationError as e:
+            return {"error": f"Invalid params: {e}"}
+        except Exception as e:
+            logger.exception("Ошибка обработки запроса %s", name)
+            return {"error": str(e) or type(e).__name__}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Строка длиннее лимита: дальнейший разбор потока невозможен
+                    await _send(writer, {"error": "Request is too large"})
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError as e:
+                    await _send(writer, {"error": f"Invalid JSON: {e}"})
+                    continue
+                if not isinstance(message, dict):
+                    await _send(writer, {"error": "Request must be an object"})
+                    continue
+                await _send(writer, await self.handle_request(message))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"pid": os.getpid()}
+
+    async def _get_text_commit(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self.service.get_text_commit(GetTextCommitParams.model_validate(params), LoggingContext())
+        return result.model_dump(mode="json")
+
+    async def _get_text_commit_batch(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self.service.get_text_commit_batch(
+            GetTextCommitBatchParams.model_validate(params), LoggingContext()
+        )
+        return result.model_dump(mode="json")
+
+    async def _get_server_stats(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.service.stats().model_dump(mode="json")
+
+
+async def _send(writer: asyncio.StreamWriter, response: Dict[str, Any]) -> None:
+    writer.write(json.dumps(response).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+def _check_private_dir(directory: Path) -> None:
+    """Каталог принадлежит текущему пользователю и закрыт для остальных"""
+    stat = directory.lstat()
+    if stat.st_uid != os.getuid() or not directory.is_dir() or directory.is_symlink():
+        raise PermissionError(f"Socket directory {directory} is not owned by the current user")
+    if stat.st_mode & 0o077:
+        raise PermissionError(f"Socket directory {directory} is accessible by other users")
+
+
+def _is_listening(path: Path) -> bool:
+    """Отвечает ли процесс на socket'е"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def run_daemon(socket_path: Optional[str] = None) -> None:
+    """Запускает демон в текущем процессе до прерывания (Ctrl+C, SIGTERM)"""
+    async def serve() -> None:
+        daemon = CommitDaemon(socket_path=socket_path)
+        await daemon.start()
+        task = asyncio.current_task()
+        if task is not None:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        await daemon.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
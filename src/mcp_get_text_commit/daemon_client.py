@@ -0,0 +1,102 @@
+"""
+Daemon Client
+
+Тонкий клиент локального демона: один запрос JSON-строкой через Unix
+socket, один ответ. Использует только стандартную библиотеку, чтобы
+вызов из CLI и git hook'ов не загружал модули анализа, pydantic и MCP.
+
+Протокол (по строке на сообщение):
+    -> {"method": "get_text_commit", "params": {...}}
+    <- {"result": {...}} или {"error": "..."}
+"""
+
+import json
+import os
+import socket
+import tempfile
+from typing import Any, Dict, Optional
+
+# Переменная окружения совпадает с Settings.daemon_socket_path
+SOCKET_PATH_ENV = "MCP_GET_TEXT_COMMIT_DAEMON_SOCKET_PATH"
+SOCKET_NAME = "mcp-get-text-commit.sock"
+
+# Таймаут подключения к демону (анализ может идти дольше)
+CONNECT_TIMEOUT_SECONDS = 1.0
+
+
+class DaemonError(Exception):
+    """Демон вернул ошибку обработки запроса"""
+    pass
+
+
+class DaemonUnavailableError(DaemonError):
+    """Демон не запущен или не отвечает"""
+    pass
+
+
+def default_socket_path() -> str:
+    """Путь socket'а: из окружения, в XDG_RUNTIME_DIR или в личном каталоге во временном
+
+    Личный каталог (0700, создает демон) нужен потому, что путь во
+    временном каталоге предсказуем и доступен для записи всем.
+    """
+    configured = os.environ.get(SOCKET_PATH_ENV)
+    if configured:
+        return configured
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    return os.path.join(private_socket_dir(), SOCKET_NAME)
+
+
+def private_socket_dir() -> str:
+    """Личный каталог socket'а пользователя во временном каталоге"""
+    return os.path.join(tempfile.gettempdir(), f"mcp-get-text-commit-{os.getuid()}")
+
+
+def request(
+    method: str,
+    params: Optional[Dict[str, Any]] = None,
+    socket_path: Optional[str] = None,
+    timeout: Optional[float] = None
+) -> Any:
+    """Выполняет запрос к демону и возвращает поле result ответа
+
+    Socket другого пользователя не используется: запрос с путями и
+    ответ не должны уходить чужому процессу.
+
+    Raises:
+        DaemonUnavailableError: демон не запущен (нет socket'а, отказ в
+            подключении) или socket принадлежит другому пользователю
+        DaemonError: ошибка обработки запроса на стороне демона
+    """
+    path = socket_path or default_socket_path()
+    try:
+        owner = os.stat(path).st_uid
+    except OSError as e:
+        raise DaemonUnavailableError(f"Daemon is not running at {path}: {e}")
+    if owner != os.getuid():
+        raise DaemonUnavailableError(f"Daemon socket {path} belongs to another user (uid {owner})")
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(CONNECT_TIMEOUT_SECONDS)
+        try:
+            client.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError, PermissionError, socket.timeout) as e:
+            raise DaemonUnavailableError(f"Daemon is not running at {path}: {e}")
+        client.settimeout(timeout)
+
+        message = {"method": method, "params": params or {}}
+        client.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with client.makefile("rb") as reader:
+            line = reader.readline()
+    finally:
+        client.close()
+
+    if not line:
+        raise DaemonUnavailableError(f"Daemon at {path} closed the connection")
+    response = json.loads(line)
+    if "error" in response:
+        raise DaemonError(response["error"])
+    return response.get("result")
@@ -0,0 +1,223 @@
+"""
+Per-File Diff Scoring
+
+Модуль для оценки diff по файлам: определение типа коммита и извлечение
+ключевых изменений. Большие diff оцениваются параллельно в пуле процессов
+(или потоков на free-threaded сборке Python), результаты сливаются в
+порядке файлов и совпадают с последовательной обработкой.
+
+Diff принимается строкой или как ChangeSet: тогда patch файлов передаются
+срезами общего буфера и декодируются только в воркере.
+
+Пакеты файлов можно оценивать и по отдельности (DiffScorer.submit_batches,
+DiffScorer.merge): так commit_range оценивает patch коммитов диапазона в
+том же пуле.
+"""
+
+import asyncio
+import os
+import re
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple, Union
+
+from .change_set import ChangeSet, decode
+from .commit_generator import KeyChangeCollector
+from .commit_type_detector import CommitTypeDetector, CommitTypeScan, CompiledCommitTypes
+from .config import Settings, get_settings
+from .moved_lines import MovedLineIndex
+from .progress import AnalysisProgress
+
+_FILE_BOUNDARY_RE = re.compile(r'^diff --(?:git|cc) ', re.MULTILINE)
+
+# Число пакетов файлов на одного воркера: баланс нагрузки против накладных расходов
+BATCHES_PER_WORKER = 4
+
+# Patch файла: текст или байты (декодируются при оценке)
+FileDiff = Union[str, bytes, memoryview]
+
+_executor: Optional[Executor] = None
+_executor_workers: Optional[int] = None
+
+
+@dataclass
+class DiffScore:
+    """Результат оценки diff"""
+    commit_type: str
+    confidence: float
+    key_changes: List[str]
+
+
+@dataclass
+class BatchResult:
+    """Результат оценки пакета файлов в воркере"""
+    found: Set[Hashable]
+    collector: KeyChangeCollector
+    moved: MovedLineIndex
+
+
+def split_diff_by_file(staged_diff: str) -> List[str]:
+    """Разбивает diff на части по файлам (diff --git ...)"""
+    starts = [match.start() for match in _FILE_BOUNDARY_RE.finditer(staged_diff)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    starts.append(len(staged_diff))
+    return [staged_diff[begin:end] for begin, end in zip(starts, starts[1:]) if end > begin]
+
+
+def _score_batch(commit_types: CompiledCommitTypes, file_diffs: Iterable[FileDiff]) -> BatchResult:
+    """Оценивает пакет файлов (выполняется в воркере)"""
+    scan = commit_types.scanner.start()
+    collector = KeyChangeCollector()
+    moved = MovedLineIndex()
+    for file_diff in file_diffs:
+        text = file_diff if isinstance(file_diff, str) else decode(file_diff)
+        scan.feed(text)
+        collector.feed(text)
+        moved.feed(text)
+    return BatchResult(found=scan.found, collector=collector, moved=moved)
+
+
+def _score_batches(commit_types: CompiledCommitTypes, batches: List[List[FileDiff]]) -> List[BatchResult]:
+    """Оценивает несколько пакетов одной задачей воркера"""
+    return [_score_batch(commit_types, file_diffs) for file_diffs in batches]
+
+
+def _make_batches(file_diffs: List[FileDiff], batch_count: int) -> List[List[FileDiff]]:
+    """Делит файлы на последовательные пакеты примерно равного размера"""
+    total = sum(len(file_diff) for file_diff in file_diffs)
+    target = max(total // max(batch_count, 1), 1)
+    batches: List[List[FileDiff]] = [[]]
+    size = 0
+    for file_diff in file_diffs:
+        if size >= target and batches[-1]:
+            batches.append([])
+            size = 0
+        batches[-1].append(file_diff)
+        size += len(file_diff)
+    return batches
+
+
+def _get_executor(max_workers: Optional[int]) -> Executor:
+    """Возвращает общий пул воркеров (создается при первом использовании)"""
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != max_workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        if getattr(sys, "_is_gil_enabled", lambda: True)():
+            import multiprocessing
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            # Free-threaded сборка: потоки выполняются параллельно без GIL
+            _executor = ThreadPoolExecutor(max_workers=max_workers)
+        _executor_workers = max_workers
+    return _executor
+
+
+class DiffScorer:
+    """Оценка diff: последовательно или параллельно в зависимости от размера"""
+
+    def __init__(self, detector: CommitTypeDetector, settings: Optional[Settings] = None):
+        self.detector = detector
+        self.settings = settings or get_settings()
+
+    def use_parallel(self, staged_diff: Union[str, ChangeSet]) -> bool:
+        """Параллельный режим включается только для больших diff"""
+        size = staged_diff.patch_bytes if isinstance(staged_diff, ChangeSet) else len(staged_diff)
+        return size >= self.settings.parallel_threshold_bytes
+
+    @property
+    def workers(self) -> int:
+        """Число воркеров пула"""
+        return self.settings.parallel_max_workers or os.cpu_count() or 1
+
+    async def score(
+        self,
+        staged_files: List[str],
+        staged_diff: Union[str, ChangeSet],
+        omitted_line_counts: Tuple[int, int] = (0, 0),
+        scan: Optional[CommitTypeScan] = None,
+        progress: Optional[AnalysisProgress] = None,
+        renames: Optional[Dict[str, Tuple[str, int]]] = None
+    ) -> DiffScore:
+        """Определяет тип коммита и ключевые изменения по diff
+
+        omitted_line_counts - добавленные/удаленные строки файлов, patch
+        которых не загружался (учитываются только по numstat). scan -
+        уже начатое определение типа по staged_files (если есть); progress
+        получает число оцененных файлов по мере готовности пакетов.
+        renames - переименованные файлы (как в collect_git_data).
+        """
+        file_diffs: List[FileDiff]
+        if isinstance(staged_diff, ChangeSet):
+            file_diffs = list(staged_diff.iter_patches())
+        else:
+            file_diffs = list(split_diff_by_file(staged_diff))
+        if self.use_parallel(staged_diff) and len(file_diffs) > 1:
+            results = await self._score_parallel(file_diffs, progress)
+        else:
+            results = [self.score_batch(file_diffs)]
+            if progress is not None:
+                await progress.files_scored(len(file_diffs))
+        return self.merge(
+            scan or self.detector.start_scan(staged_files, renames), results, omitted_line_counts, renames
+        )
+
+    def score_batch(self, file_diffs: Iterable[FileDiff]) -> BatchResult:
+        """Оценивает пакет файлов в текущем потоке"""
+        return _score_batch(self.detector.types, file_diffs)
+
+    def submit_batches(self, batches: List[List[FileDiff]]) -> "asyncio.Future[List[BatchResult]]":
+        """Отправляет пакеты файлов одной задачей в пул воркеров
+
+        Возвращает future со списком результатов в порядке пакетов.
+        Вызывается из event loop; пул создается при первом использовании.
+        """
+        executor = _get_executor(self.settings.parallel_max_workers)
+        if isinstance(executor, ProcessPoolExecutor):
+            # memoryview не сериализуется: в процессы передаются байты
+            batches = [
+                [bytes(file_diff) if isinstance(file_diff, memoryview) else file_diff for file_diff in batch]
+                for batch in batches
+            ]
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(executor, _score_batches, self.detector.types, batches)
+
+    async def _score_parallel(
+        self,
+        file_diffs: List[FileDiff],
+        progress: Optional[AnalysisProgress] = None
+    ) -> List[BatchResult]:
+        """Оценивает пакеты файлов в пуле, не блокируя event loop"""
+        batches = _make_batches(file_diffs, self.workers * BATCHES_PER_WORKER)
+        futures = [self.submit_batches([batch]) for batch in batches]
+        if progress is not None:
+            batch_sizes = {id(future): len(batch) for future, batch in zip(futures, batches)}
+            scored = 0
+            async for future in asyncio.as_completed(futures):
+                await future
+                scored += batch_sizes[id(future)]
+                await progress.files_scored(scored)
+        return [result for results in await asyncio.gather(*futures) for result in results]
+
+    def merge(
+        self,
+        scan: CommitTypeScan,
+        results: List[BatchResult],
+        omitted_line_counts: Tuple[int, int],
+        renames: Optional[Dict[str, Tuple[str, int]]] = None
+    ) -> DiffScore:
+        """Сливает результаты пакетов в порядке файлов"""
+        collector = KeyChangeCollector()
+        collector.add_line_counts(*omitted_line_counts)
+        for result in results:
+            scan.merge(result.found, result.moved)
+            collector.merge(result.collector)
+        collector.add_renames(renames or {})
+
+        commit_type, confidence = scan.result()
+        return DiffScore(commit_type, confidence, collector.result())
@@ -0,0 +1,224 @@
+"""
+Streaming Diff Pipeline
+
+Модуль для потокового разбора git diff на записи по файлам и hunk'ам.
+Позволяет обрабатывать diff любого размера без загрузки его в одну строку.
+Вывод git log -p разбивается на записи коммитов так же инкрементально.
+"""
+
+import codecs
+import re
+from dataclasses import dataclass
+from typing import AsyncGenerator, Iterable, Iterator, List, Optional, Protocol, Tuple
+
+# Граница записи: заголовок файла или заголовок hunk'а в начале строки
+_BOUNDARY_RE = re.compile(r'^(?:diff --(?:git|cc) |@@)', re.MULTILINE)
+_FILE_HEADER_PREFIXES = ("diff --git ", "diff --cc ")
+
+# Максимальный размер одной записи; длинные hunk'и режутся по границе строки
+DEFAULT_MAX_CHUNK_CHARS = 1 << 20
+
+# Размер блока чтения stdout git процесса
+READ_BLOCK_SIZE = 1 << 16
+
+# Начало записи коммита в git log --format=%x1e... (в начале строки или после \0)
+LOG_RECORD_SEPARATOR = b"\x1e"
+_LOG_RECORD_PRECEDING = (ord("\n"), 0)
+
+
+class AsyncByteReader(Protocol):
+    """Источник байт diff (например, asyncio.StreamReader)"""
+
+    async def read(self, n: int = -1) -> bytes: ...
+
+
+@dataclass
+class DiffChunk:
+    """Запись diff: заголовок файла или (часть) hunk'а"""
+    path: str
+    text: str
+    hunk_header: Optional[str] = None
+
+    @property
+    def is_file_header(self) -> bool:
+        """Запись является заголовком файла (diff --git ...)"""
+        return self.hunk_header is None and self.text.startswith(_FILE_HEADER_PREFIXES)
+
+
+def parse_diff_header_path(header_text: str) -> str:
+    """Извлекает путь файла из заголовка файла в diff"""
+    first_line, _, rest = header_text.partition("\n")
+    candidate = ""
+    for line in rest.split("\n"):
+        if line.startswith("+++ ") and line[4:].rstrip("\t") != "/dev/null":
+            candidate = line[4:].rstrip("\t")
+            break
+        if line.startswith("--- ") and line[4:].rstrip("\t") != "/dev/null":
+            candidate = line[4:].rstrip("\t")
+        elif line.startswith("rename to "):
+            return line[len("rename to "):]
+        elif line.startswith("@@ "):
+            break
+
+    if not candidate:
+        # Binary/mode-only изменения: пути есть только в строке diff --git
+        names = first_line.split(" ", 2)[-1]
+        half = (len(names) - 1) // 2
+        if names[half:half + 1] == " " and names[:half][2:] == names[half + 1:][2:]:
+            candidate = names[half + 1:]
+        else:
+            candidate = names.rsplit(" ", 1)[-1]
+
+    candidate = candidate.strip('"')
+    if candidate[:2] in ("a/", "b/"):
+        candidate = candidate[2:]
+    return candidate
+
+
+class DiffChunkParser:
+    """Инкрементальный парсер diff: принимает блоки текста, отдает записи"""
+
+    def __init__(self, max_chunk_chars: int = DEFAULT_MAX_CHUNK_CHARS):
+        self.max_chunk_chars = max_chunk_chars
+        self._pending = ""
+        self._scan_from = 1
+        self._path = ""
+        self._hunk_header: Optional[str] = None
+        self._continuation = False
+
+    def feed(self, text: str) -> List[DiffChunk]:
+        """Добавляет блок текста и возвращает завершенные записи"""
+        if not text:
+            return []
+
+        self._pending += text
+        chunks: List[DiffChunk] = []
+        start = 0
+        for match in _BOUNDARY_RE.finditer(self._pending, max(self._scan_from, 1)):
+            chunks.append(self._make_chunk(self._pending[start:match.start()]))
+            start = match.start()
+
+        self._pending = self._pending[start:]
+        while len(self._pending) > self.max_chunk_chars:
+            # Слишком длинный hunk: отдаем его часть до последней полной строки
+            cut = self._pending.rfind("\n", 0, self.max_chunk_chars) + 1
+            if cut <= 0:
+                break
+            chunks.append(self._make_chunk(self._pending[:cut]))
+            self._pending = self._pending[cut:]
+            self._continuation = True
+
+        # Частичная строка в конце могла оказаться началом новой границы
+        self._scan_from = max(len(self._pending) - len("diff --git "), 1)
+        return chunks
+
+    def close(self) -> List[DiffChunk]:
+        """Завершает разбор и возвращает оставшуюся запись"""
+        chunks = [self._make_chunk(self._pending)] if self._pending else []
+        self._pending = ""
+        self._scan_from = 1
+        return chunks
+
+    def _make_chunk(self, text: str) -> DiffChunk:
+        """Создает запись и обновляет текущий файл/hunk"""
+        if text.startswith(_FILE_HEADER_PREFIXES):
+            self._path = parse_diff_header_path(text)
+            self._hunk_header = None
+        elif text.startswith("@@") and not self._continuation:
+            self._hunk_header = text.split("\n", 1)[0]
+        # Продолжение разрезанного hunk'а сохраняет его заголовок
+        self._continuation = False
+        return DiffChunk(path=self._path, text=text, hunk_header=self._hunk_header)
+
+
+def iter_diff_chunks(
+    diff: Iterable[str] | str,
+    max_chunk_chars: int = DEFAULT_MAX_CHUNK_CHARS
+) -> Iterator[DiffChunk]:
+    """Разбивает diff (строку или последовательность блоков) на записи"""
+    parser = DiffChunkParser(max_chunk_chars)
+    blocks = (diff,) if isinstance(diff, str) else diff
+    for block in blocks:
+        yield from parser.feed(block)
+    yield from parser.close()
+
+
+async def aiter_diff_chunks(
+    reader: AsyncByteReader,
+    max_chunk_chars: int = DEFAULT_MAX_CHUNK_CHARS
+) -> AsyncGenerator[DiffChunk, None]:
+    """Потоково читает байты diff из reader и отдает записи"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parser = DiffChunkParser(max_chunk_chars)
+    while True:
+        block = await reader.read(READ_BLOCK_SIZE)
+        if not block:
+            break
+        for chunk in parser.feed(decoder.decode(block)):
+            yield chunk
+    for chunk in parser.feed(decoder.decode(b"", final=True)) + parser.close():
+        yield chunk
+
+
+class LogRecordSplitter:
+    """Инкрементально делит вывод git log -z --format=%x1e... на записи коммитов
+
+    Строки patch начинаются с " ", "+", "-" или заголовка, поэтому
+    разделитель в начале строки однозначно начинает новую запись. Запись
+    длиннее max_record_bytes обрезается (остаток пропускается), и память
+    ограничена размером одной записи.
+    """
+
+    def __init__(self, max_record_bytes: Optional[int] = None):
+        self.max_record_bytes = max_record_bytes
+        self._record = bytearray()
+        self._truncated = False
+        self._previous = ord("\n")
+
+    def feed(self, block: bytes) -> List[Tuple[bytes, bool]]:
+        """Добавляет блок вывода и возвращает завершенные записи (запись, обрезана ли)"""
+        records: List[Tuple[bytes, bool]] = []
+        start = 0
+        position = block.find(LOG_RECORD_SEPARATOR)
+        while position != -1:
+            preceding = block[position - 1] if position else self._previous
+            if preceding in _LOG_RECORD_PRECEDING:
+                self._append(block, start, position)
+                records.extend(self._flush())
+                start = position
+            position = block.find(LOG_RECORD_SEPARATOR, position + 1)
+        self._append(block, start, len(block))
+        if block:
+            self._previous = block[-1]
+        return records
+
+    def close(self) -> List[Tuple[bytes, bool]]:
+        """Возвращает последнюю запись"""
+        return self._flush()
+
+    def _append(self, block: bytes, start: int, end: int) -> None:
+        if self.max_record_bytes is not None:
+            room = self.max_record_bytes - len(self._record)
+            if end - start > room:
+                self._truncated = True
+                end = start + max(room, 0)
+        self._record += block[start:end]
+
+    def _flush(self) -> List[Tuple[bytes, bool]]:
+        if not self._record:
+            return []
+        record = (bytes(self._record), self._truncated)
+        self._record = bytearray()
+        self._truncated = False
+        return [record]
+
+
+def parse_log_record(record: bytes) -> Tuple[str, str, bytes]:
+    """(SHA, subject, вывод diff коммита) из записи \x1e<SHA>\x1f<subject>\0<diff>"""
+    header, _, body = record.lstrip(LOG_RECORD_SEPARATOR).partition(b"\0")
+    sha, _, subject = header.partition(b"\x1f")
+    return (
+        sha.decode("ascii", errors="ignore"),
+        subject.decode("utf-8", errors="ignore"),
+        body[1:] if body.startswith(b"\n") else body
+    )
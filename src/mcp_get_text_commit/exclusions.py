@@ -0,0 +1,60 @@
+"""
+File Exclusions
+
+Классификация файлов, содержимое diff которых не несет полезной
+информации для commit message: lockfile'ы, минифицированные сборки,
+снапшоты, сгенерированный код (glob-паттерны и атрибуты .gitattributes
+linguist-generated / -diff). Исключение выполняется на уровне pathspec
+git: patch таких файлов не читается, они учитываются только по numstat.
+"""
+
+from typing import Iterable, List, Sequence
+
+# Паттерн без "/" применяется к имени файла в любом каталоге (как в .gitignore),
+# паттерн с "/" - к пути от корня репозитория
+DEFAULT_EXCLUDE_GLOBS = (
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "pnpm-lock.yaml",
+    "*.lock",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*.snap",
+    "*_pb2.py",
+    "*.pb.go",
+)
+
+# Атрибуты .gitattributes: сгенерированные файлы и файлы без текстового diff
+EXCLUDE_ATTRIBUTES = ("linguist-generated", "-diff")
+
+# Pathspec всего репозитория независимо от рабочей директории
+TOP_PATHSPEC = ":/"
+
+
+def _glob_pathspec(pattern: str) -> str:
+    return pattern.lstrip("/") if "/" in pattern else f"**/{pattern}"
+
+
+def exclude_pathspecs(globs: Sequence[str], use_attributes: bool = True) -> List[str]:
+    """Pathspec'и, исключающие файлы (добавляются к включающим)"""
+    specs = [f":(top,exclude,glob){_glob_pathspec(pattern)}" for pattern in globs]
+    if use_attributes:
+        specs.extend(f":(top,exclude,attr:{attribute})" for attribute in EXCLUDE_ATTRIBUTES)
+    return specs
+
+
+def excluded_only_pathspecs(globs: Sequence[str], use_attributes: bool = True) -> List[str]:
+    """Pathspec'и, выбирающие только исключаемые файлы (объединение условий)"""
+    specs = [f":(top,glob){_glob_pathspec(pattern)}" for pattern in globs]
+    if use_attributes:
+        specs.extend(f":(top,attr:{attribute})" for attribute in EXCLUDE_ATTRIBUTES)
+    return specs
+
+
+def literal_pathspecs(paths: Iterable[str], exclude: bool = False) -> List[str]:
+    """Pathspec'и для точных путей от корня репозитория"""
+    magic = ":(top,exclude,literal)" if exclude else ":(top,literal)"
+    return [magic + path for path in paths]
+
@@ -7,16 +7,47 @@ Git Analysis Engine (v4, production-ready)
 import asyncio
 import logging
 from pathlib import Path
-from typing import Dict, Optional
+from typing import AsyncGenerator, Dict, Iterable, List, Optional, Set, Tuple
 
-from .models import GitAnalysisError, GitCommandError
+from .change_set import ChangeSet
+from .config import Settings, get_settings
+from . import metrics
+from .diff_stream import READ_BLOCK_SIZE, DiffChunk, LogRecordSplitter, aiter_diff_chunks, parse_log_record
+from .exclusions import TOP_PATHSPEC, exclude_pathspecs, excluded_only_pathspecs, literal_pathspecs
+from .history_index import LOG_FORMAT, HistoryIndex, parse_log_records
+from .models import GitAnalysisError, GitCommandError, NotAGitRepositoryError
+from .project_rules import ProjectRules, load_project_rules, rules_candidates
+from .rule_registry import load_commit_types, registry_sources
+from .scope_index import ScopeTrie
+from .single_flight import SingleFlight
+
+# Пути .git и корня рабочей копии по рабочей директории (не меняются)
+_REPO_PATHS: Dict[Path, Tuple[Path, Path]] = {}
+
+# id дерева индекса по состоянию файла index: (stat файла, tree id)
+_INDEX_TREES: Dict[Path, Tuple[Tuple[int, int, int], str]] = {}
+
+# Выполняющиеся git write-tree по index: он берет index.lock, поэтому
+# одновременные запросы ждут один процесс, а не падают на блокировке
+_INDEX_TREE_RUNS = SingleFlight()
+
+# Дерево scope по корню рабочей копии: (stat файла index и настройки, дерево)
+_SCOPE_TRIES: Dict[Path, Tuple[Tuple, ScopeTrie]] = {}
+
+# Индекс истории по каталогу .git: (stat HEAD и его reflog, индекс)
+_HISTORY_INDEXES: Dict[Path, Tuple[Tuple, HistoryIndex]] = {}
+
+# Оценка размера patch на одну измененную строку (с контекстом и заголовками hunk)
+ESTIMATED_PATCH_BYTES_PER_LINE = 64
+ESTIMATED_PATCH_HEADER_BYTES = 160
 
 
 class GitAnalyzer:
     """Модуль анализа git изменений с использованием asyncio"""
 
-    def __init__(self, working_directory: Optional[str] = None):
+    def __init__(self, working_directory: Optional[str] = None, settings: Optional[Settings] = None):
         self.working_directory = Path(working_directory) if working_directory else Path.cwd()
+        self.settings = settings or get_settings()
 
     @staticmethod
     async def is_git_repository(working_directory: Optional[str] = None) -> bool:
@@ -31,60 +62,651 @@ class GitAnalyzer:
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE
             )
-            await process.communicate()
+            try:
+                await process.communicate()
+            except BaseException:
+                await terminate_process(process)
+                raise
             return process.returncode == 0
         except Exception:
             return False
 
-    async def collect_git_data(self) -> Dict:
-        """Параллельный сбор git данных для максимальной производительности"""
-        tasks = [
-            # БЫЛО: self._run_git_command("diff --cached --name-only"),
-            self._run_git_command("diff --name-only"),  # Убрали --cached
-
-            # БЫЛО: self._run_git_command("diff --cached"),
-            self._run_git_command("diff"),  # Убрали --cached
-            
-            self._run_git_command("rev-parse --abbrev-ref HEAD"),
-            self._read_project_rules()
-        ]
-        
-        try:
-            staged_files, staged_diff, current_branch, project_rules = await asyncio.gather(*tasks)
-            return {
-                "staged_files": staged_files.strip().split('\n') if staged_files.strip() else [],
-                "staged_diff": staged_diff,
-                "current_branch": current_branch.strip(),
-                "project_rules": project_rules
+    async def collect_git_data(self, include_diff: bool = True, diff_text: bool = True) -> Dict:
+        """Сбор git данных двумя параллельными вызовами git
+
+        git status --porcelain=v2 -z --branch дает проверку репозитория,
+        ветку и коды статусов; git diff -z --numstat -p - список файлов,
+        numstat по каждому файлу и сам diff. При include_diff=False текст
+        diff не собирается: его читают потоково через stream_diff().
+
+        change_set - те же данные в компактном виде (ChangeSet): вывод git
+        хранится одним буфером байт, patch файлов декодируется по запросу.
+        При diff_text=False staged_diff не декодируется целиком и diff
+        доступен только через change_set.
+
+        Файлы, исключенные по glob-паттернам и атрибутам .gitattributes
+        (Settings.exclude_*), отсекаются pathspec'ами: отдельный вызов
+        git diff дает для них только numstat. Они перечислены в
+        excluded_files и omitted_files.
+
+        Если задан Settings.patch_budget_bytes или exclude_max_changed_lines,
+        сбор двухфазный: сначала только numstat, затем patch для файлов в
+        пределах бюджета (без слишком больших). Остальные файлы учитываются
+        только по numstat и перечислены в omitted_files; patch_pathspecs -
+        pathspec'и загруженного patch (None - весь diff).
+
+        project_rules - правила из rules.md рабочей директории и вложенных
+        rules.md в каталогах измененных файлов (ProjectRules или None).
+        scopes - пакеты монорепозитория для scope коммита (scope_trie).
+        commit_types - реестр правил типов коммитов репозитория
+        (CompiledCommitTypes из rule_registry) или None для встроенных.
+        history_prior - {тип: добавка к score} по типам прошлых коммитов
+        для тех же путей (history_index), пустой без истории.
+
+        Переименования ищутся git (rename_args): renames - {новый путь:
+        (исходный путь, процент сходства)} из записей --raw. Patch
+        переименования без изменений содержит только заголовок, поэтому в
+        бюджетном режиме не загружается.
+        """
+        budget = self.settings.patch_budget_bytes
+        max_lines = self.settings.exclude_max_changed_lines
+        excludes = exclude_pathspecs(self.settings.exclude_globs, self.settings.exclude_generated)
+        two_phase = budget is not None or max_lines is not None
+        diff_args = ["diff", "-z", "--raw", "--numstat", *self.rename_args()]
+        if include_diff and not two_phase:
+            diff_args.append("-p")
+        if excludes:
+            diff_args += ["--", TOP_PATHSPEC, *excludes]
+        status, diff_output, paths = await asyncio.gather(
+            self._run_git_status(),
+            self._run_git_bytes(*diff_args),
+            self.repo_paths(),
+            return_exceptions=True
+        )
+        # Ошибка status приоритетна: она говорит, что это не репозиторий
+        for result in (status, diff_output, paths):
+            if isinstance(result, NotAGitRepositoryError):
+                raise result
+        for result in (status, diff_output, paths):
+            if isinstance(result, Exception):
+                raise GitAnalysisError(f"Failed to collect git data: {str(result)}")
+            if isinstance(result, BaseException):
+                raise result
+        # Ошибки уже проброшены выше (проверки для mypy)
+        assert not isinstance(status, BaseException) and not isinstance(paths, BaseException)
+        assert not isinstance(diff_output, BaseException)
+        current_branch, file_status = status
+        _, toplevel = paths
+
+        change_set = ChangeSet.from_numstat_z(diff_output, file_status)
+        numstat = change_set.numstat()
+        excluded_numstat: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+        # Исключенные файлы (только numstat, patch не читается) запрашиваются, лишь
+        # если status показывает изменения рабочей копии, которых нет в основном diff
+        if excludes and any(code[1:] != "." and path not in numstat for path, code in file_status.items()):
+            excluded_only = excluded_only_pathspecs(self.settings.exclude_globs, self.settings.exclude_generated)
+            try:
+                excluded_output = await self._run_git_bytes("diff", "-z", "--numstat", "--", *excluded_only)
+            except Exception as e:
+                raise GitAnalysisError(f"Failed to collect git data: {str(e)}")
+            excluded_set = ChangeSet.from_numstat_z(excluded_output, file_status)
+            excluded_numstat = excluded_set.numstat()
+            if excluded_numstat:
+                change_set = ChangeSet.merge(change_set, excluded_set)
+        all_numstat = change_set.numstat() if excluded_numstat else numstat
+
+        oversized = set()
+        if max_lines is not None:
+            oversized = {
+                path for path, (added, removed) in numstat.items()
+                if added is not None and removed is not None and added + removed > max_lines
             }
-        except Exception as e:
-            raise GitAnalysisError(f"Failed to collect git data: {str(e)}")
+
+        renames = change_set.renames()
+        pure_renames = {change_set.paths[row] for row in range(len(change_set)) if change_set.is_pure_rename(row)}
+        patch_files: Optional[List[str]] = None
+        patch_pathspecs: Optional[List[str]] = [TOP_PATHSPEC, *excludes] if excludes else None
+        if budget is not None:
+            candidates = {
+                path: counts for path, counts in numstat.items()
+                if path not in oversized and path not in pure_renames
+            }
+            patch_files = select_patch_files(candidates, budget, self.settings.patch_max_files)
+            # Исходный путь нужен git, чтобы показать переименование, а не добавление файла
+            patch_pathspecs = literal_pathspecs(
+                patch_files + [renames[path][0] for path in patch_files if path in renames]
+            )
+        elif max_lines is not None:
+            patch_files = [path for path in numstat if path not in oversized]
+            oversized_paths = sorted(oversized | {renames[path][0] for path in oversized if path in renames})
+            patch_pathspecs = [TOP_PATHSPEC, *excludes, *literal_pathspecs(oversized_paths, exclude=True)]
+
+        with_patch = set(numstat) if patch_files is None else set(patch_files) | pure_renames
+        project_rules, scopes, commit_types, history = await asyncio.gather(
+            self._load_project_rules(toplevel, all_numstat),
+            self.scope_trie(),
+            load_commit_types(toplevel),
+            self.history_index()
+        )
+        history_prior: Dict[str, float] = {}
+        if history is not None:
+            weight = self.settings.history_weight
+            history_prior = {
+                commit_type: weight * share for commit_type, share in history.predict(list(all_numstat)).items()
+            }
+        git_data = {
+            "staged_files": list(all_numstat),
+            "current_branch": current_branch,
+            "project_rules": project_rules,
+            "scopes": scopes,
+            "commit_types": commit_types,
+            "history_prior": history_prior,
+            "file_status": change_set.file_status(),
+            "numstat": all_numstat,
+            "patch_files": patch_files,
+            "patch_pathspecs": patch_pathspecs,
+            "excluded_files": [path for path in all_numstat if path in excluded_numstat or path in oversized],
+            "omitted_files": [path for path in all_numstat if path not in with_patch],
+            "renames": renames,
+            "change_set": change_set
+        }
+
+        if include_diff and two_phase:
+            try:
+                patch = await self._fetch_patch_bytes(patch_pathspecs, budget) if patch_pathspecs else b""
+            except Exception as e:
+                raise GitAnalysisError(f"Failed to collect git data: {str(e)}")
+            change_set.attach_patch(patch)
+
+        if include_diff and diff_text:
+            git_data["staged_diff"] = change_set.text()
+        return git_data
+
+    async def _fetch_patch_bytes(self, pathspecs: List[str], max_bytes: Optional[int] = None) -> bytes:
+        """Читает patch для pathspec'ов без декодирования, не больше max_bytes (None - без ограничения)"""
+        if not pathspecs:
+            return b""
+        args = ("diff", "-p", *self.rename_args(), "--", *pathspecs)
+        with metrics.track_git(args) as record:
+            process = await self._spawn_git(*args)
+            assert process.stdout is not None and process.stderr is not None
+            stderr_task = asyncio.ensure_future(process.stderr.read())
+            chunks: List[bytes] = []
+            size = 0
+            completed = False
+            try:
+                while max_bytes is None or size <= max_bytes:
+                    block = await process.stdout.read(READ_BLOCK_SIZE)
+                    if not block:
+                        completed = True
+                        break
+                    chunks.append(block)
+                    size += len(block)
+            finally:
+                if not completed:
+                    # Бюджет исчерпан или чтение прервано (отмена, deadline): останавливаем git
+                    await terminate_process(process)
+                else:
+                    await process.wait()
+                stderr = await stderr_task
+            record.output_bytes = size
+
+        if completed and process.returncode != 0:
+            error_message = stderr.decode('utf-8', errors='ignore').strip()
+            raise GitCommandError(f"Git command failed: {error_message}")
+
+        data = b"".join(chunks)
+        if not completed:
+            # Обрезаем по последней полной строке в пределах бюджета
+            data = data[:data.rfind(b"\n", 0, max_bytes) + 1]
+        return data
+
+    def rename_args(self) -> List[str]:
+        """Аргументы git diff для поиска переименований и копирований
+
+        Лимит -l задается явно: поиск по сходству квадратичен по числу
+        файлов, и на больших деревьях сверх лимита git находит только
+        точные переименования.
+        """
+        if not self.settings.rename_detection:
+            return ["--no-renames"]
+        args = ["-M", f"-l{self.settings.rename_limit}"]
+        if self.settings.detect_copies:
+            args.append("-C")
+        return args
+
+    async def _run_git_status(self) -> Tuple[str, Dict[str, str]]:
+        """git status --porcelain=v2: ветка и коды статусов файлов
+
+        Ошибка "not a git repository" превращается в NotAGitRepositoryError,
+        поэтому отдельная проверка репозитория не нужна.
+        """
+        try:
+            output = await self._run_git_command(
+                "--no-optional-locks status --porcelain=v2 -z --branch --untracked-files=no"
+            )
+        except OSError as e:
+            raise NotAGitRepositoryError(f"Not a git repository: {e}")
+        except GitCommandError as e:
+            if "not a git repository" in str(e).lower():
+                raise NotAGitRepositoryError(str(e))
+            raise
+        return parse_porcelain_v2_status(output)
+
+    async def repo_paths(self) -> Tuple[Path, Path]:
+        """Возвращает (каталог .git, корень рабочей копии); кэшируется"""
+        work_dir = self.working_directory.resolve()
+        paths = _REPO_PATHS.get(work_dir)
+        if paths is None:
+            output = await self._run_git_command("rev-parse --absolute-git-dir --show-toplevel")
+            git_dir, toplevel = output.split("\n")
+            paths = (Path(git_dir), Path(toplevel))
+            _REPO_PATHS[work_dir] = paths
+        return paths
+
+    async def state_fingerprint(self) -> Optional[Tuple]:
+        """Отпечаток состояния репозитория для кэширования результатов
+
+        Включает путь, id дерева индекса (git write-tree) и stat измененных
+        файлов рабочей копии, применимых к ним rules.md (включая вложенные),
+        источников реестра правил типов коммитов и HEAD (новый коммит
+        меняет индекс истории).
+        Возвращает None, если состояние
+        определить нельзя (не репозиторий, конфликт слияния).
+        """
+        try:
+            git_dir, toplevel = await self.repo_paths()
+            tree_id, changed = await asyncio.gather(self._index_tree_id(git_dir), self.changed_files())
+        except (GitCommandError, OSError, ValueError):
+            return None
+
+        changed_paths = [toplevel / path for path in changed]
+        rules_paths = rules_candidates(self.working_directory.resolve(), toplevel, changed)
+        worktree_state = await asyncio.to_thread(
+            _stat_paths, [*changed_paths, *rules_paths, *registry_sources(toplevel), git_dir / "HEAD", git_dir / "logs" / "HEAD"]
+        )
+        return (str(self.working_directory.resolve()), tree_id, worktree_state)
+
+    async def changed_files(self) -> List[str]:
+        """Пути (от корня репозитория) файлов рабочей копии, отличающихся от индекса"""
+        output = await self._run_git_command("diff --name-only -z")
+        return [path for path in output.split("\0") if path]
+
+    async def scope_trie(self) -> Optional[ScopeTrie]:
+        """Дерево пакетов монорепозитория; None, если scope отключен
+
+        Манифесты перечисляются одним git ls-files по всему репозиторию.
+        Набор отслеживаемых файлов меняется только вместе с index, поэтому
+        дерево строится один раз и перестраивается при изменении stat
+        .git/index или настроек scope.
+        """
+        if not self.settings.scope_detection:
+            return None
+        try:
+            git_dir, toplevel = await self.repo_paths()
+        except (GitCommandError, OSError, ValueError):
+            return None
+
+        try:
+            stat = (git_dir / "index").stat()
+            index_key: Optional[Tuple[int, int, int]] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except OSError:
+            index_key = None
+        cache_key = (index_key, tuple(self.settings.scope_manifests), tuple(sorted(self.settings.scope_map.items())))
+        cached = _SCOPE_TRIES.get(toplevel)
+        if index_key is not None and cached is not None and cached[0] == cache_key:
+            return cached[1]
+
+        pathspecs = [f":(top,glob)**/{name}" for name in self.settings.scope_manifests]
+        try:
+            output = await self._run_git_bytes("ls-files", "-z", "--full-name", "--", *pathspecs) if pathspecs else b""
+        except GitCommandError:
+            return None
+        manifests = [path for path in output.decode('utf-8', errors='ignore').split("\0") if path]
+        trie = ScopeTrie.build(manifests, self.settings.scope_map)
+        if index_key is not None:
+            _SCOPE_TRIES[toplevel] = (cache_key, trie)
+        return trie
+
+    async def history_index(self) -> Optional[HistoryIndex]:
+        """Индекс истории коммитов, дополненный коммитами после последнего обновления
+
+        Пока HEAD не сдвигался (stat .git/HEAD и его reflog), индекс берется
+        из памяти без вызова git. Иначе git log читается потоково только
+        для коммитов после проиндексированного head. Если этот коммит больше
+        не предок HEAD (переключение на другую ветку, amend, rebase) или не
+        существует, индекс строится заново: иначе коммиты, уже учтенные в
+        индексе, считались бы повторно.
+        """
+        if not self.settings.history_enabled:
+            return None
+        try:
+            git_dir, _ = await self.repo_paths()
+        except (GitCommandError, OSError, ValueError):
+            return None
+
+        head_state = await asyncio.to_thread(_head_state, git_dir)
+        cached = _HISTORY_INDEXES.get(git_dir)
+        if cached is not None and cached[0] == head_state:
+            return cached[1]
+
+        path = HistoryIndex.path_for(git_dir)
+        index = cached[1] if cached is not None else await asyncio.to_thread(HistoryIndex.load, path)
+        if index is None or (index.head is not None and not await self._is_head_ancestor(index.head)):
+            index = HistoryIndex()
+        try:
+            changed = await self._update_history(index)
+        except GitCommandError:
+            if index.head is None:
+                # Репозиторий без коммитов
+                return None
+            index = HistoryIndex()
+            try:
+                changed = await self._update_history(index)
+            except GitCommandError:
+                return None
+        if changed:
+            try:
+                await asyncio.to_thread(index.save, path)
+            except OSError as e:
+                logging.warning("Индекс истории не сохранен: %s", e)
+        _HISTORY_INDEXES[git_dir] = (head_state, index)
+        return index
+
+    async def _is_head_ancestor(self, revision: str) -> bool:
+        """True, если revision - предок HEAD (или сам HEAD)"""
+        try:
+            await self._run_git("merge-base", "--is-ancestor", revision, "HEAD")
+        except GitCommandError:
+            # Код 1 - не предок; 128 - коммита больше нет
+            return False
+        return True
+
+    async def _update_history(self, index: HistoryIndex) -> bool:
+        """Добавляет в индекс коммиты после index.head; True, если индекс изменился"""
+        revisions = f"{index.head}..HEAD" if index.head else "HEAD"
+        args = (
+            "log", "-z", "--name-only", "--no-merges", "--no-renames",
+            f"--format={LOG_FORMAT}", f"-n{self.settings.history_max_commits}", revisions, "--"
+        )
+        max_files = self.settings.history_max_files_per_commit
+        newest: Optional[str] = None
+        with metrics.track_git(args) as record:
+            process = await self._spawn_git(*args)
+            assert process.stdout is not None and process.stderr is not None
+            stderr_task = asyncio.ensure_future(process.stderr.read())
+            completed = False
+            pending = b""
+            try:
+                while True:
+                    block = await process.stdout.read(READ_BLOCK_SIZE)
+                    record.output_bytes += len(block)
+                    if block:
+                        pending += block
+                        # Полные записи - до последнего разделителя записей
+                        cut = pending.rfind(b"\x1e")
+                        if cut <= 0:
+                            continue
+                        ready, pending = pending[:cut], pending[cut:]
+                    else:
+                        ready, pending = pending, b""
+                    for sha, subject, files in parse_log_records(ready):
+                        newest = newest or sha
+                        index.add_commit(subject, files, max_files)
+                    if not block:
+                        completed = True
+                        break
+            finally:
+                if not completed:
+                    await terminate_process(process)
+                else:
+                    await process.wait()
+                stderr = await stderr_task
+
+        if process.returncode != 0:
+            error_message = stderr.decode('utf-8', errors='ignore').strip()
+            raise GitCommandError(f"Git command failed: {error_message}")
+        if newest is None:
+            return False
+        index.head = newest
+        return True
+
+    async def _index_tree_id(self, git_dir: Path) -> str:
+        """id дерева индекса; git write-tree вызывается только при изменении index
+
+        write-tree блокирует index (index.lock), поэтому одновременные
+        вызовы для одного состояния index ждут один общий процесс.
+        """
+        index_path = git_dir / "index"
+        try:
+            stat = index_path.stat()
+            stat_key: Optional[Tuple[int, int, int]] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except OSError:
+            stat_key = None
+
+        cached = _INDEX_TREES.get(index_path)
+        if stat_key is not None and cached is not None and cached[0] == stat_key:
+            return cached[1]
+
+        tree_id = await _INDEX_TREE_RUNS.run((index_path, stat_key), lambda: self._run_git_command("write-tree"))
+        if stat_key is not None:
+            _INDEX_TREES[index_path] = (stat_key, tree_id)
+        return tree_id
+
+    async def stream_diff(self, pathspecs: Optional[List[str]] = None) -> AsyncGenerator[DiffChunk, None]:
+        """Потоково читает git diff и отдает записи по файлам и hunk'ам
+
+        Вывод git не накапливается целиком: память ограничена размером
+        одной записи, независимо от размера diff. pathspecs ограничивает
+        diff выбранными файлами (patch_pathspecs из collect_git_data).
+        """
+        if pathspecs is not None and not pathspecs:
+            return
+        args = ["diff", *self.rename_args()]
+        if pathspecs is not None:
+            args += ["--", *pathspecs]
+        with metrics.track_git(args) as record:
+            process = await self._spawn_git(*args)
+            assert process.stdout is not None and process.stderr is not None
+            # stderr читаем параллельно, чтобы git не заблокировался на полном pipe
+            stderr_task = asyncio.ensure_future(process.stderr.read())
+
+            try:
+                async for chunk in aiter_diff_chunks(_CountingReader(process.stdout, record)):
+                    yield chunk
+
+                stderr = await stderr_task
+                await process.wait()
+                if process.returncode != 0:
+                    error_message = stderr.decode('utf-8', errors='ignore').strip()
+                    raise GitCommandError(f"Git command failed: {error_message}")
+            finally:
+                # Потребитель прервал чтение: не оставляем процесс git висеть
+                await terminate_process(process)
+                stderr_task.cancel()
+
+    async def stream_log(
+        self,
+        revision_range: str = "HEAD",
+        max_count: Optional[int] = None,
+        max_commit_bytes: Optional[int] = None
+    ) -> AsyncGenerator[Tuple[str, str, bytes, bool], None]:
+        """Потоково читает git log -p диапазона одним процессом git
+
+        Отдает (SHA, subject, вывод diff коммита, обрезан ли) в порядке
+        git log; вывод diff - формат git diff -z --raw --numstat -p
+        (ChangeSet.from_numstat_z). Коммиты слияния пропускаются. Patch
+        коммита длиннее max_commit_bytes обрезается, память ограничена
+        размером одного коммита.
+        """
+        args = [
+            "log", "-z", "--raw", "--numstat", "-p", "--no-color", "--no-merges",
+            f"--format={LOG_FORMAT}", *self.rename_args()
+        ]
+        if max_count is not None:
+            args.append(f"-n{max_count}")
+        # Диапазон из запроса не должен разбираться как опция git
+        args += ["--end-of-options", revision_range, "--"]
+        with metrics.track_git(args) as record:
+            process = await self._spawn_git(*args)
+            assert process.stdout is not None and process.stderr is not None
+            # stderr читаем параллельно, чтобы git не заблокировался на полном pipe
+            stderr_task = asyncio.ensure_future(process.stderr.read())
+            splitter = LogRecordSplitter(max_commit_bytes)
+
+            try:
+                while True:
+                    block = await process.stdout.read(READ_BLOCK_SIZE)
+                    record.output_bytes += len(block)
+                    for commit_record, truncated in splitter.feed(block) if block else splitter.close():
+                        yield (*parse_log_record(commit_record), truncated)
+                    if not block:
+                        break
+
+                stderr = await stderr_task
+                await process.wait()
+                if process.returncode != 0:
+                    error_message = stderr.decode('utf-8', errors='ignore').strip()
+                    raise GitCommandError(f"Git command failed: {error_message}")
+            finally:
+                # Потребитель прервал чтение: не оставляем процесс git висеть
+                await terminate_process(process)
+                stderr_task.cancel()
 
     async def _run_git_command(self, command: str) -> str:
         """Выполнение git команды асинхронно."""
-        command_list = command.split()
-        
-        process = await asyncio.create_subprocess_exec(
-            "git", *command_list,
+        return await self._run_git(*command.split())
+
+    async def _run_git(self, *args: str) -> str:
+        """Выполнение git с готовым списком аргументов (пути с пробелами)."""
+        return (await self._run_git_bytes(*args)).decode('utf-8', errors='ignore').strip()
+
+    async def _run_git_bytes(self, *args: str) -> bytes:
+        """Выполнение git: stdout без декодирования и обрезки пробелов"""
+        with metrics.track_git(args) as record:
+            process = await self._spawn_git(*args)
+            try:
+                stdout, stderr = await process.communicate()
+            except BaseException:
+                # Отмена запроса или истекший deadline: не оставляем процесс git
+                await terminate_process(process)
+                raise
+            record.output_bytes = len(stdout)
+
+        if process.returncode != 0:
+            error_message = stderr.decode('utf-8', errors='ignore').strip()
+            raise GitCommandError(f"Git command failed: {error_message}")
+
+        return stdout
+
+    async def _spawn_git(self, *args: str) -> asyncio.subprocess.Process:
+        """Запускает git процесс в рабочей директории"""
+        return await asyncio.create_subprocess_exec(
+            "git", *args,
             cwd=self.working_directory,
             stdin=asyncio.subprocess.DEVNULL, # Явно закрываем stdin
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
-        stdout, stderr = await process.communicate()
 
-        if process.returncode != 0:
-            error_message = stderr.decode('utf-8', errors='ignore').strip()
-            raise GitCommandError(f"Git command failed: {error_message}")
+    async def _load_project_rules(self, toplevel: Path, changed_paths: Iterable[str]) -> Optional[ProjectRules]:
+        """Правила проекта для измененных файлов (чтение в потоке, с кэшем)"""
+        return await load_project_rules(self.working_directory.resolve(), toplevel, changed_paths)
 
-        return stdout.decode('utf-8', errors='ignore').strip()
 
-    async def _read_project_rules(self) -> Optional[str]:
-        """Чтение rules.md для контекста проекта."""
-        rules_path = self.working_directory / "rules.md"
-        if rules_path.exists():
-            try:
-                return rules_path.read_text(encoding='utf-8')
-            except Exception:
-                return None
-        return None
\ No newline at end of file
+async def terminate_process(process: asyncio.subprocess.Process) -> None:
+    """Останавливает процесс, если он еще работает, и дожидается завершения"""
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+    await process.wait()
+
+
+class _CountingReader:
+    """Reader вывода git, учитывающий прочитанные байты (до декодирования) в записи метрик"""
+
+    def __init__(self, reader: asyncio.StreamReader, record: metrics.GitCommandRecord):
+        self.reader = reader
+        self.record = record
+
+    async def read(self, n: int = -1) -> bytes:
+        block = await self.reader.read(n)
+        self.record.output_bytes += len(block)
+        return block
+
+
+def _head_state(git_dir: Path) -> Tuple[Tuple[str, Optional[int], Optional[int]], ...]:
+    """stat файлов, меняющихся при любом сдвиге HEAD (HEAD и его reflog)"""
+    return _stat_paths([git_dir / "HEAD", git_dir / "logs" / "HEAD"])
+
+
+def _stat_paths(paths: Iterable[Path]) -> Tuple[Tuple[str, Optional[int], Optional[int]], ...]:
+    """(путь, mtime_ns, размер) для каждого файла; None для отсутствующих"""
+    state: List[Tuple[str, Optional[int], Optional[int]]] = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            state.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            state.append((str(path), None, None))
+    return tuple(state)
+
+
+def parse_porcelain_v2_status(output: str) -> Tuple[str, Dict[str, str]]:
+    """Разбирает git status --porcelain=v2 -z --branch
+
+    Returns:
+        (текущая ветка, {путь: код статуса XY})
+    """
+    branch = "HEAD"
+    file_status: Dict[str, str] = {}
+    records = output.split("\0")
+    index = 0
+    while index < len(records):
+        record = records[index]
+        index += 1
+        if record.startswith("# branch.head "):
+            head = record[len("# branch.head "):]
+            # rev-parse --abbrev-ref HEAD возвращает HEAD для detached
+            branch = "HEAD" if head == "(detached)" else head
+        elif record.startswith("1 "):
+            fields = record.split(" ", 8)
+            file_status[fields[8]] = fields[1]
+        elif record.startswith("2 "):
+            fields = record.split(" ", 9)
+            file_status[fields[9]] = fields[1]
+            index += 1  # следующая запись - исходный путь переименования
+        elif record.startswith("u "):
+            fields = record.split(" ", 10)
+            file_status[fields[10]] = fields[1]
+    return branch, file_status
+
+
+def select_patch_files(
+    numstat: Dict[str, Tuple[Optional[int], Optional[int]]],
+    budget_bytes: int,
+    max_files: int
+) -> List[str]:
+    """Выбирает файлы для загрузки patch в пределах бюджета
+
+    Файлы ранжируются по числу измененных строк; файл, не помещающийся
+    в остаток бюджета, пропускается. Бинарные файлы не выбираются:
+    их patch не содержит текста. Порядок результата - порядок numstat.
+    """
+    changed_lines = {
+        path: added + removed for path, (added, removed) in numstat.items()
+        if added is not None and removed is not None
+    }
+    ranked = sorted(changed_lines, key=lambda path: -changed_lines[path])
+    selected: Set[str] = set()
+    remaining = budget_bytes
+    for path in ranked:
+        if len(selected) >= max_files:
+            break
+        estimate = ESTIMATED_PATCH_HEADER_BYTES + 2 * len(path) + changed_lines[path] * ESTIMATED_PATCH_BYTES_PER_LINE
+        if estimate <= remaining:
+            selected.add(path)
+            remaining -= estimate
+    return [path for path in numstat if path in selected]
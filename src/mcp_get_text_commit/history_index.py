@@ -0,0 +1,144 @@
+"""
+History Index
+
+Индекс истории коммитов репозитория: какие типы Conventional Commits
+команда использовала для путей, каталогов и расширений файлов. Строится
+потоковым разбором git log --name-only и дополняется только новыми
+коммитами (от последнего проиндексированного SHA). Хранится компактным
+JSON в каталоге .git и дает детектору априорное распределение типов.
+"""
+
+import json
+import os
+import re
+import tempfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterator, List, Optional, Tuple
+
+INDEX_DIRNAME = "mcp-get-text-commit"
+INDEX_FILENAME = "history.json"
+INDEX_VERSION = 1
+
+# Формат записи git log: \x1e<SHA>\x1f<subject>\0\n<путь>\0<путь>\0...
+LOG_FORMAT = "%x1e%H%x1f%s"
+_RECORD_SEPARATOR = b"\x1e"
+
+# Тип из subject Conventional Commits: type(scope)!: ...
+_SUBJECT_TYPE_RE = re.compile(r'^([a-z]+)(?:\([^)\n]*\))?!?:')
+
+# Вес признаков пути: сам файл, его каталог, расширение
+PATH_WEIGHT = 3
+DIRECTORY_WEIGHT = 2
+EXTENSION_WEIGHT = 1
+
+
+def commit_type_of(subject: str) -> Optional[str]:
+    """Тип коммита по subject; None, если subject не в формате Conventional Commits"""
+    match = _SUBJECT_TYPE_RE.match(subject.strip().lower())
+    return match.group(1) if match else None
+
+
+def path_features(path: str) -> List[Tuple[str, int]]:
+    """Признаки пути с весами: p:<путь>, d:<каталог>, e:<расширение>"""
+    pure = PurePosixPath(path)
+    return [
+        ("p:" + path, PATH_WEIGHT),
+        ("d:" + str(pure.parent), DIRECTORY_WEIGHT),
+        ("e:" + (pure.suffix.lower() or pure.name), EXTENSION_WEIGHT),
+    ]
+
+
+def parse_log_records(data: bytes) -> Iterator[Tuple[str, str, List[str]]]:
+    """Разбирает полные записи вывода git log -z --name-only --format=LOG_FORMAT"""
+    for record in data.split(_RECORD_SEPARATOR):
+        if not record:
+            continue
+        header, _, names = record.partition(b"\0")
+        sha, _, subject = header.partition(b"\x1f")
+        files = [name.decode("utf-8", errors="ignore") for name in names.lstrip(b"\n").split(b"\0") if name]
+        yield sha.decode("ascii", errors="ignore"), subject.decode("utf-8", errors="ignore"), files
+
+
+class HistoryIndex:
+    """Счетчики типов коммитов по признакам путей
+
+    features: {признак: {тип: число коммитов}}; head - последний
+    проиндексированный коммит (начало следующего обновления).
+    """
+
+    def __init__(
+        self,
+        head: Optional[str] = None,
+        commits: int = 0,
+        features: Optional[Dict[str, Dict[str, int]]] = None
+    ):
+        self.head = head
+        self.commits = commits
+        self.features: Dict[str, Dict[str, int]] = features if features is not None else {}
+
+    @staticmethod
+    def path_for(git_dir: Path) -> Path:
+        """Путь файла индекса в каталоге .git"""
+        return git_dir / INDEX_DIRNAME / INDEX_FILENAME
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["HistoryIndex"]:
+        """Читает индекс; None, если файла нет или формат устарел/поврежден"""
+        try:
+            data = json.loads(path.read_bytes())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data.get("head"), data.get("commits", 0), data.get("features", {}))
+
+    def save(self, path: Path) -> None:
+        """Записывает индекс атомарно (параллельные обновления не портят файл)"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": INDEX_VERSION, "head": self.head, "commits": self.commits, "features": self.features}
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=".history-")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle, separators=(",", ":"))
+            os.replace(temporary, path)
+        except BaseException:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            raise
+
+    def add_commit(self, subject: str, files: List[str], max_files: Optional[int] = None) -> bool:
+        """Учитывает коммит; коммиты без типа и слишком большие пропускаются"""
+        commit_type = commit_type_of(subject)
+        if commit_type is None or not files or (max_files is not None and len(files) > max_files):
+            return False
+        for path in files:
+            for feature, _ in path_features(path):
+                counts = self.features.setdefault(feature, {})
+                counts[commit_type] = counts.get(commit_type, 0) + 1
+        self.commits += 1
+        return True
+
+    def predict(self, paths: List[str]) -> Dict[str, float]:
+        """Распределение типов для изменений по истории (сумма <= 1; {} без данных)
+
+        Для каждого известного признака берется доля типов среди его
+        коммитов; доли усредняются с весами признаков по всем файлам.
+        """
+        if not self.features:
+            return {}
+        totals: Dict[str, float] = {}
+        weight_sum = 0
+        for path in paths:
+            for feature, weight in path_features(path):
+                weight_sum += weight
+                counts = self.features.get(feature)
+                if not counts:
+                    continue
+                feature_total = sum(counts.values())
+                for commit_type, count in counts.items():
+                    totals[commit_type] = totals.get(commit_type, 0.0) + weight * count / feature_total
+        if not weight_sum:
+            return {}
+        return {commit_type: total / weight_sum for commit_type, total in totals.items()}
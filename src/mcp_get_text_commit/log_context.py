@@ -0,0 +1,109 @@
+"""
+Log Context
+
+Интерфейс контекста логирования анализа: MCP Context запроса или его
+замены для вызовов без клиента (CLI, демон, фоновые пересчеты) и для
+общего анализа нескольких запросов.
+"""
+
+import logging
+from typing import Awaitable, List, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class LogContext(Protocol):
+    """Сообщения и прогресс анализа (совместим с mcp.server.fastmcp.Context)"""
+
+    async def info(self, message: str) -> None: ...
+
+    async def warning(self, message: str) -> None: ...
+
+    async def error(self, message: str) -> None: ...
+
+    async def debug(self, message: str) -> None: ...
+
+    async def report_progress(
+        self,
+        progress: float,
+        total: Optional[float] = None,
+        message: Optional[str] = None
+    ) -> None: ...
+
+
+class LoggingContext:
+    """Контекст вызовов без клиента: сообщения идут в logging, прогресс не отправляется"""
+
+    async def info(self, message: str) -> None:
+        logger.debug(message)
+
+    async def warning(self, message: str) -> None:
+        logger.debug(message)
+
+    async def error(self, message: str) -> None:
+        logger.debug(message)
+
+    async def debug(self, message: str) -> None:
+        logger.debug(message)
+
+    async def report_progress(
+        self,
+        progress: float,
+        total: Optional[float] = None,
+        message: Optional[str] = None
+    ) -> None:
+        pass
+
+
+class BroadcastContext(LoggingContext):
+    """Контекст общего анализа: сообщения и прогресс отправляются всем текущим ожидающим
+
+    Ожидающие добавляются и уходят во время анализа. Ошибка отправки
+    одному из них (например, закрытая сессия клиента) не прерывает анализ
+    и не мешает остальным.
+    """
+
+    def __init__(self) -> None:
+        self.listeners: List[LogContext] = []
+
+    def add(self, ctx: LogContext) -> None:
+        self.listeners.append(ctx)
+
+    def remove(self, ctx: LogContext) -> None:
+        self.listeners.remove(ctx)
+
+    async def info(self, message: str) -> None:
+        await super().info(message)
+        for listener in list(self.listeners):
+            await self._deliver(listener.info(message))
+
+    async def warning(self, message: str) -> None:
+        await super().warning(message)
+        for listener in list(self.listeners):
+            await self._deliver(listener.warning(message))
+
+    async def error(self, message: str) -> None:
+        await super().error(message)
+        for listener in list(self.listeners):
+            await self._deliver(listener.error(message))
+
+    async def debug(self, message: str) -> None:
+        await super().debug(message)
+        for listener in list(self.listeners):
+            await self._deliver(listener.debug(message))
+
+    async def report_progress(
+        self,
+        progress: float,
+        total: Optional[float] = None,
+        message: Optional[str] = None
+    ) -> None:
+        for listener in list(self.listeners):
+            await self._deliver(listener.report_progress(progress, total, message))
+
+    @staticmethod
+    async def _deliver(sending: Awaitable[None]) -> None:
+        try:
+            await sending
+        except Exception as e:
+            logger.debug("Сообщение ожидающему не доставлено: %s", e)
@@ -0,0 +1,196 @@
+"""
+Request Metrics
+
+Инструментирование запросов: время этапов, каждого вызова git, объем
+прочитанного вывода и пик памяти (tracemalloc). Запись идет в регистратор
+текущего запроса (contextvars); без активного регистратора этапы и
+вызовы git не измеряются, накладные расходы - одна проверка ContextVar.
+"""
+
+import math
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+from threading import Lock
+from typing import ContextManager, Deque, Dict, Iterator, List, Optional, Sequence
+
+from .models import GitCommandMetric, RequestMetrics, StageStats
+
+# Этап с полным временем запроса
+TOTAL_STAGE = "total"
+
+# Этап, суммирующий время всех вызовов git
+GIT_STAGE = "git"
+
+_current: "ContextVar[Optional[MetricsRecorder]]" = ContextVar("mcp_get_text_commit_metrics", default=None)
+
+
+@dataclass
+class GitCommandRecord:
+    """Запись о вызове git (размер вывода заполняет вызывающий код)"""
+    command: str
+    output_bytes: int = 0
+    duration_ms: float = 0.0
+
+
+# Запись-заглушка для вызовов git вне активного регистратора
+_NULL_RECORD = GitCommandRecord(command="")
+_NULL_CONTEXT = nullcontext()
+
+
+class MetricsRecorder:
+    """Метрики одного запроса"""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self.git_commands: List[GitCommandRecord] = []
+        self.cache_hit = False
+        self.peak_memory_bytes: Optional[int] = None
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        """Добавляет время этапа (повторные этапы суммируются)"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def result(self) -> RequestMetrics:
+        """Метрики запроса для GetTextCommitResult"""
+        stages = dict(self.stages)
+        if self.git_commands:
+            stages[GIT_STAGE] = sum(record.duration_ms for record in self.git_commands)
+        return RequestMetrics(
+            stages_ms={name: round(value, 3) for name, value in stages.items()},
+            git_commands=[
+                GitCommandMetric(
+                    command=record.command,
+                    duration_ms=round(record.duration_ms, 3),
+                    output_bytes=record.output_bytes
+                )
+                for record in self.git_commands
+            ],
+            diff_bytes=sum(
+                record.output_bytes for record in self.git_commands
+                if _is_diff_command(record.command)
+            ),
+            cache_hit=self.cache_hit,
+            peak_memory_bytes=self.peak_memory_bytes
+        )
+
+
+def current_recorder() -> Optional[MetricsRecorder]:
+    """Регистратор текущего запроса или None, если метрики не собираются"""
+    return _current.get()
+
+
+@contextmanager
+def recording(trace_memory: bool = False) -> Iterator[MetricsRecorder]:
+    """Включает сбор метрик для кода внутри блока (и созданных в нем задач)
+
+    trace_memory включает tracemalloc (и оставляет включенным для следующих
+    запросов); пик памяти общий для процесса, поэтому при параллельных
+    запросах он включает и их выделения.
+    """
+    recorder = MetricsRecorder()
+    token = _current.set(recorder)
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield recorder
+    finally:
+        recorder.add_stage(TOTAL_STAGE, time.perf_counter() - start)
+        if trace_memory:
+            recorder.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+        _current.reset(token)
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Замер этапа запроса; без регистратора - пустой контекст"""
+    recorder = _current.get()
+    if recorder is None:
+        return _NULL_CONTEXT
+    return _timed_stage(recorder, name)
+
+
+def track_git(args: Sequence[str]) -> ContextManager[GitCommandRecord]:
+    """Замер вызова git; вызывающий код заполняет output_bytes у записи"""
+    recorder = _current.get()
+    if recorder is None:
+        return nullcontext(_NULL_RECORD)
+    return _timed_git(recorder, " ".join(args))
+
+
+@contextmanager
+def _timed_stage(recorder: MetricsRecorder, name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_stage(name, time.perf_counter() - start)
+
+
+@contextmanager
+def _timed_git(recorder: MetricsRecorder, command: str) -> Iterator[GitCommandRecord]:
+    record = GitCommandRecord(command=command)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.duration_ms = (time.perf_counter() - start) * 1000
+        recorder.git_commands.append(record)
+
+
+def _is_diff_command(command: str) -> bool:
+    """Вызов git, выводящий diff (без учета глобальных опций)"""
+    for part in command.split():
+        if not part.startswith("-"):
+            return part == "diff"
+    return False
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Перцентиль методом ближайшего ранга по отсортированным значениям"""
+    if not sorted_values:
+        return 0.0
+    rank = min(max(math.ceil(fraction * len(sorted_values)), 1), len(sorted_values))
+    return sorted_values[rank - 1]
+
+
+class MetricsAggregator:
+    """Агрегирует метрики запросов: перцентили по последним window значениям"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.requests = 0
+        self.cache_hits = 0
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = Lock()
+
+    def add(self, metrics: RequestMetrics) -> None:
+        """Учитывает метрики одного запроса"""
+        with self._lock:
+            self.requests += 1
+            self.cache_hits += int(metrics.cache_hit)
+            for name, value in metrics.stages_ms.items():
+                samples = self._samples.get(name)
+                if samples is None:
+                    samples = self._samples[name] = deque(maxlen=self.window)
+                samples.append(value)
+
+    def summary(self) -> Dict[str, StageStats]:
+        """Перцентили времени по этапам"""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+        return {
+            name: StageStats(
+                count=len(values),
+                p50_ms=percentile(values, 0.5),
+                p90_ms=percentile(values, 0.9),
+                p99_ms=percentile(values, 0.99),
+                max_ms=values[-1]
+            )
+            for name, values in snapshot.items()
+        }
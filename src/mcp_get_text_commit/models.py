@@ -4,7 +4,7 @@
 Определяет Pydantic модели для входных параметров и результатов генерации commit messages.
 """
 
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -19,6 +19,48 @@ class GetTextCommitParams(BaseModel):
         default="conventional",
         description="Стиль commit message (пока только 'conventional')"
     )
+    streaming: bool = Field(
+        default=False,
+        description="Потоковая обработка diff по hunk'ам (для очень больших изменений)"
+    )
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Ограничение времени анализа: по истечении процессы git останавливаются "
+                    "и возвращается результат по уже прочитанным изменениям (partial)"
+    )
+
+
+class GitCommandMetric(BaseModel):
+    """Метрики одного вызова git"""
+
+    command: str = Field(description="Аргументы git")
+    duration_ms: float = Field(description="Время выполнения, мс")
+    output_bytes: int = Field(description="Объем прочитанного вывода")
+
+
+class RequestMetrics(BaseModel):
+    """Метрики одного запроса (только при включенных метриках)"""
+
+    stages_ms: Dict[str, float] = Field(
+        description="Время этапов, мс (git - сумма всех вызовов git, total - весь запрос)"
+    )
+    git_commands: List[GitCommandMetric] = Field(
+        default_factory=list,
+        description="Вызовы git в порядке завершения"
+    )
+    diff_bytes: int = Field(
+        default=0,
+        description="Объем прочитанного вывода git diff"
+    )
+    cache_hit: bool = Field(
+        default=False,
+        description="Результат взят из кэша"
+    )
+    peak_memory_bytes: Optional[int] = Field(
+        default=None,
+        description="Пик памяти по tracemalloc (если включен)"
+    )
 
 
 class GetTextCommitResult(BaseModel):
@@ -38,6 +80,148 @@ class GetTextCommitResult(BaseModel):
     has_changes: bool = Field(
         description="Есть ли staged изменения"
     )
+    partial: bool = Field(
+        default=False,
+        description="Анализ прерван по deadline: результат по части изменений, confidence снижен"
+    )
+    metrics: Optional[RequestMetrics] = Field(
+        default=None,
+        description="Метрики запроса (если включены в настройках сервера)"
+    )
+
+
+class GetTextCommitBatchParams(BaseModel):
+    """Параметры пакетной генерации commit messages для нескольких репозиториев"""
+
+    working_directories: List[str] = Field(
+        min_length=1,
+        description="Пути к git репозиториям или worktree"
+    )
+    style: Optional[str] = Field(
+        default="conventional",
+        description="Стиль commit message (пока только 'conventional')"
+    )
+    streaming: bool = Field(
+        default=False,
+        description="Потоковая обработка diff по hunk'ам (для очень больших изменений)"
+    )
+    max_concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Максимум одновременно анализируемых репозиториев"
+    )
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Ограничение времени анализа каждого репозитория (см. GetTextCommitParams)"
+    )
+
+
+class BatchItemResult(BaseModel):
+    """Результат для одного репозитория в пакете"""
+
+    working_directory: str = Field(
+        description="Путь к репозиторию из запроса"
+    )
+    result: Optional[GetTextCommitResult] = Field(
+        default=None,
+        description="Результат генерации (если анализ успешен)"
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description="Описание ошибки (если анализ не удался)"
+    )
+
+
+class GetTextCommitBatchResult(BaseModel):
+    """Результат пакетной генерации commit messages"""
+
+    results: List[BatchItemResult] = Field(
+        description="Результаты в порядке working_directories"
+    )
+
+
+class GetTextCommitRangeParams(BaseModel):
+    """Параметры генерации commit messages для коммитов диапазона"""
+
+    working_directory: Optional[str] = Field(
+        default=None,
+        description="Путь к git репозиторию (по умолчанию: текущая директория)"
+    )
+    revision_range: str = Field(
+        default="HEAD",
+        min_length=1,
+        description="Диапазон коммитов git log (например, 'main..feature'); по умолчанию - история HEAD"
+    )
+    max_count: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Максимум коммитов (последние N из диапазона)"
+    )
+
+
+class RangeCommitResult(BaseModel):
+    """Предложенный commit message для коммита диапазона"""
+
+    sha: str = Field(description="SHA коммита")
+    subject: str = Field(description="Текущий subject коммита")
+    commit_text: str = Field(
+        description="Предложенный commit message (пустой для коммита без изменений)"
+    )
+    confidence: float = Field(
+        ge=0.0, le=1.0,
+        description="Уверенность алгоритма в качестве предложения"
+    )
+    files_analyzed: int = Field(
+        ge=0,
+        description="Количество измененных файлов коммита"
+    )
+    partial: bool = Field(
+        default=False,
+        description="Patch коммита прочитан не полностью (range_max_commit_bytes), confidence снижен"
+    )
+
+
+class GetTextCommitRangeResult(BaseModel):
+    """Результат генерации commit messages для коммитов диапазона"""
+
+    results: List[RangeCommitResult] = Field(
+        description="Результаты в порядке git log (от новых коммитов к старым)"
+    )
+
+
+class StageStats(BaseModel):
+    """Перцентили времени этапа по последним запросам"""
+
+    count: int = Field(description="Число замеров")
+    p50_ms: float = Field(description="Медиана, мс")
+    p90_ms: float = Field(description="90-й перцентиль, мс")
+    p99_ms: float = Field(description="99-й перцентиль, мс")
+    max_ms: float = Field(description="Максимум, мс")
+
+
+class ServerStats(BaseModel):
+    """Статистика сервера"""
+
+    metrics_enabled: bool = Field(description="Собираются ли метрики запросов")
+    requests: int = Field(description="Число запросов с метриками")
+    cache_hits: int = Field(description="Из них ответов из кэша")
+    stages: Dict[str, StageStats] = Field(
+        default_factory=dict,
+        description="Перцентили времени по этапам"
+    )
+    cache: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Счетчики кэша результатов"
+    )
+    coalesced: int = Field(
+        default=0,
+        description="Запросов, получивших результат уже выполнявшегося одинакового анализа"
+    )
+    watcher: Optional[Dict[str, int]] = Field(
+        default=None,
+        description="Счетчики фонового наблюдения (если включено)"
+    )
 
 
 class GitAnalysisError(Exception):
@@ -48,3 +232,8 @@ class GitAnalysisError(Exception):
 class GitCommandError(Exception):
     """Исключение при выполнении git команд"""
     pass
+
+
+class NotAGitRepositoryError(GitAnalysisError):
+    """Директория не является git репозиторием"""
+    pass
@@ -0,0 +1,76 @@
+"""
+Moved Lines
+
+Оценка доли перемещенного кода: строка, удаленная в одном месте diff и
+добавленная в другом (в том же или другом файле), считается перемещенной.
+Аналог --color-moved git без цветного вывода: строки сравниваются без
+отступов, короткие строки ("}", "return None") не учитываются. Число
+учитываемых строк ограничено, поэтому стоимость не растет с размером diff.
+"""
+
+import re
+from typing import Dict
+
+# Добавленная или удаленная строка тела diff (без заголовков --- / +++)
+_CHANGED_LINE_RE = re.compile(r'^(?!\+\+\+ |--- )([+-])[ \t]*(\S[^\n]*?)[ \t\r]*$', re.MULTILINE)
+
+# Строки короче не сравниваются: совпадают случайно
+MIN_LINE_CHARS = 12
+
+# Максимум учитываемых строк (по умолчанию)
+MAX_TRACKED_LINES = 20000
+
+
+class MovedLineIndex:
+    """Счетчики добавленных и удаленных строк для поиска перемещений
+
+    Части diff можно подавать по очереди или обрабатывать отдельными
+    индексами и сливать через merge. После max_lines строк новые части
+    не просматриваются: доля считается по первым строкам diff.
+    """
+
+    def __init__(self, max_lines: int = MAX_TRACKED_LINES):
+        self.max_lines = max_lines
+        self.added: Dict[str, int] = {}
+        self.removed: Dict[str, int] = {}
+        self.lines = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.lines >= self.max_lines
+
+    def feed(self, diff_text: str) -> None:
+        """Учитывает добавленные и удаленные строки очередной части diff"""
+        if self.complete or not diff_text:
+            return
+        for match in _CHANGED_LINE_RE.finditer(diff_text):
+            marker, line = match.groups()
+            if len(line) < MIN_LINE_CHARS:
+                continue
+            counts = self.added if marker == "+" else self.removed
+            counts[line] = counts.get(line, 0) + 1
+            self.lines += 1
+            if self.lines >= self.max_lines:
+                return
+
+    def merge(self, other: "MovedLineIndex") -> None:
+        """Добавляет счетчики индекса другой части diff"""
+        for line, count in other.added.items():
+            self.added[line] = self.added.get(line, 0) + count
+        for line, count in other.removed.items():
+            self.removed[line] = self.removed.get(line, 0) + count
+        self.lines += other.lines
+
+    def moved_lines(self) -> int:
+        """Число строк, удаленных и добавленных с тем же содержимым (обе стороны)"""
+        return 2 * sum(
+            min(count, self.removed[line])
+            for line, count in self.added.items()
+            if line in self.removed
+        )
+
+    def moved_fraction(self) -> float:
+        """Доля перемещенных строк среди учтенных"""
+        if not self.lines:
+            return 0.0
+        return self.moved_lines() / self.lines
@@ -0,0 +1,336 @@
+"""
+Multi-Pattern Scanning Engine
+
+Модуль для одновременного поиска множества regex паттернов и ключевых слов
+за один проход по тексту.
+
+Все ключевые слова и ведущие литералы паттернов собираются в одно
+trie-выражение, которое проходит по тексту (приведенному к нижнему
+регистру) один раз. Паттерн проверяется только в позициях, где найден
+его литерал. Когда литералы найдены, проход продолжается по trie только
+из оставшихся литералов: частые слова ("def", "fix") не дают лишних
+совпадений. Trie кэшируются в сканере по набору литералов, поэтому
+повторный поиск их не компилирует. Паттерны без ведущего литерала
+проверяются обычным поиском.
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Pattern, Sequence, Set, Tuple
+
+# Литералы короче этой длины дают слишком много кандидатов
+MIN_LITERAL_LENGTH = 3
+
+# После стольких неудачных проверок паттерна в одной части текста
+# выполняется один полный поиск, чтобы ограничить число проверок
+MAX_FAILED_VERIFICATIONS = 8
+
+# Предел кэша trie одного сканера (по наборам оставшихся литералов)
+MAX_CACHED_TRIES = 256
+
+_REGEX_META = set(".^$*+?{}[]\\|()")
+_QUANTIFIERS = set("*+?{")
+
+
+def leading_literals(pattern: Pattern) -> Optional[List[str]]:
+    """Возвращает литералы, с одного из которых начинается любое совпадение
+
+    Поддерживаются паттерны вида 'literal...' и 'lit1|lit2...' с флагом
+    IGNORECASE. Для остальных возвращается None.
+    """
+    if not pattern.flags & re.IGNORECASE or pattern.flags & re.VERBOSE:
+        return None
+
+    literals = []
+    for alternative in _split_top_level(pattern.pattern):
+        literal = ""
+        for index, char in enumerate(alternative):
+            if char in _REGEX_META:
+                if char in _QUANTIFIERS and literal:
+                    # Последний символ под квантификатором необязателен
+                    literal = literal[:-1]
+                break
+            literal += char
+            if index + 1 < len(alternative) and alternative[index + 1] in _QUANTIFIERS:
+                literal = literal[:-1]
+                break
+        if len(literal) < MIN_LITERAL_LENGTH:
+            return None
+        literals.append(literal.lower())
+    return literals or None
+
+
+def _split_top_level(source: str) -> List[str]:
+    """Разбивает regex по '|' верхнего уровня"""
+    parts, depth, in_class, escaped, start = [], 0, False, False, 0
+    for index, char in enumerate(source):
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            parts.append(source[start:index])
+            start = index + 1
+    parts.append(source[start:])
+    return parts
+
+
+def _compile_literal_trie(literals: Iterable[str]) -> Pattern:
+    """Компилирует набор литералов в одно trie-выражение"""
+    trie: Dict[str, dict] = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        if len(alternatives) == 1 and "" not in node:
+            return alternatives[0]
+        body = "(?:" + "|".join(alternatives) + ")"
+        return body + "?" if "" in node else body
+
+    return re.compile(build(trie))
+
+
+@dataclass
+class _Target:
+    """Паттерн или ключевое слово, которое ищет сканер"""
+    key: Hashable
+    regex: Optional[Pattern]
+    literals: Tuple[str, ...]
+
+
+@dataclass
+class MultiPatternScanner:
+    """Скомпилированный набор паттернов и ключевых слов
+
+    Создается один раз и переиспользуется; состояние поиска хранится
+    в объектах ScanState.
+    """
+    targets: List[_Target] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self._rebuild_index()
+
+    @classmethod
+    def build(
+        cls,
+        patterns: Iterable[Tuple[Hashable, Pattern]] = (),
+        keywords: Iterable[Tuple[Hashable, str]] = ()
+    ) -> "MultiPatternScanner":
+        """Собирает сканер из паттернов и ключевых слов (без учета регистра)"""
+        targets = []
+        for key, regex in patterns:
+            literals = leading_literals(regex)
+            targets.append(_Target(key, regex, tuple(literals) if literals else ()))
+        for key, keyword in keywords:
+            targets.append(_Target(key, None, (keyword.lower(),)))
+        return cls(targets)
+
+    def _rebuild_index(self) -> None:
+        """Строит индексы литерал -> цели и литерал -> его префиксы"""
+        self._by_literal: Dict[str, List[_Target]] = {}
+        self._fallback: List[_Target] = []
+        for target in self.targets:
+            if not target.literals:
+                self._fallback.append(target)
+            for literal in target.literals:
+                self._by_literal.setdefault(literal, []).append(target)
+
+        literals = list(self._by_literal)
+        self._tries: Dict[FrozenSet[str], Pattern] = {}
+        if literals:
+            # Trie всех литералов - начало любого поиска
+            self._literal_trie(frozenset(literals))
+        self._prefixes: Dict[str, List[str]] = {
+            literal: [other for other in literals if literal.startswith(other)]
+            for literal in literals
+        }
+
+    def _literal_trie(self, literals: FrozenSet[str]) -> Pattern:
+        """Trie-выражение набора литералов (из кэша сканера)"""
+        regex = self._tries.get(literals)
+        if regex is None:
+            if len(self._tries) >= MAX_CACHED_TRIES:
+                self._tries.clear()
+            regex = self._tries[literals] = _compile_literal_trie(literals)
+        return regex
+
+    @property
+    def keys(self) -> List[Hashable]:
+        """Ключи всех целей сканера"""
+        return [target.key for target in self.targets]
+
+    def start(self) -> "ScanState":
+        """Создает состояние поиска для потоковой обработки текста"""
+        return ScanState(self)
+
+    def scan(self, text: str) -> Set[Hashable]:
+        """Возвращает ключи всех целей, найденных в тексте"""
+        state = self.start()
+        state.feed(text)
+        return state.found
+
+
+class ScanState:
+    """Состояние поиска: найденная цель дальше не проверяется"""
+
+    def __init__(self, scanner: MultiPatternScanner):
+        self.scanner = scanner
+        self.found: Set[Hashable] = set()
+        self._pending_fallback = list(scanner._fallback)
+        self._pending_literals = {
+            literal for literal, targets in scanner._by_literal.items() if targets
+        }
+
+    @property
+    def done(self) -> bool:
+        """Все цели уже найдены"""
+        return not self._pending_literals and not self._pending_fallback
+
+    def feed(self, text: str) -> None:
+        """Обрабатывает очередную часть текста"""
+        if not text or self.done:
+            return
+
+        if self._pending_fallback:
+            self._pending_fallback = [
+                target for target in self._pending_fallback
+                if not self._mark_if(target, target.regex is not None and target.regex.search(text) is not None)
+            ]
+
+        if self._pending_literals:
+            self._scan_literals(text.lower())
+
+    def update(self, found: Iterable[Hashable]) -> None:
+        """Добавляет цели, найденные в другом состоянии (например, в воркере)"""
+        found = set(found) - self.found
+        if not found:
+            return
+        for target in self.scanner.targets:
+            if target.key in found:
+                self._mark_if(target, True)
+        self._pending_fallback = [
+            target for target in self._pending_fallback if target.key not in self.found
+        ]
+
+    def _scan_literals(self, lowered: str) -> None:
+        """Один проход по тексту trie оставшихся литералов с проверкой кандидатов
+
+        Trie содержит только оставшиеся литералы, поэтому каждое совпадение
+        проверяет цель; число совпадений ограничено числом целей и
+        MAX_FAILED_VERIFICATIONS, а не частотой литералов в тексте. Поиск
+        продолжается со следующей позиции: литерал может начинаться внутри
+        другого.
+        """
+        active = frozenset(self._pending_literals)
+        regex = self.scanner._literal_trie(active) if active else None
+        failures: Dict[Hashable, int] = {}
+        dead: Set[Hashable] = set()
+        position = 0
+
+        while regex is not None:
+            match = regex.search(lowered, position)
+            if match is None:
+                break
+            start = match.start()
+            position = start + 1
+            changed: List[_Target] = []
+            for literal in self.scanner._prefixes[match.group()]:
+                if literal in active:
+                    changed.extend(self._check_literal(literal, lowered, start, failures, dead))
+
+            exhausted = {
+                literal for target in changed for literal in target.literals
+                if literal in active and all(
+                    other.key in self.found or other.key in dead
+                    for other in self.scanner._by_literal[literal]
+                )
+            }
+            if exhausted:
+                active -= exhausted
+                regex = self.scanner._literal_trie(active) if active else None
+
+    def _check_literal(
+        self,
+        literal: str,
+        lowered: str,
+        start: int,
+        failures: Dict[Hashable, int],
+        dead: Set[Hashable]
+    ) -> List[_Target]:
+        """Проверяет цели литерала в позиции его вхождения
+
+        Возвращает цели, которые были найдены или исключены из поиска.
+        """
+        changed = []
+        for target in self.scanner._by_literal[literal]:
+            if target.key in self.found or target.key in dead:
+                continue
+            if target.regex is None or target.regex.match(lowered, start):
+                self._mark_if(target, True)
+                changed.append(target)
+                continue
+
+            failures[target.key] = failures.get(target.key, 0) + 1
+            if failures[target.key] >= MAX_FAILED_VERIFICATIONS:
+                # Частый литерал без совпадений: один поиск до конца текста
+                if not self._mark_if(target, target.regex.search(lowered, start) is not None):
+                    dead.add(target.key)
+                changed.append(target)
+        return changed
+
+    def _mark_if(self, target: _Target, matched: bool) -> bool:
+        """Отмечает цель найденной и убирает ее литералы из поиска"""
+        if not matched:
+            return False
+        self.found.add(target.key)
+        for literal in target.literals:
+            if all(other.key in self.found for other in self.scanner._by_literal[literal]):
+                self._pending_literals.discard(literal)
+        return True
+
+
+def count_matching_paths(regex: Pattern, paths: Sequence[str]) -> int:
+    """Считает пути, в которых найден regex, за один поиск по их склейке"""
+    if not paths:
+        return 0
+
+    blob = "\n".join(paths)
+    line_starts = [0]
+    for path in paths[:-1]:
+        line_starts.append(line_starts[-1] + len(path) + 1)
+
+    multiline = _multiline_variant(regex)
+    count, position = 0, 0
+    while True:
+        match = multiline.search(blob, position)
+        if match is None:
+            return count
+        line = bisect_right(line_starts, match.start()) - 1
+        # Совпадение могло выйти за границу пути: проверяем путь отдельно
+        if regex.search(paths[line]):
+            count += 1
+        if line + 1 >= len(line_starts):
+            return count
+        position = line_starts[line + 1]
+
+
+@lru_cache(maxsize=256)
+def _multiline_variant(regex: Pattern) -> Pattern:
+    """Тот же regex, где ^ и $ относятся к отдельным строкам"""
+    return re.compile(regex.pattern, regex.flags | re.MULTILINE)
@@ -0,0 +1,69 @@
+"""
+Analysis Progress
+
+Уведомления о ходе анализа через Context.report_progress: найденные
+файлы, прочитанный объем diff, оцененные файлы и предварительный тип
+коммита. Данные приходят из пофайловой обработки diff, отдельных
+проходов для прогресса нет; промежуточные уведомления прореживаются.
+"""
+
+import asyncio
+from typing import Optional
+
+from .log_context import LogContext
+
+# Минимальный интервал между промежуточными уведомлениями
+PROGRESS_INTERVAL_SECONDS = 0.25
+
+
+class AnalysisProgress:
+    """Прогресс анализа: progress - обработанные файлы из total
+
+    Контексты без report_progress (например, фоновые пересчеты) не
+    получают уведомлений.
+    """
+
+    def __init__(self, ctx: LogContext, interval: float = PROGRESS_INTERVAL_SECONDS):
+        self._report = getattr(ctx, "report_progress", None)
+        self.interval = interval
+        self.total = 0
+        self._last_sent: Optional[float] = None
+
+    async def files_collected(self, total: int, diff_bytes: Optional[int] = None) -> None:
+        """Список изменений получен; total - файлы, diff которых будет обработан"""
+        self.total = total
+        message = f"Найдено файлов: {total}"
+        if diff_bytes is not None:
+            message += f", diff: {diff_bytes} байт"
+        await self._send(0, message, force=True)
+
+    async def provisional_type(self, commit_type: str, confidence: float) -> None:
+        """Предварительный тип коммита (по путям файлов, до разбора diff)"""
+        await self._send(0, f"Предварительный тип: {commit_type} (confidence: {confidence:.2f})", force=True)
+
+    async def diff_read(self, files: int, bytes_read: int) -> None:
+        """Прочитана очередная часть diff при потоковой обработке"""
+        await self._send(files, f"Прочитано diff: {bytes_read} байт, файлов: {files} из {self.total}")
+
+    async def files_scored(self, files: int) -> None:
+        """Оценена очередная часть файлов"""
+        await self._send(files, f"Оценено файлов: {files} из {self.total}")
+
+    async def commits_analyzed(self, commits: int) -> None:
+        """Готовы предложения для очередных коммитов диапазона"""
+        await self._send(commits, f"Проанализировано коммитов: {commits}")
+
+    async def finished(self, commit_type: str) -> None:
+        """Тип коммита определен"""
+        await self._send(self.total, f"Тип коммита: {commit_type}", force=True)
+
+    async def _send(self, progress: int, message: str, force: bool = False) -> None:
+        if self._report is None:
+            return
+        if not force:
+            # Прореживаются только промежуточные уведомления
+            now = asyncio.get_running_loop().time()
+            if self._last_sent is not None and now - self._last_sent < self.interval:
+                return
+            self._last_sent = now
+        await self._report(progress, self.total or None, message)
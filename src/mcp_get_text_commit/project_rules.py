@@ -0,0 +1,114 @@
+"""
+Project Rules Loader
+
+Загрузка правил проекта из rules.md: корневой файл рабочей директории и
+вложенные rules.md в каталогах измененных файлов. Файлы читаются вне
+event loop и кэшируются по пути и (mtime, размер): неизмененные файлы
+повторно не читаются и не разбираются.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Tuple
+
+RULES_FILENAME = "rules.md"
+
+# Упоминание TODO.md в правилах добавляет footer в commit message
+TODO_MARKER = "TODO.md"
+
+# Разобранные файлы правил: путь -> ((mtime_ns, размер), файл или None при ошибке чтения)
+_RULES_FILES: Dict[Path, Tuple[Tuple[int, int], Optional["RulesFile"]]] = {}
+
+
+@dataclass(frozen=True)
+class RulesFile:
+    """Разобранный файл правил"""
+    path: Path
+    text: str
+    mentions_todo: bool
+
+
+@dataclass(frozen=True)
+class ProjectRules:
+    """Правила, применимые к изменениям: от общих к более специфичным"""
+    files: Tuple[RulesFile, ...]
+
+    @property
+    def mentions_todo(self) -> bool:
+        return any(rules_file.mentions_todo for rules_file in self.files)
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(rules_file.text for rules_file in self.files)
+
+
+def rules_candidates(
+    working_directory: Path,
+    toplevel: Optional[Path] = None,
+    changed_paths: Iterable[str] = ()
+) -> List[Path]:
+    """Пути возможных rules.md для изменений (существование не проверяется)
+
+    Первым идет rules.md рабочей директории, затем rules.md корня рабочей
+    копии и каталогов на пути к каждому измененному файлу (пути git
+    относительно корня), от менее вложенных к более вложенным.
+    """
+    candidates = [working_directory / RULES_FILENAME]
+    if toplevel is None:
+        return candidates
+
+    directories = set()
+    for path in changed_paths:
+        parent = PurePosixPath(path).parent
+        while parent not in directories:
+            directories.add(parent)
+            if parent == parent.parent:
+                break
+            parent = parent.parent
+
+    seen = {candidates[0]}
+    for directory in sorted(directories, key=lambda directory: (len(directory.parts), directory.parts)):
+        candidate = toplevel.joinpath(*directory.parts) / RULES_FILENAME
+        if candidate not in seen:
+            seen.add(candidate)
+            candidates.append(candidate)
+    return candidates
+
+
+def read_rules_file(path: Path) -> Optional[RulesFile]:
+    """Читает файл правил с кэшированием по (mtime, размер); None, если файла нет"""
+    try:
+        stat = path.stat()
+    except OSError:
+        _RULES_FILES.pop(path, None)
+        return None
+
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    cached = _RULES_FILES.get(path)
+    if cached is not None and cached[0] == stat_key:
+        return cached[1]
+
+    try:
+        text = path.read_text(encoding='utf-8')
+        rules_file: Optional[RulesFile] = RulesFile(path=path, text=text, mentions_todo=TODO_MARKER in text)
+    except Exception:
+        rules_file = None
+    _RULES_FILES[path] = (stat_key, rules_file)
+    return rules_file
+
+
+def load_rules(candidates: Iterable[Path]) -> Optional[ProjectRules]:
+    """Собирает существующие файлы правил (блокирующий вызов)"""
+    files = tuple(rules_file for rules_file in map(read_rules_file, candidates) if rules_file is not None)
+    return ProjectRules(files) if files else None
+
+
+async def load_project_rules(
+    working_directory: Path,
+    toplevel: Optional[Path] = None,
+    changed_paths: Iterable[str] = ()
+) -> Optional[ProjectRules]:
+    """Загружает правила для изменений в потоке, не блокируя event loop"""
+    candidates = rules_candidates(working_directory, toplevel, changed_paths)
+    return await asyncio.to_thread(load_rules, candidates)
@@ -0,0 +1,189 @@
+"""
+Repository Watcher
+
+Фоновое предвычисление commit messages: сервер следит за .git/index,
+HEAD и измененными файлами рабочей копии репозиториев, к которым уже были
+запросы, и после изменения (с задержкой на "успокоение") пересчитывает
+результат в кэш сервиса. Следующий get_text_commit получает готовый ответ
+из кэша.
+
+Опрос не запускает git: проверяется stat файлов, поэтому правка файла,
+который при последнем анализе не отличался от индекса, замечается только
+вместе с изменением индекса или HEAD (ее учтет следующий запрос: ключ кэша
+включает stat всех измененных файлов).
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .config import Settings, get_settings
+from .git_analyzer import GitAnalyzer
+from .log_context import LoggingContext
+from .models import GetTextCommitParams, GitCommandError
+
+if TYPE_CHECKING:
+    from .commit_service import CommitService
+
+logger = logging.getLogger(__name__)
+
+# Файлы каталога .git, изменение которых означает новое состояние для коммита
+WATCHED_FILES = ("index", "HEAD")
+
+Signature = Tuple[Tuple[Optional[int], Optional[int], Optional[int]], ...]
+
+# Каталог .git и измененные файлы рабочей копии при последнем анализе
+WatchedPaths = Tuple[Path, List[Path]]
+
+
+@dataclass
+class _WatchedRepository:
+    """Состояние наблюдения за одним репозиторием"""
+    params: GetTextCommitParams
+    git_dir: Path
+    toplevel: Path
+    changed_paths: List[Path]
+    signature: Signature
+    changed_at: Optional[float] = None
+    task: Optional["asyncio.Task[None]"] = None
+
+
+def _watch_signature(git_dir: Path, changed_paths: List[Path]) -> Signature:
+    """(mtime_ns, размер, inode) наблюдаемых файлов; None для отсутствующих"""
+    signature: List[Tuple[Optional[int], Optional[int], Optional[int]]] = []
+    for path in [*(git_dir / name for name in WATCHED_FILES), *changed_paths]:
+        try:
+            stat = path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        except OSError:
+            signature.append((None, None, None))
+    return tuple(signature)
+
+
+def _watch_signatures(repositories: List[WatchedPaths]) -> List[Signature]:
+    """Сигнатуры для нескольких репозиториев (один вызов в потоке)"""
+    return [_watch_signature(git_dir, changed_paths) for git_dir, changed_paths in repositories]
+
+
+class RepositoryWatcher:
+    """Опрос stat .git/index, HEAD и измененных файлов с debounce и ограничением нагрузки
+
+    Список измененных файлов обновляется одним git diff перед каждым
+    пересчетом, а не при опросе.
+
+    Число наблюдаемых репозиториев ограничено (давно не запрашиваемые
+    вытесняются), число одновременных фоновых пересчетов - семафором.
+    """
+
+    def __init__(self, service: "CommitService", settings: Optional[Settings] = None):
+        self.service = service
+        self.settings = settings or get_settings()
+        self._repositories: "OrderedDict[str, _WatchedRepository]" = OrderedDict()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._poll_task: Optional["asyncio.Task[None]"] = None
+        self.recomputations = 0
+
+    @property
+    def watched(self) -> List[str]:
+        """Наблюдаемые репозитории (от давно запрошенных к недавним)"""
+        return list(self._repositories)
+
+    async def watch(self, params: GetTextCommitParams) -> None:
+        """Начинает (или продолжает) наблюдение за репозиторием запроса"""
+        key = str(Path(params.working_directory or Path.cwd()).resolve())
+        repository = self._repositories.get(key)
+        if repository is not None:
+            repository.params = params
+            self._repositories.move_to_end(key)
+            return
+
+        try:
+            analyzer = GitAnalyzer(key)
+            git_dir, toplevel = await analyzer.repo_paths()
+            changed_paths = [toplevel / path for path in await analyzer.changed_files()]
+        except (GitCommandError, OSError, ValueError):
+            return
+        signature = await asyncio.to_thread(_watch_signature, git_dir, changed_paths)
+        self._repositories[key] = _WatchedRepository(params, git_dir, toplevel, changed_paths, signature)
+        while len(self._repositories) > self.settings.watch_max_repos:
+            _, evicted = self._repositories.popitem(last=False)
+            if evicted.task is not None:
+                evicted.task.cancel()
+
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def poll(self) -> None:
+        """Один цикл опроса: фиксирует изменения и запускает пересчеты"""
+        repositories = list(self._repositories.values())
+        watched = [(repository.git_dir, repository.changed_paths) for repository in repositories]
+        signatures = await asyncio.to_thread(_watch_signatures, watched)
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        for repository, (_, changed_paths), signature in zip(repositories, watched, signatures):
+            # Пересчет мог обновить список файлов за время опроса: сигнатуры несравнимы
+            if changed_paths is repository.changed_paths and signature != repository.signature:
+                repository.signature = signature
+                repository.changed_at = now
+            if repository.changed_at is None or now - repository.changed_at < self.settings.watch_debounce_seconds:
+                continue
+            if repository.task is not None and not repository.task.done():
+                # Пересчет уже идет: новое изменение обработается после него
+                continue
+            repository.changed_at = None
+            repository.task = loop.create_task(self._recompute(repository))
+
+    async def wait_idle(self) -> None:
+        """Ожидает завершения запущенных фоновых пересчетов"""
+        tasks = [repository.task for repository in self._repositories.values() if repository.task is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Останавливает опрос и фоновые пересчеты"""
+        tasks = [repository.task for repository in self._repositories.values() if repository.task is not None]
+        if self._poll_task is not None:
+            tasks.append(self._poll_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._repositories.clear()
+        self._poll_task = None
+
+    async def _poll_loop(self) -> None:
+        """Опрашивает репозитории, пока есть что наблюдать"""
+        while self._repositories:
+            await asyncio.sleep(self.settings.watch_poll_interval_seconds)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Ошибка опроса репозиториев")
+
+    async def _recompute(self, repository: _WatchedRepository) -> None:
+        """Пересчитывает результат в кэш сервиса"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.settings.watch_max_concurrency)
+        async with self._semaphore:
+            try:
+                # Файлы и сигнатура фиксируются до анализа: более поздние правки заметит следующий опрос
+                changed_files = await GitAnalyzer(str(repository.toplevel)).changed_files()
+                repository.changed_paths = [repository.toplevel / path for path in changed_files]
+                repository.signature = await asyncio.to_thread(
+                    _watch_signature, repository.git_dir, repository.changed_paths
+                )
+                await self.service.generate_result(
+                    repository.params, LoggingContext(), record_metrics=False
+                )
+                self.recomputations += 1
+            except Exception as e:
+                logger.debug("Фоновый пересчет %s не удался: %s", repository.params.working_directory, e)
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики наблюдения"""
+        return {
+            "watched": len(self._repositories),
+            "max_watched": self.settings.watch_max_repos,
+            "recomputations": self.recomputations,
+        }
@@ -0,0 +1,65 @@
+"""
+Result Cache
+
+In-memory LRU кэш результатов генерации commit messages. Ключ кэша
+адресует содержимое: путь репозитория, id дерева индекса, состояние
+измененных файлов рабочей копии и стиль сообщения.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, Optional
+
+from .models import GetTextCommitResult
+
+
+class ResultCache:
+    """LRU кэш GetTextCommitResult с ограничением размера и счетчиками"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, GetTextCommitResult]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[GetTextCommitResult]:
+        """Возвращает копию результата из кэша или None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return result.model_copy()
+
+    def put(self, key: Hashable, result: GetTextCommitResult) -> None:
+        """Сохраняет результат, вытесняя давно не использованные записи"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = result.model_copy()
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Очищает кэш (счетчики сохраняются)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики кэша"""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,214 @@
+"""
+Rule Registry
+
+Правила определения типа коммита, объявленные в репозитории: таблица
+[tool.mcp-get-text-commit] в pyproject.toml и файл .commit-types.toml в
+корне рабочей копии (дополняет pyproject.toml). Для каждого типа задаются
+regex паттерны diff, glob-паттерны файлов, ключевые слова и приоритет:
+
+    [tool.mcp-get-text-commit.commit-types.perf]
+    patterns = ["benchmark|latency"]
+    files = ["bench/**"]
+    keywords = ["perf"]
+    priority = 3
+
+Правила дополняют встроенные типы CommitTypeDetector (replace-default-types
+= true заменяет их). Реестр компилируется в CompiledCommitTypes один раз:
+результат кэшируется по stat файлов-источников и общий для всех запросов
+к репозиторию, поэтому число правил не влияет на стоимость запроса.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import tomllib
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from .commit_type_detector import CommitTypeDetector, CommitTypePattern, CompiledCommitTypes
+
+logger = logging.getLogger(__name__)
+
+RULES_FILENAME = ".commit-types.toml"
+PYPROJECT_FILENAME = "pyproject.toml"
+TOOL_TABLE = "mcp-get-text-commit"
+
+# (mtime_ns, размер) каждого источника правил; None для отсутствующих
+SourceState = Tuple[Optional[Tuple[int, int]], ...]
+
+# Скомпилированные реестры: корень рабочей копии -> (stat источников, реестр или None)
+_REGISTRIES: Dict[Path, Tuple[SourceState, Optional[CompiledCommitTypes]]] = {}
+# Параллельные запросы к одному репозиторию компилируют реестр один раз
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def glob_to_regex(pattern: str) -> Pattern:
+    """Regex для glob-паттерна пути (как в .gitignore)
+
+    Паттерн без "/" применяется к имени файла в любом каталоге, с "/" - к
+    пути от корня репозитория; "*" не переходит через "/", "**" - переходит.
+    """
+    anchored = "/" in pattern.rstrip("/")
+    source = pattern.strip("/")
+    parts = ["^" if anchored else "(?:^|/)"]
+    index = 0
+    while index < len(source):
+        char = source[index]
+        if source.startswith("**/", index):
+            parts.append("(?:[^\n]*/)?")
+            index += 3
+            continue
+        if source.startswith("**", index):
+            parts.append("[^\n]*")
+            index += 2
+            continue
+        if char == "*":
+            parts.append("[^/\n]*")
+        elif char == "?":
+            parts.append("[^/\n]")
+        elif char == "[" and "]" in source[index + 2:]:
+            end = source.index("]", index + 2)
+            body = source[index + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append("[" + body.replace("\\", "\\\\") + "]")
+            index = end
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    # Паттерн каталога совпадает и со всеми файлами внутри него
+    parts.append("(?:/|$)" if pattern.endswith("/") else "$")
+    return re.compile("".join(parts))
+
+
+def parse_commit_types(
+    config: Dict[str, Any],
+    base: Dict[str, CommitTypePattern]
+) -> Dict[str, CommitTypePattern]:
+    """Применяет таблицу правил к набору типов и возвращает новый набор
+
+    Raises:
+        ValueError: неверная структура таблицы или regex
+    """
+    commit_types = {} if config.get("replace-default-types") else dict(base)
+    declared = config.get("commit-types", {})
+    if not isinstance(declared, dict):
+        raise ValueError("commit-types must be a table")
+
+    for name, rule in declared.items():
+        if not isinstance(rule, dict):
+            raise ValueError(f"commit-types.{name} must be a table")
+        try:
+            patterns = [re.compile(source, re.IGNORECASE) for source in _string_list(rule, "patterns")]
+        except re.error as e:
+            raise ValueError(f"commit-types.{name}.patterns: {e}")
+        file_patterns = [glob_to_regex(glob) for glob in _string_list(rule, "files")]
+        keywords = [keyword.lower() for keyword in _string_list(rule, "keywords")]
+        priority = rule.get("priority")
+        if priority is not None and (not isinstance(priority, int) or isinstance(priority, bool)):
+            raise ValueError(f"commit-types.{name}.priority must be an integer")
+
+        existing = commit_types.get(name)
+        if existing is None:
+            commit_types[name] = CommitTypePattern(patterns, file_patterns, keywords, priority or 1)
+        else:
+            commit_types[name] = replace(
+                existing,
+                patterns=existing.patterns + patterns,
+                file_patterns=existing.file_patterns + file_patterns,
+                keywords=existing.keywords + keywords,
+                priority=existing.priority if priority is None else priority
+            )
+    if not commit_types:
+        raise ValueError("no commit types left after replace-default-types")
+    return commit_types
+
+
+def _string_list(rule: Dict[str, Any], field: str) -> List[str]:
+    values = rule.get(field, [])
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValueError(f"{field} must be a list of strings")
+    return values
+
+
+def registry_sources(toplevel: Path) -> List[Path]:
+    """Файлы-источники правил в порядке применения"""
+    return [toplevel / PYPROJECT_FILENAME, toplevel / RULES_FILENAME]
+
+
+def _source_state(sources: List[Path]) -> SourceState:
+    """(mtime_ns, размер) каждого источника; None для отсутствующих"""
+    state: List[Optional[Tuple[int, int]]] = []
+    for path in sources:
+        try:
+            stat = path.stat()
+            state.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            state.append(None)
+    return tuple(state)
+
+
+def _read_sources(sources: List[Path]) -> Tuple[SourceState, List[Tuple[Path, bytes]]]:
+    """stat и содержимое существующих источников"""
+    state = _source_state(sources)
+    contents = []
+    for path, path_state in zip(sources, state):
+        if path_state is not None:
+            try:
+                contents.append((path, path.read_bytes()))
+            except OSError:
+                pass
+    return state, contents
+
+
+def _compile(
+    toplevel: Path,
+    state: SourceState,
+    contents: List[Tuple[Path, bytes]]
+) -> Optional[CompiledCommitTypes]:
+    """Компилирует реестр; None - правил нет или они некорректны (встроенные типы)"""
+    commit_types = CommitTypeDetector.COMMIT_TYPES
+    declared = False
+    for path, data in contents:
+        try:
+            document = tomllib.loads(data.decode("utf-8"))
+            config = document.get("tool", {}).get(TOOL_TABLE) if path.name == PYPROJECT_FILENAME else document
+            if not config:
+                continue
+            commit_types = parse_commit_types(config, commit_types)
+            declared = True
+        except (UnicodeDecodeError, tomllib.TOMLDecodeError, ValueError, AttributeError) as e:
+            logger.warning("Правила типов коммитов в %s не применены: %s", path, e)
+            return None
+    if not declared:
+        return None
+    return CompiledCommitTypes(commit_types, key=(str(toplevel), state))
+
+
+def load_registry(toplevel: Path) -> Optional[CompiledCommitTypes]:
+    """Реестр правил репозитория (блокирующий вызов); None - встроенные типы
+
+    При неизменных источниках возвращается тот же объект без чтения
+    файлов (только stat).
+    """
+    sources = registry_sources(toplevel)
+    cached = _REGISTRIES.get(toplevel)
+    if cached is not None and cached[0] == _source_state(sources):
+        return cached[1]
+
+    with _REGISTRIES_LOCK:
+        # Пока ждали блокировку, реестр мог собрать параллельный запрос
+        cached = _REGISTRIES.get(toplevel)
+        state, contents = _read_sources(sources)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        registry = _compile(toplevel, state, contents)
+        _REGISTRIES[toplevel] = (state, registry)
+        return registry
+
+
+async def load_commit_types(toplevel: Path) -> Optional[CompiledCommitTypes]:
+    """Загружает реестр в потоке, не блокируя event loop"""
+    return await asyncio.to_thread(load_registry, toplevel)
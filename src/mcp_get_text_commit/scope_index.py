@@ -0,0 +1,99 @@
+"""
+Scope Index
+
+Scope Conventional Commits по путям изменений в монорепозитории. Каталоги
+пакетов (с манифестом pyproject.toml, package.json, composer.json или из
+настроенной карты префиксов) хранятся в префиксном дереве по компонентам
+пути: scope файла - ближайший охватывающий пакет, поиск стоит O(глубина
+пути) вместо проверки каждого пакета для каждого файла.
+"""
+
+from typing import Any, Dict, Iterable, Mapping, Optional, Set
+
+# Ключ scope в узле дерева (компоненты пути не содержат "\0")
+_SCOPE = "\0"
+
+# Манифесты в этих каталогах - зависимости, а не пакеты проекта
+IGNORED_DIRECTORIES = frozenset({"node_modules", "vendor", "site-packages"})
+
+
+class ScopeTrie:
+    """Префиксное дерево каталогов пакетов: {компонент: узел}, scope в ключе "\\0"
+
+    Манифест в корне репозитория scope не задает: он описывает весь
+    репозиторий.
+    """
+
+    def __init__(self) -> None:
+        # Значения - узлы-словари, а в ключе _SCOPE - строка scope
+        self._root: Dict[str, Any] = {}
+        self.size = 0
+
+    @classmethod
+    def build(
+        cls,
+        manifest_paths: Iterable[str],
+        scope_map: Optional[Mapping[str, str]] = None
+    ) -> "ScopeTrie":
+        """Дерево по путям манифестов (от корня репозитория) и карте {префикс: scope}
+
+        Scope пакета по манифесту - имя его каталога; карта переопределяет
+        и дополняет пакеты из манифестов.
+        """
+        trie = cls()
+        for path in manifest_paths:
+            directory = path.rpartition("/")[0]
+            if directory and IGNORED_DIRECTORIES.isdisjoint(directory.split("/")):
+                trie.insert(directory, directory.rpartition("/")[2])
+        for prefix, scope in (scope_map or {}).items():
+            trie.insert(prefix, scope)
+        return trie
+
+    def insert(self, prefix: str, scope: str) -> None:
+        """Задает scope для каталога prefix и всех вложенных путей"""
+        parts = [part for part in prefix.strip("/").split("/") if part]
+        if not parts or not scope:
+            return
+        node = self._root
+        for part in parts:
+            node = node.setdefault(part, {})
+        if _SCOPE not in node:
+            self.size += 1
+        node[_SCOPE] = scope
+
+    def lookup_directory(self, directory: str) -> Optional[str]:
+        """Scope ближайшего пакета, охватывающего каталог"""
+        scope: Optional[str] = None
+        node = self._root
+        for part in directory.split("/"):
+            child: Optional[Dict[str, Any]] = node.get(part)
+            if child is None:
+                break
+            node = child
+            scope = node.get(_SCOPE, scope)
+        return scope
+
+    def lookup(self, path: str) -> Optional[str]:
+        """Scope файла (путь от корня репозитория)"""
+        return self.lookup_directory(path.rpartition("/")[0])
+
+    def scope_for(self, paths: Iterable[str]) -> Optional[str]:
+        """Общий scope файлов; None, если файлы вне пакетов или в разных пакетах
+
+        Каждый каталог ищется в дереве один раз: остальные файлы того же
+        каталога пропускаются.
+        """
+        if not self.size:
+            return None
+        directories: Set[str] = set()
+        common: Optional[str] = None
+        for path in paths:
+            directory = path.rpartition("/")[0]
+            if directory in directories:
+                continue
+            directories.add(directory)
+            scope = self.lookup_directory(directory)
+            if scope is None or (common is not None and common != scope):
+                return None
+            common = scope
+        return common
@@ -6,13 +6,24 @@ MCP Server для Git Commit Intelligence
 
 import logging
 from mcp.server.fastmcp import FastMCP, Context
-from .models import GetTextCommitParams, GetTextCommitResult
-from .commit_text_generator import CommitTextGenerator
+from .models import (
+    GetTextCommitBatchParams,
+    GetTextCommitBatchResult,
+    GetTextCommitParams,
+    GetTextCommitRangeParams,
+    GetTextCommitRangeResult,
+    GetTextCommitResult,
+    ServerStats,
+)
+from .commit_service import CommitService
 
 
 # Создаем MCP сервер
 mcp = FastMCP("Git Commit Intelligence")
 
+# Общий сервис с кэшем результатов на весь процесс сервера
+service = CommitService()
+
 
 @mcp.tool()
 async def get_text_commit(
@@ -25,7 +36,7 @@ async def get_text_commit(
     в соответствии с Conventional Commits стандартом.
     
     Args:
-        params: Параметры генерации (рабочая директория, стиль)
+        params: Параметры генерации (рабочая директория, стиль, потоковый режим)
         ctx: Контекст для логирования
         
     Returns:
@@ -34,12 +45,8 @@ async def get_text_commit(
     await ctx.info("Начинаю анализ git изменений...")
 
     try:
-        # Основная логика генерации
-        result = await CommitTextGenerator.generate(
-            working_directory=params.working_directory,
-            style=params.style,
-            logger=ctx
-        )
+        # Основная логика генерации (повторные запросы без изменений - из кэша)
+        result = await service.get_text_commit(params, ctx)
 
         await ctx.info(f"Проанализировано файлов: {result.files_analyzed}")
         
@@ -61,6 +68,70 @@ async def get_text_commit(
         )
 
 
+@mcp.tool()
+async def get_text_commit_batch(
+    params: GetTextCommitBatchParams,
+    ctx: Context
+) -> GetTextCommitBatchResult:
+    """
+    Генерирует commit messages для нескольких репозиториев (checkout'ов,
+    worktree) за один запрос с ограниченной параллельностью.
+    
+    Args:
+        params: Список рабочих директорий, стиль и лимит параллельности
+        ctx: Контекст для логирования
+        
+    Returns:
+        GetTextCommitBatchResult с результатом или ошибкой для каждого репозитория
+    """
+    await ctx.info(f"Пакетный анализ {len(params.working_directories)} репозиториев...")
+    result = await service.get_text_commit_batch(params, ctx)
+
+    failed = sum(1 for item in result.results if item.error)
+    await ctx.info(f"Готово: {len(result.results) - failed} успешно, {failed} с ошибками")
+    return result
+
+
+@mcp.tool()
+async def get_text_commit_range(
+    params: GetTextCommitRangeParams,
+    ctx: Context
+) -> GetTextCommitRangeResult:
+    """
+    Предлагает commit messages для каждого коммита диапазона (например,
+    main..feature или последние N коммитов) - для переписывания истории
+    и аудита. История читается одним процессом git log.
+    
+    Args:
+        params: Рабочая директория, диапазон коммитов и их максимум
+        ctx: Контекст для логирования и уведомлений о ходе анализа
+        
+    Returns:
+        GetTextCommitRangeResult с предложением для каждого коммита
+    """
+    await ctx.info(f"Анализ коммитов диапазона {params.revision_range}...")
+    try:
+        result = await service.get_text_commit_range(params, ctx)
+    except Exception as e:
+        await ctx.error(f"Ошибка анализа диапазона: {str(e)}")
+        raise
+
+    await ctx.info(f"Готово: проанализировано коммитов: {len(result.results)}")
+    return result
+
+
+@mcp.tool()
+async def get_server_stats() -> ServerStats:
+    """
+    Возвращает статистику сервера: перцентили времени этапов по последним
+    запросам (если метрики включены), счетчики кэша и фонового наблюдения.
+    
+    Returns:
+        ServerStats со сводкой метрик
+    """
+    return service.stats()
+
+
 def create_server() -> FastMCP:
     """Создает и настраивает MCP сервер"""
     return mcp
@@ -0,0 +1,70 @@
+"""
+Single Flight
+
+Объединение одновременных одинаковых вычислений: пока вычисление по
+ключу выполняется, новые вызовы с тем же ключом ждут его результат, а не
+запускают свое. Отмена одного ожидающего не прерывает общее вычисление,
+пока его результат нужен другим; когда уходит последний ожидающий,
+вычисление отменяется.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight:
+    """Выполняющееся вычисление и число его ожидающих"""
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Реестр выполняющихся вычислений по ключу со счетчиками"""
+
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.joined = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """Результат вычисления по ключу: общего, если оно уже выполняется
+
+        factory запускается отдельной задачей (в контексте первого
+        вызова); ошибка вычисления пробрасывается всем ожидающим.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+            self.started += 1
+        else:
+            self.joined += 1
+
+        flight.waiters += 1
+        try:
+            # shield: отмена ожидающего не отменяет общую задачу
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # Результат больше никому не нужен; новые вызовы начнут новое вычисление
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _finished(self, key: Hashable, flight: _Flight) -> None:
+        self._forget(key, flight)
+        if not flight.task.cancelled():
+            # Ошибка уже передана ожидающим (или их не осталось): не логировать как забытую
+            flight.task.exception()
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
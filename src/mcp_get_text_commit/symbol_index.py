@@ -0,0 +1,111 @@
+"""
+Symbol Index
+
+Индекс затронутых символов по заголовкам hunk'ов git diff. Для каждого
+hunk'а git сам находит охватывающую функцию/класс ("@@ -1,2 +1,3 @@ def foo"),
+в том числе по драйверам diff.<lang>.xfuncname из .gitattributes, поэтому
+для описания изменений достаточно просмотреть только строки заголовков,
+а не тело diff.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .diff_stream import parse_diff_header_path
+
+# Строка заголовка файла или hunk'а (контекст после второго "@@")
+_HEADER_RE = re.compile(r'\n(?:(diff --git [^\n]*)|@@ -[^\n@]*@@[ \t]*([^\n]*))')
+
+# Объявление с ключевым словом или вызов/сигнатура вида name(
+_SYMBOL_RE = re.compile(
+    r'\b(?P<kind>class|struct|interface|enum|trait|module|def|function|func|fn|sub)'
+    r'[^\S\n]+(?P<name>[A-Za-z_$][\w$]*)'
+    r'|\b(?!(?:if|for|while|switch|return|catch|elif|with|func|function)\b)'
+    r'(?P<callable>[A-Za-z_$][\w$]*)[^\S\n]*\('
+)
+
+# Вид символа -> формат описания изменения
+_KIND_FORMATS = {
+    "class": "update {} class",
+    "struct": "update {} struct",
+    "interface": "update {} interface",
+    "enum": "update {} enum",
+    "trait": "update {} trait",
+    "module": "update {} module",
+    "def": "update {}() method",
+}
+_CALLABLE_FORMAT = "update {}() function"
+
+
+def parse_hunk_symbol(context: str) -> Optional[Tuple[str, str]]:
+    """(вид, имя) символа из контекста заголовка hunk'а или None"""
+    match = _SYMBOL_RE.search(context)
+    if match is None:
+        return None
+    if match.group("kind"):
+        return match.group("kind"), match.group("name")
+    return "function", match.group("callable")
+
+
+def describe_symbol(kind: str, name: str) -> str:
+    """Описание изменения символа для commit message"""
+    return _KIND_FORMATS.get(kind, _CALLABLE_FORMAT).format(name)
+
+
+class SymbolIndex:
+    """Затронутые символы по файлам в порядке появления в diff
+
+    Части diff можно подавать по очереди (текущий файл сохраняется между
+    вызовами feed) или обрабатывать отдельными индексами и сливать по
+    порядку частей - результат совпадает с обработкой diff целиком.
+    """
+
+    def __init__(self, limit_per_file: int = 32):
+        self.limit_per_file = limit_per_file
+        self.files: Dict[str, Dict[str, None]] = {}
+        self._path = ""
+
+    def feed(self, diff_text: str) -> None:
+        """Учитывает заголовки файлов и hunk'ов очередной части diff"""
+        if not diff_text:
+            return
+        if diff_text.startswith(("diff --git ", "@@ ")):
+            diff_text = "\n" + diff_text
+
+        for match in _HEADER_RE.finditer(diff_text):
+            header, context = match.groups()
+            if header is not None:
+                self._path = parse_diff_header_path(header)
+                continue
+            if not context:
+                continue
+            symbol = parse_hunk_symbol(context)
+            if symbol is not None:
+                self._add(self._path, describe_symbol(*symbol))
+
+    def merge(self, other: "SymbolIndex") -> None:
+        """Добавляет индекс следующей части diff
+
+        Символы другой части до ее первого заголовка файла относятся к
+        текущему файлу этого индекса.
+        """
+        for path, symbols in other.files.items():
+            for description in symbols:
+                self._add(path or self._path, description)
+        if other._path:
+            self._path = other._path
+
+    def changes(self, limit: int) -> List[str]:
+        """До limit уникальных описаний измененных символов по порядку файлов"""
+        changes: Dict[str, None] = {}
+        for symbols in self.files.values():
+            for description in symbols:
+                changes.setdefault(description)
+                if len(changes) >= limit:
+                    return list(changes)
+        return list(changes)
+
+    def _add(self, path: str, description: str) -> None:
+        symbols = self.files.setdefault(path, {})
+        if len(symbols) < self.limit_per_file:
+            symbols.setdefault(description)
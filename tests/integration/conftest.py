@@ -0,0 +1,69 @@
+"""
+Общие фикстуры интеграционных тестов
+"""
+import asyncio
+import subprocess
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pytest
+
+from mcp_get_text_commit.git_analyzer import GitAnalyzer
+
+
+def run_git(repo: Path, *args: str) -> str:
+    """Выполняет git команду в репозитории и возвращает stdout."""
+    return subprocess.run(
+        ["git", *args], cwd=repo, check=True, capture_output=True, text=True
+    ).stdout
+
+
+@pytest.fixture
+def git_repo(tmp_path: Path) -> Path:
+    """Временный git репозиторий с первым коммитом и изменениями в рабочей копии."""
+    run_git(tmp_path, "init", "-q")
+    run_git(tmp_path, "config", "user.email", "dev@example.com")
+    run_git(tmp_path, "config", "user.name", "Dev")
+    (tmp_path / "service.py").write_text("import os\n", encoding="utf-8")
+    (tmp_path / "README.md").write_text("# Title\n", encoding="utf-8")
+    run_git(tmp_path, "add", "-A")
+    run_git(tmp_path, "commit", "-q", "-m", "init")
+    (tmp_path / "service.py").write_text(
+        "import os\n\ndef create_user():\n    return None\n", encoding="utf-8"
+    )
+    (tmp_path / "README.md").write_text("# Title\n\nUsage\n", encoding="utf-8")
+    return tmp_path
+
+
+class StalledGit:
+    """Подмена запуска git: выбранные команды после вывода зависают"""
+
+    def __init__(self):
+        self.predicates: List[Callable[[Tuple[str, ...]], bool]] = []
+        self.processes: List[asyncio.subprocess.Process] = []
+
+    def stall(self, predicate: Callable[[Tuple[str, ...]], bool]) -> None:
+        self.predicates.append(predicate)
+
+
+@pytest.fixture
+def stalled_git(monkeypatch: pytest.MonkeyPatch) -> StalledGit:
+    """Команды git, для которых stall() вернул True, не завершаются после вывода."""
+    stalled = StalledGit()
+    original = GitAnalyzer._spawn_git
+
+    async def spawn_git(self: GitAnalyzer, *args: str) -> asyncio.subprocess.Process:
+        if not any(predicate(args) for predicate in stalled.predicates):
+            return await original(self, *args)
+        process = await asyncio.create_subprocess_exec(
+            "sh", "-c", 'git "$@"; exec sleep 30', "sh", *args,
+            cwd=self.working_directory,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stalled.processes.append(process)
+        return process
+
+    monkeypatch.setattr(GitAnalyzer, "_spawn_git", spawn_git)
+    return stalled
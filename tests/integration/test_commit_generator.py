@@ -1,9 +1,19 @@
 """
 Интеграционные тесты для CommitTextGenerator (v2, исправленный)
 """
+import asyncio
+
 import pytest
 from pathlib import Path
+from mcp_get_text_commit import metrics
+from mcp_get_text_commit.commit_service import CommitService
 from mcp_get_text_commit.commit_text_generator import CommitTextGenerator
+from mcp_get_text_commit.config import Settings
+from mcp_get_text_commit.exclusions import literal_pathspecs
+from mcp_get_text_commit.git_analyzer import GitAnalyzer
+from mcp_get_text_commit.models import GetTextCommitParams, NotAGitRepositoryError
+
+from .conftest import StalledGit, run_git
 
 pytestmark = pytest.mark.asyncio
 
@@ -40,4 +50,334 @@ async def test_generate_in_non_git_repo(tmp_path: Path):
     assert result is not None
     assert result.commit_text == "chore: update project files"
     assert result.confidence == 0.1
-    assert result.has_changes is True
\ No newline at end of file
+    assert result.has_changes is True
+async def test_streaming_matches_buffered(git_repo: Path):
+    """Тестирует, что потоковый режим дает тот же commit message."""
+    buffered = await CommitTextGenerator.generate(working_directory=str(git_repo))
+    streamed = await CommitTextGenerator.generate(
+        working_directory=str(git_repo), streaming=True
+    )
+    assert streamed == buffered
+    assert streamed.files_analyzed == 2
+    assert "create_user" in streamed.commit_text
+
+
+async def test_collect_git_data_matches_git_commands(git_repo: Path):
+    """Тестирует, что сбор данных через porcelain v2 дает прежнюю структуру."""
+    data = await GitAnalyzer(str(git_repo)).collect_git_data()
+
+    assert data["staged_files"] == run_git(git_repo, "diff", "--name-only").split()
+    assert data["staged_diff"] == run_git(git_repo, "diff").strip()
+    assert data["current_branch"] == run_git(git_repo, "rev-parse", "--abbrev-ref", "HEAD").strip()
+    assert data["numstat"] == {"README.md": (2, 0), "service.py": (3, 0)}
+    assert data["file_status"] == {"README.md": ".M", "service.py": ".M"}
+    assert data["change_set"].text() == data["staged_diff"]
+    assert data["change_set"].patch_text(1).startswith("diff --git a/service.py")
+
+
+async def test_collect_git_data_not_a_repository(tmp_path: Path):
+    """Тестирует ошибку для директории вне git репозитория."""
+    with pytest.raises(NotAGitRepositoryError):
+        await GitAnalyzer(str(tmp_path)).collect_git_data()
+
+
+async def test_collect_git_data_with_patch_budget(git_repo: Path):
+    """Тестирует двухфазный сбор: patch только для файлов в пределах бюджета."""
+    (git_repo / "vendor.lock").write_text("".join(f"line {i}\n" for i in range(2000)))
+    run_git(git_repo, "add", "-N", "vendor.lock")
+
+    analyzer = GitAnalyzer(str(git_repo), Settings(patch_budget_bytes=4096))
+    data = await analyzer.collect_git_data()
+
+    assert data["staged_files"] == ["README.md", "service.py", "vendor.lock"]
+    assert data["patch_files"] == ["README.md", "service.py"]
+    assert data["omitted_files"] == ["vendor.lock"]
+    assert "vendor.lock" not in data["staged_diff"]
+    assert "create_user" in data["staged_diff"]
+
+    result = await CommitTextGenerator.generate(working_directory=str(git_repo))
+    assert result.files_analyzed == 3
+
+
+async def test_patch_fetch_is_truncated_at_budget(git_repo: Path):
+    """Тестирует, что чтение patch останавливается на границе бюджета."""
+    patch = await GitAnalyzer(str(git_repo))._fetch_patch_bytes(literal_pathspecs(["README.md", "service.py"]), 120)
+    assert 0 < len(patch) <= 120
+    assert patch.startswith(b"diff --git a/README.md")
+
+
+async def test_nested_rules_add_footer(git_repo: Path):
+    """Тестирует, что вложенный rules.md в каталоге изменений учитывается."""
+    (git_repo / "api").mkdir()
+    (git_repo / "api" / "rules.md").write_text("Track work in TODO.md\n")
+    (git_repo / "api" / "views.py").write_text("def index():\n    return None\n")
+    run_git(git_repo, "add", "api/rules.md", "api/views.py")
+    run_git(git_repo, "commit", "-q", "-m", "api")
+
+    without_api = await CommitTextGenerator.generate(working_directory=str(git_repo))
+    assert "TODO.md" not in without_api.commit_text
+
+    (git_repo / "api" / "views.py").write_text("def index():\n    return 1\n")
+    data = await GitAnalyzer(str(git_repo)).collect_git_data()
+    assert data["project_rules"].mentions_todo
+
+    with_api = await CommitTextGenerator.generate(working_directory=str(git_repo))
+    assert with_api.commit_text.endswith("This addresses the requirements from TODO.md")
+
+
+async def test_excluded_numstat_only_when_needed(git_repo: Path):
+    """Тестирует, что numstat исключенных файлов запрашивается, только если они изменены."""
+    def excluded_numstat_runs() -> int:
+        return sum(
+            command.command.startswith("diff -z --numstat") for command in recorder.result().git_commands
+        )
+
+    with metrics.recording() as recorder:
+        data = await GitAnalyzer(str(git_repo)).collect_git_data()
+    assert data["excluded_files"] == []
+    assert excluded_numstat_runs() == 0
+
+    (git_repo / "package-lock.json").write_text('{"lockfileVersion": 3}\n')
+    run_git(git_repo, "add", "-N", "package-lock.json")
+    with metrics.recording() as recorder:
+        data = await GitAnalyzer(str(git_repo)).collect_git_data()
+    assert data["excluded_files"] == ["package-lock.json"]
+    assert excluded_numstat_runs() == 1
+
+
+async def test_excluded_files_counted_by_numstat_only(git_repo: Path):
+    """Тестирует, что lockfile'ы и сгенерированные файлы не попадают в patch."""
+    (git_repo / ".gitattributes").write_text("gen/*.py linguist-generated\n")
+    (git_repo / "gen").mkdir()
+    (git_repo / "gen" / "client.py").write_text("def generated_call():\n    pass\n")
+    (git_repo / "package-lock.json").write_text('{"lockfileVersion": 3}\n')
+    run_git(git_repo, "add", ".gitattributes")
+    run_git(git_repo, "add", "-N", "gen/client.py", "package-lock.json")
+
+    data = await GitAnalyzer(str(git_repo)).collect_git_data()
+    assert data["staged_files"] == run_git(git_repo, "diff", "--name-only").split()
+    assert data["excluded_files"] == ["gen/client.py", "package-lock.json"]
+    assert data["omitted_files"] == data["excluded_files"]
+    assert data["numstat"]["gen/client.py"] == (2, 0)
+    assert "generated_call" not in data["staged_diff"]
+    assert "lockfileVersion" not in data["staged_diff"]
+    assert "create_user" in data["staged_diff"]
+
+    buffered = await CommitTextGenerator.generate(working_directory=str(git_repo))
+    streamed = await CommitTextGenerator.generate(working_directory=str(git_repo), streaming=True)
+    assert streamed == buffered
+    assert buffered.files_analyzed == 4
+    assert "generated_call" not in buffered.commit_text
+
+
+async def test_large_files_excluded_by_threshold(git_repo: Path):
+    """Тестирует порог числа измененных строк для загрузки patch."""
+    (git_repo / "big.py").write_text("".join(f"def big_{i}():\n" for i in range(50)))
+    run_git(git_repo, "add", "-N", "big.py")
+
+    analyzer = GitAnalyzer(str(git_repo), Settings(exclude_max_changed_lines=10))
+    data = await analyzer.collect_git_data()
+    assert data["excluded_files"] == ["big.py"]
+    assert data["patch_files"] == ["README.md", "service.py"]
+    assert "big_0" not in data["staged_diff"]
+    assert "create_user" in data["staged_diff"]
+
+    chunks = [chunk.text async for chunk in analyzer.stream_diff(data["patch_pathspecs"])]
+    assert "".join(chunks).strip() == data["staged_diff"]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+async def test_renamed_files_detected_from_metadata(git_repo: Path, streaming: bool):
+    """Тестирует, что переименование без изменений дает refactor без разбора содержимого."""
+    run_git(git_repo, "checkout", "--", ".")
+    (git_repo / "core").mkdir()
+    (git_repo / "service.py").rename(git_repo / "core" / "service.py")
+    run_git(git_repo, "add", "-N", "core/service.py")
+
+    data = await GitAnalyzer(str(git_repo)).collect_git_data()
+    assert data["staged_files"] == ["core/service.py"]
+    assert data["renames"] == {"core/service.py": ("service.py", 100)}
+    assert "+import os" not in data["staged_diff"]
+
+    result = await CommitTextGenerator.generate(working_directory=str(git_repo), streaming=streaming)
+    assert result.commit_text == "refactor: move service.py to core/"
+    assert result.confidence == 0.9
+
+    # Без поиска переименований тот же файл - удаление и добавление
+    analyzer = GitAnalyzer(str(git_repo), Settings(rename_detection=False))
+    data = await analyzer.collect_git_data()
+    assert data["staged_files"] == ["core/service.py", "service.py"]
+    assert data["renames"] == {}
+
+
+async def test_renamed_file_patch_in_budget_mode(git_repo: Path):
+    """Тестирует, что в бюджетном режиме patch переименования - только diff содержимого."""
+    lines = [f"def handler_{index}():\n    return {index}\n" for index in range(20)]
+    (git_repo / "handlers.py").write_text("".join(lines))
+    run_git(git_repo, "add", "handlers.py")
+    run_git(git_repo, "commit", "-q", "-m", "handlers")
+    (git_repo / "handlers.py").rename(git_repo / "routes.py")
+    (git_repo / "routes.py").write_text("".join(lines) + "def handler_new():\n    return None\n")
+    run_git(git_repo, "add", "-N", "routes.py")
+
+    data = await GitAnalyzer(str(git_repo), Settings(patch_budget_bytes=4096)).collect_git_data()
+    assert data["renames"] == {"routes.py": ("handlers.py", 94)}
+    assert data["numstat"]["routes.py"] == (2, 0)
+    assert data["patch_files"] == ["README.md", "routes.py", "service.py"]
+    assert "rename from handlers.py" in data["staged_diff"]
+    assert "+def handler_new():" in data["staged_diff"]
+    assert "handler_0" not in data["staged_diff"]
+
+
+async def test_scope_from_monorepo_packages(git_repo: Path):
+    """Тестирует scope subject по пакету монорепозитория и кэш дерева пакетов."""
+    for package in ("billing", "auth"):
+        (git_repo / "packages" / package).mkdir(parents=True)
+        (git_repo / "packages" / package / "package.json").write_text("{}\n")
+        (git_repo / "packages" / package / "index.js").write_text("module.exports = {}\n")
+    run_git(git_repo, "add", "-A")
+    run_git(git_repo, "commit", "-q", "-m", "packages")
+    (git_repo / "packages" / "billing" / "index.js").write_text("function createInvoice() {}\n")
+
+    result = await CommitTextGenerator.generate(working_directory=str(git_repo))
+    assert result.commit_text.startswith("feat(billing): add createInvoice() function")
+
+    analyzer = GitAnalyzer(str(git_repo))
+    assert await analyzer.scope_trie() is await analyzer.scope_trie()
+
+    (git_repo / "packages" / "auth" / "index.js").write_text("function login() {}\n")
+    result = await CommitTextGenerator.generate(working_directory=str(git_repo))
+    assert result.commit_text.startswith("feat: ")
+
+
+async def test_repository_rule_registry(git_repo: Path):
+    """Тестирует типы коммитов из pyproject.toml репозитория и сброс кэша результатов."""
+    run_git(git_repo, "checkout", "--", ".")
+    (git_repo / "bench").mkdir()
+    (git_repo / "bench" / "io.py").write_text("print(1)\n")
+    run_git(git_repo, "add", "-A")
+    run_git(git_repo, "commit", "-q", "-m", "bench")
+    (git_repo / "bench" / "io.py").write_text("print(2)\n")
+
+    service = CommitService(Settings(result_cache_size=8))
+    params = GetTextCommitParams(working_directory=str(git_repo))
+    result = await service.get_text_commit(params)
+    assert not result.commit_text.startswith("perf")
+
+    (git_repo / "pyproject.toml").write_text(
+        '[tool.mcp-get-text-commit.commit-types.perf]\nfiles = ["bench/**"]\npriority = 6\n'
+    )
+    result = await service.get_text_commit(params)
+    assert result.commit_text.startswith("perf: ")
+
+
+async def test_history_index_refreshed_incrementally(git_repo: Path, monkeypatch: pytest.MonkeyPatch):
+    """Тестирует тип по истории коммитов и чтение только новых коммитов при обновлении индекса."""
+    run_git(git_repo, "checkout", "--", ".")
+    for value in (1, 2):
+        (git_repo / "calc.py").write_text(f"x = {value}\n")
+        run_git(git_repo, "add", "-A")
+        run_git(git_repo, "commit", "-q", "-m", f"fix(calc): off by one {value}")
+    (git_repo / "calc.py").write_text("x = 3\n")
+
+    result = await CommitTextGenerator.generate(working_directory=str(git_repo))
+    assert result.commit_text.startswith("fix: ")
+    assert (git_repo / ".git" / "mcp-get-text-commit" / "history.json").exists()
+
+    analyzer = GitAnalyzer(str(git_repo), Settings(history_enabled=False))
+    data = await analyzer.collect_git_data(diff_text=False)
+    assert data["history_prior"] == {}
+
+    analyzer = GitAnalyzer(str(git_repo))
+    index = await analyzer.history_index()
+    assert index.commits == 2
+    assert await analyzer.history_index() is index
+
+    log_calls = []
+    original = GitAnalyzer._spawn_git
+
+    async def spawn_git(self: GitAnalyzer, *args: str):
+        if args[0] == "log":
+            log_calls.append(args)
+        return await original(self, *args)
+
+    monkeypatch.setattr(GitAnalyzer, "_spawn_git", spawn_git)
+    previous_head = index.head
+    run_git(git_repo, "commit", "-q", "-am", "fix(calc): off by one 3")
+    index = await analyzer.history_index()
+    assert index.commits == 3
+    assert index.head == run_git(git_repo, "rev-parse", "HEAD").strip()
+    assert [args[-2] for args in log_calls] == [f"{previous_head}..HEAD"]
+
+
+def _is_diff_stream(args) -> bool:
+    return args[0] == "diff" and "--numstat" not in args
+
+
+async def test_deadline_returns_partial_result(git_repo: Path, stalled_git: StalledGit):
+    """Тестирует, что по deadline git останавливается, а результат строится по прочитанному."""
+    full = await CommitTextGenerator.generate(working_directory=str(git_repo))
+    stalled_git.stall(_is_diff_stream)
+
+    result = await CommitTextGenerator.generate(working_directory=str(git_repo), deadline_seconds=1.0)
+    assert result.partial
+    assert result.has_changes
+    assert result.files_analyzed == 2
+    assert 0 < result.confidence < full.confidence
+    assert result.commit_text.split(":")[0] == full.commit_text.split(":")[0]
+    assert stalled_git.processes
+    assert all(process.returncode is not None for process in stalled_git.processes)
+
+
+async def test_deadline_before_collection(git_repo: Path, stalled_git: StalledGit):
+    """Тестирует deadline, истекший до получения списка изменений."""
+    stalled_git.stall(lambda args: "status" in args)
+
+    result = await CommitTextGenerator.generate(working_directory=str(git_repo), deadline_seconds=0.5)
+    assert result.partial
+    assert result.commit_text == "chore: update project files"
+    assert all(process.returncode is not None for process in stalled_git.processes)
+
+
+async def test_cancellation_stops_git(git_repo: Path, stalled_git: StalledGit):
+    """Тестирует, что отмена запроса останавливает запущенные процессы git."""
+    stalled_git.stall(lambda args: "status" in args)
+
+    task = asyncio.ensure_future(CommitTextGenerator.generate(working_directory=str(git_repo)))
+    while not stalled_git.processes:
+        await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert all(process.returncode is not None for process in stalled_git.processes)
+
+
+class _ProgressContext:
+    """Контекст, сохраняющий уведомления о прогрессе"""
+
+    def __init__(self):
+        self.progress = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.progress.append((progress, total, message))
+
+    async def info(self, message): pass
+
+    async def warning(self, message): pass
+
+    async def error(self, message): pass
+
+    async def debug(self, message): pass
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+async def test_progress_reported(git_repo: Path, streaming: bool):
+    """Тестирует уведомления о прогрессе: файлы, предварительный тип, итог."""
+    ctx = _ProgressContext()
+    result = await CommitTextGenerator.generate(working_directory=str(git_repo), logger=ctx, streaming=streaming)
+
+    messages = [message for _, _, message in ctx.progress]
+    assert messages[0].startswith("Найдено файлов: 2")
+    assert messages[1].startswith("Предварительный тип: ")
+    assert any(message.startswith("Прочитано diff" if streaming else "Оценено файлов") for message in messages)
+    assert ctx.progress[-1] == (2, 2, f"Тип коммита: {result.commit_text.split(':')[0]}")
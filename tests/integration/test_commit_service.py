@@ -0,0 +1,344 @@
+"""
+Интеграционные тесты для CommitService (кэш результатов)
+"""
+import asyncio
+import os
+import subprocess
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from mcp_get_text_commit.commit_service import CommitService
+from mcp_get_text_commit.commit_range import CommitRangeAnalyzer
+from mcp_get_text_commit.commit_text_generator import CommitTextGenerator
+from mcp_get_text_commit.config import Settings
+from mcp_get_text_commit.log_context import LoggingContext
+from mcp_get_text_commit.models import (
+    GetTextCommitBatchParams,
+    GetTextCommitParams,
+    GetTextCommitRangeParams,
+    GitCommandError,
+)
+
+from .conftest import StalledGit, run_git
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_repeat_request_is_cached(git_repo: Path):
+    """Повторный запрос без изменений берется из кэша."""
+    service = CommitService(Settings(result_cache_size=8))
+    params = GetTextCommitParams(working_directory=str(git_repo))
+
+    first = await service.get_text_commit(params)
+    second = await service.get_text_commit(params)
+    assert second == first
+    assert service.cache.stats()["hits"] == 1
+    assert service.cache.stats()["misses"] == 1
+
+
+async def test_cache_invalidated_by_changes(git_repo: Path):
+    """Изменение рабочей копии или индекса дает новый ключ кэша."""
+    service = CommitService(Settings(result_cache_size=8))
+    params = GetTextCommitParams(working_directory=str(git_repo))
+    key = await service.cache_key(params)
+
+    service_file = git_repo / "service.py"
+    service_file.write_text(service_file.read_text() + "\ndef delete_user():\n    pass\n")
+    stat = service_file.stat()
+    os.utime(service_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    changed_key = await service.cache_key(params)
+    assert changed_key != key
+
+    run_git(git_repo, "add", "README.md")
+    staged_key = await service.cache_key(params)
+    assert staged_key not in (key, changed_key)
+
+    other_style = await service.cache_key(
+        GetTextCommitParams(working_directory=str(git_repo), style="other")
+    )
+    assert other_style != staged_key
+
+
+async def test_non_repository_is_not_cached(tmp_path: Path):
+    """Для директории вне git кэш не используется и возвращается fallback."""
+    service = CommitService(Settings(result_cache_size=8))
+    result = await service.get_text_commit(GetTextCommitParams(working_directory=str(tmp_path)))
+    assert result.confidence == 0.1
+    assert len(service.cache) == 0
+
+
+async def test_batch_reports_per_repository(git_repo: Path, tmp_path_factory: pytest.TempPathFactory):
+    """Пакетный запрос: результаты в порядке запроса, ошибки - по репозиториям."""
+    service = CommitService(Settings(result_cache_size=8))
+    not_a_repo = tmp_path_factory.mktemp("plain")
+    params = GetTextCommitBatchParams(
+        working_directories=[str(git_repo), str(not_a_repo), str(git_repo)],
+        max_concurrency=2
+    )
+
+    batch = await service.get_text_commit_batch(params)
+    assert [item.working_directory for item in batch.results] == params.working_directories
+
+    first, failed, duplicate = batch.results
+    single = await service.get_text_commit(GetTextCommitParams(working_directory=str(git_repo)))
+    assert first.error is None and first.result == single
+    assert duplicate.result == single
+    assert failed.result is None and "Not a git repository" in failed.error
+    # Дубликат анализируется один раз, одиночный запрос после пакета берется из кэша
+    assert service.cache.stats()["misses"] == 1
+    assert service.cache.stats()["hits"] == 1
+
+
+async def test_watcher_precomputes_after_index_change(git_repo: Path):
+    """После изменения индекса результат пересчитывается в фоне и берется из кэша."""
+    settings = Settings(
+        result_cache_size=8,
+        watch_enabled=True,
+        watch_debounce_seconds=0,
+        watch_poll_interval_seconds=3600
+    )
+    service = CommitService(settings)
+    params = GetTextCommitParams(working_directory=str(git_repo))
+    try:
+        await service.get_text_commit(params)
+        assert service.watcher.watched == [str(git_repo.resolve())]
+
+        await service.watcher.poll()
+        assert service.watcher.recomputations == 0
+
+        run_git(git_repo, "add", "README.md")
+        await service.watcher.poll()
+        await service.watcher.wait_idle()
+        assert service.watcher.recomputations == 1
+
+        misses = service.cache.stats()["misses"]
+        await service.get_text_commit(params)
+        assert service.cache.stats()["misses"] == misses
+        assert service.cache.stats()["hits"] == 1
+    finally:
+        await service.watcher.close()
+
+
+async def test_watcher_precomputes_after_worktree_edit(git_repo: Path):
+    """Правка измененного файла рабочей копии (без git add) тоже вызывает пересчет."""
+    settings = Settings(
+        result_cache_size=8,
+        watch_enabled=True,
+        watch_debounce_seconds=0,
+        watch_poll_interval_seconds=3600
+    )
+    service = CommitService(settings)
+    params = GetTextCommitParams(working_directory=str(git_repo))
+    try:
+        await service.get_text_commit(params)
+        (git_repo / "service.py").write_text(
+            "import os\n\ndef create_user():\n    return {}\n\n\ndef delete_user():\n    pass\n", encoding="utf-8"
+        )
+        await service.watcher.poll()
+        await service.watcher.wait_idle()
+        assert service.watcher.recomputations == 1
+
+        misses = service.cache.stats()["misses"]
+        await service.get_text_commit(params)
+        assert service.cache.stats()["misses"] == misses
+    finally:
+        await service.watcher.close()
+
+
+async def test_watcher_debounce_and_limits(git_repo: Path, tmp_path_factory: pytest.TempPathFactory):
+    """Пересчет ждет окончания debounce; число наблюдаемых репозиториев ограничено."""
+    settings = Settings(
+        watch_enabled=True,
+        watch_debounce_seconds=3600,
+        watch_poll_interval_seconds=3600,
+        watch_max_repos=1
+    )
+    service = CommitService(settings)
+    try:
+        await service.get_text_commit(GetTextCommitParams(working_directory=str(git_repo)))
+        run_git(git_repo, "add", "README.md")
+        await service.watcher.poll()
+        await service.watcher.wait_idle()
+        assert service.watcher.recomputations == 0
+
+        other = tmp_path_factory.mktemp("other")
+        run_git(other, "init", "-q")
+        await service.watcher.watch(GetTextCommitParams(working_directory=str(other)))
+        assert service.watcher.watched == [str(other.resolve())]
+    finally:
+        await service.watcher.close()
+
+
+async def test_metrics_attached_and_aggregated(git_repo: Path):
+    """Метрики запроса возвращаются в результате и агрегируются в статистике."""
+    service = CommitService(Settings(result_cache_size=8, metrics_enabled=True))
+    params = GetTextCommitParams(working_directory=str(git_repo))
+
+    first = await service.get_text_commit(params)
+    assert first.metrics is not None and not first.metrics.cache_hit
+    assert {"fingerprint", "git_collection", "detection", "generation", "git", "total"} <= set(first.metrics.stages_ms)
+    assert any(command.command.startswith("diff") for command in first.metrics.git_commands)
+    assert first.metrics.diff_bytes > 0
+
+    second = await service.get_text_commit(params)
+    assert second.metrics.cache_hit
+    assert second.commit_text == first.commit_text
+
+    stats = service.stats()
+    assert stats.metrics_enabled and stats.requests == 2 and stats.cache_hits == 1
+    assert stats.stages["total"].count == 2
+    assert stats.cache["hits"] == 1
+
+
+async def test_streamed_diff_metrics_count_bytes(git_repo: Path):
+    """Размер вывода потокового diff в метриках - в байтах, а не в символах."""
+    (git_repo / "README.md").write_text("# Заголовок\n\nИспользование\n", encoding="utf-8")
+    service = CommitService(Settings(metrics_enabled=True))
+    result = await service.get_text_commit(GetTextCommitParams(working_directory=str(git_repo), streaming=True))
+
+    diff_bytes = len(subprocess.run(["git", "diff"], cwd=git_repo, check=True, capture_output=True).stdout)
+    assert diff_bytes in [command.output_bytes for command in result.metrics.git_commands]
+
+
+async def test_metrics_disabled_by_default(git_repo: Path):
+    """По умолчанию метрики не собираются."""
+    service = CommitService(Settings(result_cache_size=8))
+    result = await service.get_text_commit(GetTextCommitParams(working_directory=str(git_repo)))
+    assert result.metrics is None
+    assert service.stats().requests == 0
+
+
+async def test_partial_result_is_not_cached(git_repo: Path, stalled_git: StalledGit):
+    """Результат, прерванный по deadline, не попадает в кэш."""
+    service = CommitService(Settings(result_cache_size=8))
+    stalled_git.stall(lambda args: args[0] == "diff" and "--numstat" not in args)
+
+    result = await service.get_text_commit(
+        GetTextCommitParams(working_directory=str(git_repo), deadline_seconds=1.0)
+    )
+    assert result.partial
+    assert service.cache.stats()["entries"] == 0
+
+
+def _commit_history(repo: Path) -> None:
+    """Коммиты разных типов поверх первого коммита git_repo."""
+    run_git(repo, "checkout", "--", ".")
+    (repo / "service.py").write_text("import os\n\ndef create_user():\n    return None\n")
+    run_git(repo, "commit", "-q", "-am", "wip")
+    (repo / "README.md").write_text("# Title\n\nInstall\n")
+    run_git(repo, "commit", "-q", "-am", "more")
+    run_git(repo, "mv", "service.py", "users.py")
+    run_git(repo, "commit", "-q", "-m", "move")
+    run_git(repo, "commit", "-q", "--allow-empty", "-m", "empty")
+
+
+async def test_commit_range_streamed(git_repo: Path):
+    """Коммиты диапазона анализируются одним git log; пул воркеров дает тот же результат."""
+    _commit_history(git_repo)
+    inline = [result async for result in CommitRangeAnalyzer(str(git_repo)).iter_results("HEAD~4..HEAD")]
+    assert [result.subject for result in inline] == ["empty", "move", "more", "wip"]
+    assert [result.commit_text.split("\n")[0] for result in inline] == [
+        "",
+        "refactor: rename service.py to users.py",
+        "docs: add new functionality",
+        "feat: implement create_user() method",
+    ]
+    assert inline[1].sha == run_git(git_repo, "rev-parse", "HEAD~1").strip()
+
+    # Пакет на каждый коммит: оценка в пуле, порядок сохраняется
+    analyzer = CommitRangeAnalyzer(str(git_repo), Settings(range_batch_bytes=1, parallel_max_workers=2))
+    pooled = [result async for result in analyzer.iter_results("HEAD~4..HEAD")]
+    assert pooled == inline
+
+    analyzer = CommitRangeAnalyzer(str(git_repo), Settings(range_max_commit_bytes=150))
+    truncated = [result async for result in analyzer.iter_results("HEAD~4..HEAD")]
+    assert truncated[3].partial and truncated[3].files_analyzed == 1
+    assert truncated[3].confidence < inline[3].confidence
+
+
+async def test_commit_range_service(git_repo: Path):
+    """Сервис возвращает последние N коммитов диапазона; неверный диапазон - ошибка git."""
+    _commit_history(git_repo)
+    service = CommitService(Settings(result_cache_size=0))
+    result = await service.get_text_commit_range(
+        GetTextCommitRangeParams(working_directory=str(git_repo), max_count=2)
+    )
+    assert [item.subject for item in result.results] == ["empty", "move"]
+
+    with pytest.raises(GitCommandError):
+        await service.get_text_commit_range(
+            GetTextCommitRangeParams(working_directory=str(git_repo), revision_range="--output=range.txt")
+        )
+    assert not (git_repo / "range.txt").exists()
+
+
+@pytest.fixture
+def gated_analysis(monkeypatch: pytest.MonkeyPatch):
+    """Анализ ждет release.set(); calls - число запущенных анализов."""
+    gate = type("Gate", (), {"calls": 0, "release": asyncio.Event()})()
+    original = CommitTextGenerator.analyze
+
+    async def analyze(*args, **kwargs):
+        gate.calls += 1
+        await gate.release.wait()
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(CommitTextGenerator, "analyze", analyze)
+    return gate
+
+
+async def _until(condition) -> None:
+    async with asyncio.timeout(10):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+class _RecordingContext(LoggingContext):
+    """Контекст запроса, запоминающий уведомления о прогрессе"""
+
+    def __init__(self, closed: bool = False):
+        self.closed = closed
+        self.progress: List[str] = []
+
+    async def report_progress(self, progress, total=None, message=None) -> None:
+        if self.closed:
+            raise ConnectionError("session closed")
+        self.progress.append(message)
+
+
+async def test_concurrent_requests_share_analysis(git_repo: Path, gated_analysis):
+    """Одновременные одинаковые запросы ждут один анализ; отмена одного не прерывает его."""
+    service = CommitService(Settings(result_cache_size=0))
+    params = GetTextCommitParams(working_directory=str(git_repo))
+    contexts = [_RecordingContext(), _RecordingContext(), _RecordingContext(closed=True)]
+    requests = [asyncio.ensure_future(service.get_text_commit(params, ctx)) for ctx in contexts]
+    await _until(lambda: service.analyses.joined == 2)
+
+    requests[0].cancel()
+    gated_analysis.release.set()
+    first, second = await asyncio.gather(*requests[1:])
+    assert requests[0].cancelled()
+    assert first == second and first.has_changes
+    assert gated_analysis.calls == 1
+    assert service.stats().coalesced == 2
+    # Прогресс общего анализа получает присоединившийся запрос, а не ушедший запустивший
+    assert contexts[0].progress == []
+    assert any(message.startswith("Тип коммита") for message in contexts[1].progress)
+    assert not service._listeners
+
+
+async def test_different_state_not_coalesced(git_repo: Path, gated_analysis):
+    """Запросы с другим стилем или с deadline не присоединяются к выполняющемуся анализу."""
+    service = CommitService(Settings(result_cache_size=0))
+    params = GetTextCommitParams(working_directory=str(git_repo))
+    requests = [
+        asyncio.ensure_future(service.get_text_commit(params)),
+        asyncio.ensure_future(service.get_text_commit(params.model_copy(update={"style": "other"}))),
+        asyncio.ensure_future(service.get_text_commit(params.model_copy(update={"deadline_seconds": 30.0}))),
+    ]
+    await _until(lambda: gated_analysis.calls == 3)
+    gated_analysis.release.set()
+    await asyncio.gather(*requests)
+    assert service.stats().coalesced == 0
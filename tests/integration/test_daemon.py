@@ -0,0 +1,105 @@
+"""
+Интеграционные тесты для локального демона и тонкого клиента
+"""
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from mcp_get_text_commit import daemon_client
+from mcp_get_text_commit.cli import main as cli_main
+from mcp_get_text_commit.commit_service import CommitService
+from mcp_get_text_commit.config import Settings
+from mcp_get_text_commit.daemon import CommitDaemon, DaemonAlreadyRunningError
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def socket_path(tmp_path_factory: pytest.TempPathFactory) -> str:
+    # Путь Unix socket ограничен ~100 символами: короткий каталог
+    return str(tmp_path_factory.mktemp("sock") / "d.sock")
+
+
+async def test_daemon_serves_cached_results(git_repo: Path, socket_path: str):
+    """Повторный запрос клиента берется из кэша демона."""
+    daemon = CommitDaemon(CommitService(Settings(result_cache_size=8)), socket_path=socket_path)
+    await daemon.start()
+    try:
+        params = {"working_directory": str(git_repo)}
+        first = await asyncio.to_thread(daemon_client.request, "get_text_commit", params, socket_path)
+        second = await asyncio.to_thread(daemon_client.request, "get_text_commit", params, socket_path)
+        assert first == second
+        assert "create_user" in first["commit_text"]
+        assert first["files_analyzed"] == 2
+
+        stats = await asyncio.to_thread(daemon_client.request, "get_server_stats", None, socket_path)
+        assert stats["cache"]["hits"] == 1
+
+        with pytest.raises(daemon_client.DaemonError, match="Unknown method"):
+            await asyncio.to_thread(daemon_client.request, "unknown", None, socket_path)
+        with pytest.raises(daemon_client.DaemonError, match="Invalid params"):
+            await asyncio.to_thread(daemon_client.request, "get_text_commit", {"streaming": "x"}, socket_path)
+
+        with pytest.raises(DaemonAlreadyRunningError):
+            await CommitDaemon(socket_path=socket_path).start()
+        # Демон продолжает обслуживать запросы после проверки второго запуска
+        assert "pid" in await asyncio.to_thread(daemon_client.request, "ping", None, socket_path)
+    finally:
+        await daemon.close()
+    assert not Path(socket_path).exists()
+
+
+async def test_cli_uses_daemon_or_falls_back(git_repo: Path, socket_path: str, capsys: pytest.CaptureFixture):
+    """CLI с --daemon работает через демон, а без него - в текущем процессе."""
+    args = [str(git_repo), "--daemon", "--socket", socket_path]
+    assert await asyncio.to_thread(cli_main, args) == 0
+    captured = capsys.readouterr()
+    assert "Daemon is not running" in captured.err
+    assert "create_user" in captured.out
+
+    daemon = CommitDaemon(CommitService(Settings(result_cache_size=8)), socket_path=socket_path)
+    await daemon.start()
+    try:
+        assert await asyncio.to_thread(cli_main, args) == 0
+        captured = capsys.readouterr()
+        assert captured.err == ""
+        assert "create_user" in captured.out
+        assert daemon.service.cache.stats()["misses"] == 1
+    finally:
+        await daemon.close()
+
+
+async def test_socket_private_to_owner(socket_path: str, monkeypatch: pytest.MonkeyPatch):
+    """Socket создается с правами 0600; socket другого пользователя клиент не использует."""
+    daemon = CommitDaemon(CommitService(Settings()), socket_path=socket_path)
+    await daemon.start()
+    try:
+        assert Path(socket_path).stat().st_mode & 0o777 == 0o600
+        monkeypatch.setattr(daemon_client.os, "getuid", lambda: Path(socket_path).stat().st_uid + 1)
+        with pytest.raises(daemon_client.DaemonUnavailableError, match="another user"):
+            await asyncio.to_thread(daemon_client.request, "ping", None, socket_path)
+    finally:
+        await daemon.close()
+
+
+async def test_shared_private_dir_refused(tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch):
+    """Личный каталог socket'а, открытый другим пользователям, не используется."""
+    temp_dir = tmp_path_factory.mktemp("tmp")
+    monkeypatch.setattr(daemon_client.tempfile, "gettempdir", lambda: str(temp_dir))
+    monkeypatch.delenv(daemon_client.SOCKET_PATH_ENV, raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    private_dir = Path(daemon_client.private_socket_dir())
+    private_dir.mkdir(mode=0o777)
+    private_dir.chmod(0o777)
+
+    with pytest.raises(PermissionError, match="accessible by other users"):
+        await CommitDaemon(CommitService(Settings())).start()
+
+    private_dir.chmod(0o700)
+    daemon = CommitDaemon(CommitService(Settings()))
+    await daemon.start()
+    try:
+        assert daemon.socket_path.parent == private_dir
+    finally:
+        await daemon.close()
@@ -0,0 +1,68 @@
+"""
+Unit Tests для ChangeSet
+"""
+
+from mcp_get_text_commit.change_set import BINARY, ChangeSet
+
+PATCH = (
+    b"diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n@@ -1 +1,2 @@\n a\n+b\n"
+    b"diff --git a/image.png b/image.png\nBinary files a/image.png and b/image.png differ\n"
+    b"diff --git a/\"sp\\303\\244ce.py\" b/\"sp\\303\\244ce.py\"\n@@ -1 +1 @@\n-x\n+\xc3\xa4\n"
+)
+NUMSTAT = "1\t0\ta.py\0-\t-\timage.png\0" "1\t1\tspäce.py\0".encode() + b"\0"
+
+
+def test_from_numstat_z_table():
+    """Тест: столбцы таблицы и numstat в прежнем формате"""
+    change_set = ChangeSet.from_numstat_z(NUMSTAT + PATCH, {"a.py": "M."})
+    assert change_set.paths == ("a.py", "image.png", "späce.py")
+    assert change_set.statuses == ("M.", ".M", ".M")
+    assert list(change_set.added) == [1, BINARY, 1]
+    assert change_set.numstat() == {"a.py": (1, 0), "image.png": (None, None), "späce.py": (1, 1)}
+    assert change_set.text() == PATCH.decode().strip()
+
+
+def test_patch_views_are_lazy_slices():
+    """Тест: patch файла - срез общего буфера, в том числе для экранированного пути"""
+    output = NUMSTAT + PATCH
+    change_set = ChangeSet.from_numstat_z(output)
+    view = change_set.patch(0)
+    assert isinstance(view, memoryview)
+    # Срез вывода git, а не копии patch
+    assert view.obj is output
+    assert change_set.patch_text(0).startswith("diff --git a/a.py")
+    assert "Binary files" in change_set.patch_text(1)
+    assert change_set.patch_text(2).endswith("+ä\n")
+    assert b"".join(change_set.iter_patches()) == PATCH
+
+
+def test_attach_patch_and_merge():
+    """Тест: patch части файлов и объединение с файлами без patch"""
+    first = ChangeSet.from_numstat_z(b"1\t0\ta.py\0" b"2\t0\tc.py\0")
+    first.attach_patch(b"diff --git a/c.py b/c.py\n@@ -0,0 +1,2 @@\n+x\n+y\n")
+    assert first.patch(0) is None
+    assert first.patch_text(1).startswith("diff --git a/c.py")
+
+    merged = ChangeSet.merge(first, ChangeSet.from_numstat_z(b"5\t0\tb.lock\0"))
+    assert merged.paths == ("a.py", "b.lock", "c.py")
+    assert merged.patch_rows() == [2]
+    assert merged.numstat()["b.lock"] == (5, 0)
+
+
+def test_raw_records_give_renames():
+    """Тест: записи --raw перед numstat дают код изменения и сходство переименований"""
+    output = (
+        b":100644 100644 96cc558 96cc558 R100\0old/a.py\0new/a.py\0"
+        b":100644 100644 1111111 2222222 R087\0b.py\0c.py\0"
+        b":100644 100644 ccea4a4 0000000 M\0d.py\0"
+        b"0\t0\t\0old/a.py\0new/a.py\0" b"1\t1\t\0b.py\0c.py\0" b"1\t0\td.py\0"
+    )
+    change_set = ChangeSet.from_numstat_z(output)
+    assert change_set.paths == ("new/a.py", "c.py", "d.py")
+    assert change_set.kinds == ("R", "R", "M")
+    assert change_set.origins == ("old/a.py", "b.py", "")
+    assert change_set.renames() == {"new/a.py": ("old/a.py", 100), "c.py": ("b.py", 87)}
+    assert [change_set.is_pure_rename(row) for row in range(3)] == [True, False, False]
+
+    merged = ChangeSet.merge(change_set, ChangeSet.from_numstat_z(b"5\t0\tb.lock\0"))
+    assert merged.renames() == change_set.renames()
@@ -83,4 +83,128 @@ async def test_git_command_error():
         )
         # ИСПРАВЛЕНО: Ожидаем правильный fallback именно для этой ошибки
         assert result.commit_text == "chore: misc changes"
-        assert result.confidence == 0.2
\ No newline at end of file
+        assert result.confidence == 0.2
+
+def test_key_changes_only_from_body_lines():
+    """Тест: заголовки hunk, файла и контекст не дают добавлений (только изменение символа)"""
+    from mcp_get_text_commit.commit_generator import KeyChangeCollector
+
+    diff = (
+        "diff --git a/app.py b/app.py\n"
+        "--- a/app.py\n"
+        "+++ b/app.py\n"
+        "@@ -1,4 +1,5 @@ class Legacy:\n"
+        " def context_only(self): total = a + b\n"
+        "+def added(self):\n"
+        "+    return None\n"
+        "-function dropped() {\n"
+    )
+    collector = KeyChangeCollector()
+    collector.feed(diff)
+    assert collector.result() == [
+        "implement added() method", "remove dropped() function", "update Legacy class"
+    ]
+    assert (collector.added_lines, collector.removed_lines) == (2, 1)
+
+
+def test_key_changes_limit_and_order():
+    """Тест: не больше limit уникальных изменений на паттерн, в порядке строк"""
+    from mcp_get_text_commit.commit_generator import KeyChangeCollector
+
+    lines = [f"+def handler_{index % 5}():" for index in range(50)] + ["+class Late:"]
+    collector = KeyChangeCollector(limit=3)
+    collector.feed("\n".join(lines) + "\n")
+    assert collector.result() == [
+        "create Late class", "implement handler_0() method", "implement handler_1() method"
+    ]
+    assert collector.added_lines == 51
+
+
+def test_key_changes_stop_once_result_is_decided():
+    """Тест: паттерны после первых limit изменений и символы hunk'ов больше не ищутся"""
+    from mcp_get_text_commit.commit_generator import KeyChangeCollector
+
+    chunks = [
+        "@@ -1 +1 @@ class Old:\n+class First:\n+def one():\n+def two():\n",
+        "@@ -9 +9 @@ class Other:\n+import json\n+def three():\n+function early() {\n",
+    ]
+    collector = KeyChangeCollector()
+    for chunk in chunks:
+        collector.feed(chunk)
+    assert collector.result() == ["add early() function", "create First class", "implement one() method"]
+    # После "create First class" и двух методов import и второй заголовок hunk не разбираются
+    assert not collector._changes[4]
+    assert list(collector.symbols.changes(3)) == ["update Old class"]
+    assert not collector.complete
+
+    whole = KeyChangeCollector()
+    whole.feed("".join(chunks))
+    assert whole.result() == collector.result()
+    collector.feed("+function a() {\n+function b() {\n")
+    assert collector.complete
+
+
+def test_modified_symbols_from_hunk_headers():
+    """Тест: изменения без новых объявлений описываются по заголовкам hunk"""
+    from mcp_get_text_commit.commit_generator import KeyChangeCollector
+
+    diff = (
+        "diff --git a/api/views.py b/api/views.py\n"
+        "--- a/api/views.py\n"
+        "+++ b/api/views.py\n"
+        "@@ -10,3 +10,3 @@ class UserView(View):\n"
+        "-    limit = 10\n"
+        "+    limit = 20\n"
+        "@@ -30,3 +30,3 @@ def render_page(request):\n"
+        "-    return old\n"
+        "+    return new\n"
+        "diff --git a/main.go b/main.go\n"
+        "--- a/main.go\n"
+        "+++ b/main.go\n"
+        "@@ -1,2 +1,2 @@ func (s *Server) Start() error {\n"
+        "-\treturn nil\n"
+        "+\treturn err\n"
+    )
+    collector = KeyChangeCollector()
+    collector.feed(diff)
+    assert collector.result() == [
+        "update UserView class", "update render_page() method", "update Start() function"
+    ]
+    assert list(collector.symbols.files) == ["api/views.py", "main.go"]
+
+    split = diff.index("@@ -30")
+    first, second = KeyChangeCollector(), KeyChangeCollector()
+    first.feed(diff[:split])
+    second.feed(diff[split:])
+    first.merge(second)
+    assert first.symbols.files == collector.symbols.files
+    assert first.result() == collector.result()
+
+
+def test_parse_hunk_symbol():
+    """Тест: разбор контекста заголовка hunk"""
+    from mcp_get_text_commit.symbol_index import parse_hunk_symbol
+
+    assert parse_hunk_symbol("async def fetch(self, url):") == ("def", "fetch")
+    assert parse_hunk_symbol("export default function App() {") == ("function", "App")
+    assert parse_hunk_symbol("public void process(int x)") == ("function", "process")
+    assert parse_hunk_symbol("struct config {") == ("struct", "config")
+    assert parse_hunk_symbol("if (ready) {") is None
+    assert parse_hunk_symbol("## Usage") is None
+
+
+def test_renames_described_after_changes():
+    """Тест: переименования файлов описываются после изменений кода"""
+    from mcp_get_text_commit.commit_generator import KeyChangeCollector, describe_rename
+
+    assert describe_rename("users.py", "src/users.py") == "move users.py to src/"
+    assert describe_rename("src/users.py", "users.py") == "move users.py to project root"
+    assert describe_rename("src/users.py", "src/accounts.py") == "rename users.py to accounts.py"
+    assert describe_rename("a/x.py", "b/y.py") == "move a/x.py to b/y.py"
+
+    collector = KeyChangeCollector()
+    collector.add_renames({"src/accounts.py": ("src/users.py", 100)})
+    assert collector.result() == ["rename users.py to accounts.py"]
+
+    collector.feed("+def create_account():\n")
+    assert collector.result() == ["implement create_account() method", "rename users.py to accounts.py"]
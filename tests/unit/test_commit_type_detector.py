@@ -114,4 +114,32 @@ def test_mixed_files():
     commit_type, confidence = detector.detect_commit_type(staged_files, staged_diff)
     # Должен определить наиболее подходящий тип
     assert commit_type in detector.COMMIT_TYPES.keys()
-    assert confidence > 0.0
\ No newline at end of file
+    assert confidence > 0.0
+
+def test_pure_renames_are_refactor():
+    """Тест: только переименованные без изменений файлы - refactor по метаданным"""
+    detector = CommitTypeDetector()
+    staged_files = ["src/user_service.py", "docs/guide.md"]
+    renames = {"src/user_service.py": ("src/users.py", 100), "docs/guide.md": ("guide.md", 100)}
+
+    scan = detector.start_scan(staged_files, renames)
+    assert scan.result() == ("refactor", 0.9)
+
+    # Переименование с изменением содержимого определяется по diff
+    renames["src/user_service.py"] = ("src/users.py", 80)
+    scan = detector.start_scan(staged_files, renames)
+    scan.feed("+def create_user():\n+    # add user creation\n")
+    assert scan.result()[0] == "feat"
+
+
+def test_moved_code_is_refactor():
+    """Тест: diff из перемещенного между файлами кода - refactor"""
+    detector = CommitTypeDetector()
+    body = ["def create_user(name):", "    user = User(name=name)", "    session.add(user)", "    return user"]
+    staged_diff = (
+        "diff --git a/src/api.py b/src/api.py\n--- a/src/api.py\n+++ b/src/api.py\n@@ -1,4 +0,0 @@\n"
+        + "".join(f"-{line}\n" for line in body)
+        + "diff --git a/src/users.py b/src/users.py\n--- a/src/users.py\n+++ b/src/users.py\n@@ -0,0 +1,4 @@\n"
+        + "".join(f"+{line}\n" for line in body)
+    )
+    assert detector.detect_commit_type(["src/api.py", "src/users.py"], staged_diff) == ("refactor", 0.85)
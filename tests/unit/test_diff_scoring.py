@@ -0,0 +1,97 @@
+"""
+Unit Tests для DiffScorer
+
+Тесты последовательной и параллельной оценки diff по файлам.
+"""
+
+import pytest
+
+from mcp_get_text_commit.change_set import ChangeSet
+from mcp_get_text_commit.commit_type_detector import CommitTypeDetector
+from mcp_get_text_commit.config import Settings
+from mcp_get_text_commit.diff_scoring import DiffScorer, split_diff_by_file
+from mcp_get_text_commit.progress import AnalysisProgress
+
+
+def _make_diff(file_count: int) -> str:
+    """Собирает diff из нескольких файлов с разными изменениями"""
+    parts = []
+    for index in range(file_count):
+        body = [
+            f"+def handler_{index}(self):",
+            "+    return None",
+            f"-function legacy_{index % 4}() {{",
+            "+# fix null check" if index % 7 == 0 else "+value = 1",
+        ]
+        parts.append(
+            f"diff --git a/src/module_{index}.py b/src/module_{index}.py\n"
+            f"--- a/src/module_{index}.py\n+++ b/src/module_{index}.py\n"
+            "@@ -1,2 +1,4 @@\n" + "\n".join(body) + "\n"
+        )
+    return "".join(parts)
+
+
+def test_split_diff_by_file():
+    """Тест разбиения diff по файлам"""
+    diff = _make_diff(3)
+    parts = split_diff_by_file(diff)
+    assert len(parts) == 3
+    assert "".join(parts) == diff
+    assert split_diff_by_file("+def run():\n") == ["+def run():\n"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_matches_serial():
+    """Тест: параллельная оценка совпадает с последовательной"""
+    diff = _make_diff(40)
+    files = [f"src/module_{index}.py" for index in range(40)]
+    detector = CommitTypeDetector()
+
+    serial_scorer = DiffScorer(detector, Settings(parallel_threshold_bytes=len(diff) + 1))
+    parallel_scorer = DiffScorer(detector, Settings(parallel_threshold_bytes=0, parallel_max_workers=2))
+    assert not serial_scorer.use_parallel(diff)
+    assert parallel_scorer.use_parallel(diff)
+
+    serial = await serial_scorer.score(files, diff)
+    parallel = await parallel_scorer.score(files, diff)
+    assert parallel == serial
+    assert serial.key_changes == [
+        "implement handler_0() method",
+        "implement handler_1() method",
+        "implement handler_2() method",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_change_set_matches_text():
+    """Тест: оценка по ChangeSet совпадает с оценкой по тексту diff"""
+    diff = _make_diff(40)
+    files = [f"src/module_{index}.py" for index in range(40)]
+    numstat = "".join(f"3\t1\t{path}\0" for path in files).encode() + b"\0"
+    change_set = ChangeSet.from_numstat_z(numstat + diff.encode())
+    detector = CommitTypeDetector()
+
+    for settings in (Settings(), Settings(parallel_threshold_bytes=0, parallel_max_workers=2)):
+        scorer = DiffScorer(detector, settings)
+        assert await scorer.score(files, change_set) == await scorer.score(files, diff)
+
+
+@pytest.mark.asyncio
+async def test_parallel_reports_scored_files():
+    """Тест: прогресс оцененных файлов приходит по мере готовности пакетов"""
+    reported = []
+
+    class RecordingContext:
+        async def report_progress(self, progress, total=None, message=None):
+            reported.append((progress, total))
+
+    diff = _make_diff(40)
+    files = [f"src/module_{index}.py" for index in range(40)]
+    progress = AnalysisProgress(RecordingContext(), interval=0)
+    progress.total = len(files)
+    scorer = DiffScorer(CommitTypeDetector(), Settings(parallel_threshold_bytes=0, parallel_max_workers=2))
+
+    await scorer.score(files, diff, progress=progress)
+    assert len(reported) > 1
+    assert [count for count, _ in reported] == sorted(count for count, _ in reported)
+    assert reported[-1] == (40, 40)
@@ -0,0 +1,135 @@
+"""
+Unit Tests для потокового разбора diff
+
+Тесты разбиения diff на записи и инкрементальной обработки.
+"""
+
+import asyncio
+
+from mcp_get_text_commit.commit_generator import ConventionalCommitGenerator, KeyChangeCollector
+from mcp_get_text_commit.commit_type_detector import CommitTypeDetector
+from mcp_get_text_commit.diff_stream import (
+    LogRecordSplitter,
+    aiter_diff_chunks,
+    iter_diff_chunks,
+    parse_log_record,
+)
+
+SAMPLE_DIFF = """diff --git a/src/service.py b/src/service.py
+index 1111111..2222222 100644
+--- a/src/service.py
++++ b/src/service.py
+@@ -1,3 +1,6 @@ class Service:
+ import os
++def create_user(self):
++    return None
+@@ -10,2 +13,3 @@ def helper():
+-    # fix null check
++    # correct handling
+diff --git a/README.md b/README.md
+index 3333333..4444444 100644
+--- a/README.md
++++ b/README.md
+@@ -1 +1,2 @@
+ # Title
++Docs
+"""
+
+
+def test_chunks_cover_whole_diff():
+    """Тест: записи в сумме дают исходный diff"""
+    chunks = list(iter_diff_chunks(SAMPLE_DIFF))
+    assert "".join(chunk.text for chunk in chunks) == SAMPLE_DIFF
+    assert [(chunk.path, chunk.is_file_header) for chunk in chunks] == [
+        ("src/service.py", True),
+        ("src/service.py", False),
+        ("src/service.py", False),
+        ("README.md", True),
+        ("README.md", False),
+    ]
+    assert chunks[1].hunk_header == "@@ -1,3 +1,6 @@ class Service:"
+
+
+def test_chunks_from_small_blocks():
+    """Тест: разбиение не зависит от размера входных блоков"""
+    blocks = [SAMPLE_DIFF[i:i + 5] for i in range(0, len(SAMPLE_DIFF), 5)]
+    expected = [(c.path, c.hunk_header, c.text) for c in iter_diff_chunks(SAMPLE_DIFF)]
+    actual = [(c.path, c.hunk_header, c.text) for c in iter_diff_chunks(blocks)]
+    assert actual == expected
+
+
+def test_long_hunk_is_split():
+    """Тест: длинный hunk режется на части с тем же заголовком"""
+    diff = "diff --git a/big.txt b/big.txt\n@@ -0,0 +1,100 @@\n" + "+line\n" * 100
+    chunks = list(iter_diff_chunks(diff, max_chunk_chars=64))
+    assert "".join(chunk.text for chunk in chunks) == diff
+    assert all(len(chunk.text) <= 64 for chunk in chunks)
+    assert {chunk.hunk_header for chunk in chunks[1:]} == {"@@ -0,0 +1,100 @@"}
+    assert {chunk.path for chunk in chunks} == {"big.txt"}
+
+
+def test_async_reader_decodes_split_utf8():
+    """Тест: многобайтовые символы на границе блоков не теряются"""
+    payload = "diff --git a/a.md b/a.md\n@@ -1 +1 @@\n+Привет\n".encode("utf-8")
+
+    class Reader:
+        def __init__(self):
+            self.offset = 0
+
+        async def read(self, n: int = -1) -> bytes:
+            block = payload[self.offset:self.offset + 3]
+            self.offset += 3
+            return block
+
+    async def collect():
+        return [chunk async for chunk in aiter_diff_chunks(Reader())]
+
+    chunks = asyncio.run(collect())
+    assert "".join(chunk.text for chunk in chunks) == payload.decode("utf-8")
+
+
+def test_streaming_scan_matches_full_diff():
+    """Тест: потоковая обработка дает тот же результат, что и целый diff"""
+    detector = CommitTypeDetector()
+    files = ["src/service.py", "README.md"]
+
+    scan = detector.start_scan(files)
+    collector = KeyChangeCollector()
+    for chunk in iter_diff_chunks(SAMPLE_DIFF):
+        scan.feed(chunk.text)
+        collector.feed(chunk.text)
+
+    assert scan.result() == detector.detect_commit_type(files, SAMPLE_DIFF)
+    assert collector.result() == ConventionalCommitGenerator()._extract_key_changes(SAMPLE_DIFF)
+
+
+LOG_OUTPUT = (
+    b"\x1eaaa\x1ffeat: add\0\n1\t0\tsrc/a.py\0\0"
+    b"diff --git a/src/a.py b/src/a.py\n--- a/src/a.py\n+++ b/src/a.py\n@@ -0,0 +1 @@\n+x = '\x1e'\n"
+    b"\x1ebbb\x1fchore: empty\0"
+    b"\x1eccc\x1fdocs: readme\0\n1\t0\tREADME.md\0\0diff --git a/README.md b/README.md\n"
+)
+
+
+def test_log_records_split_at_any_block_size():
+    """Тест: записи git log -p не зависят от размера блоков; разделитель внутри строки patch не делит запись"""
+    for size in (1, 7, len(LOG_OUTPUT)):
+        splitter = LogRecordSplitter()
+        records = []
+        for start in range(0, len(LOG_OUTPUT), size):
+            records += splitter.feed(LOG_OUTPUT[start:start + size])
+        records += splitter.close()
+        assert [parse_log_record(record)[:2] for record, _ in records] == [
+            ("aaa", "feat: add"), ("bbb", "chore: empty"), ("ccc", "docs: readme")
+        ]
+        assert b"".join(record for record, _ in records) == LOG_OUTPUT
+    assert parse_log_record(records[0][0])[2].startswith(b"1\t0\tsrc/a.py\0\0diff --git")
+    assert parse_log_record(records[1][0])[2] == b""
+
+
+def test_log_record_truncated_at_limit():
+    """Тест: запись длиннее лимита обрезается, следующие записи не теряются"""
+    splitter = LogRecordSplitter(max_record_bytes=40)
+    records = splitter.feed(LOG_OUTPUT) + splitter.close()
+    assert [(len(record), truncated) for record, truncated in records] == [(40, True), (18, False), (40, True)]
+    assert parse_log_record(records[1][0])[:2] == ("bbb", "chore: empty")
@@ -0,0 +1,36 @@
+"""
+Unit Tests для pathspec'ов исключения файлов
+"""
+
+from mcp_get_text_commit.exclusions import (
+    exclude_pathspecs,
+    excluded_only_pathspecs,
+    literal_pathspecs,
+)
+
+
+def test_exclude_pathspecs():
+    """Тест: паттерн без "/" применяется в любом каталоге, с "/" - от корня"""
+    assert exclude_pathspecs(["*.lock", "/dist/*.js"], use_attributes=False) == [
+        ":(top,exclude,glob)**/*.lock",
+        ":(top,exclude,glob)dist/*.js",
+    ]
+    assert exclude_pathspecs([]) == [
+        ":(top,exclude,attr:linguist-generated)",
+        ":(top,exclude,attr:-diff)",
+    ]
+
+
+def test_excluded_only_pathspecs():
+    """Тест: выбор только исключаемых файлов"""
+    assert excluded_only_pathspecs(["go.sum"]) == [
+        ":(top,glob)**/go.sum",
+        ":(top,attr:linguist-generated)",
+        ":(top,attr:-diff)",
+    ]
+
+
+def test_literal_pathspecs():
+    """Тест точных путей (спецсимволы glob не интерпретируются)"""
+    assert literal_pathspecs(["src/[id].py"]) == [":(top,literal)src/[id].py"]
+    assert literal_pathspecs(["a b.py"], exclude=True) == [":(top,exclude,literal)a b.py"]
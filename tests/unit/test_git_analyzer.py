@@ -0,0 +1,71 @@
+"""
+Unit Tests для разбора вывода git в GitAnalyzer
+"""
+
+from mcp_get_text_commit.change_set import BINARY, ChangeSet
+from mcp_get_text_commit.git_analyzer import (
+    parse_porcelain_v2_status,
+    select_patch_files,
+)
+
+SHA = "d00491fd7e5bb6fa28c517a0bb32b8b506539d4d"
+
+
+def test_parse_porcelain_v2_status():
+    """Тест разбора git status --porcelain=v2 -z --branch"""
+    output = "\0".join([
+        "# branch.oid 6c12ea2c612c513e977a9f2eb770cfa745813556",
+        "# branch.head feature/x",
+        f"1 .M N... 100644 100644 100644 {SHA} {SHA} sp ace.txt",
+        f"2 RM N... 100644 100644 100644 {SHA} {SHA} R100 new.py",
+        "old.py",
+        f"u UU N... 100644 100644 100644 100644 {SHA} {SHA} {SHA} conflict.py",
+    ]) + "\0"
+
+    branch, file_status = parse_porcelain_v2_status(output)
+    assert branch == "feature/x"
+    assert file_status == {"sp ace.txt": ".M", "new.py": "RM", "conflict.py": "UU"}
+
+
+def test_parse_porcelain_v2_detached_head():
+    """Тест: detached HEAD возвращается как HEAD (как rev-parse --abbrev-ref)"""
+    branch, file_status = parse_porcelain_v2_status("# branch.oid (initial)\0# branch.head (detached)\0")
+    assert branch == "HEAD"
+    assert file_status == {}
+
+
+def test_parse_numstat_with_patch():
+    """Тест разбора git diff -z --numstat -p"""
+    patch = b"diff --git a/x.py b/x.py\n@@ -1 +1,2 @@\n a\n+b"
+    output = b"1\t0\tx.py\0-\t-\timage.png\0" b"2\t1\t\0old name.py\0new name.py\0" b"\0" + patch
+
+    change_set = ChangeSet.from_numstat_z(output)
+    assert change_set.numstat() == {"x.py": (1, 0), "image.png": (None, None), "new name.py": (2, 1)}
+    assert list(change_set.paths) == ["x.py", "image.png", "new name.py"]
+    assert list(change_set.added) == [1, BINARY, 2]
+    assert change_set.patch_view() == patch
+    assert change_set.buffer is output
+
+
+def test_parse_numstat_without_patch():
+    """Тест разбора git diff -z --numstat без patch и пустого вывода"""
+    change_set = ChangeSet.from_numstat_z(b"3\t1\ta.py\0")
+    assert change_set.numstat() == {"a.py": (3, 1)}
+    assert change_set.patch_view() == b""
+    assert change_set.patch_bytes == 0
+    assert len(ChangeSet.from_numstat_z(b"")) == 0
+
+
+def test_select_patch_files_within_budget():
+    """Тест выбора файлов для patch по размеру изменений и бюджету"""
+    numstat = {
+        "small.py": (2, 1),
+        "huge.lock": (5000, 4000),
+        "image.png": (None, None),
+        "medium.py": (40, 10),
+    }
+    # huge.lock не помещается в бюджет, бинарный файл не выбирается
+    assert select_patch_files(numstat, budget_bytes=10_000, max_files=10) == ["small.py", "medium.py"]
+    # Ограничение числа файлов: берутся крупнейшие
+    assert select_patch_files(numstat, budget_bytes=10_000, max_files=1) == ["medium.py"]
+    assert select_patch_files(numstat, budget_bytes=0, max_files=10) == []
@@ -0,0 +1,117 @@
+"""
+Unit Tests для индекса истории коммитов
+"""
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from mcp_get_text_commit.commit_type_detector import CommitTypeDetector
+from mcp_get_text_commit.git_analyzer import GitAnalyzer
+from mcp_get_text_commit.history_index import HistoryIndex, commit_type_of, parse_log_records
+
+
+def test_commit_type_of_subject():
+    """Тест: тип только из subject в формате Conventional Commits"""
+    assert commit_type_of("fix(api): handle timeout") == "fix"
+    assert commit_type_of("feat!: drop python 3.8") == "feat"
+    assert commit_type_of("Merge branch 'main'") is None
+    assert commit_type_of("update readme") is None
+
+
+def test_parse_log_records():
+    """Тест: записи git log -z --name-only разбираются по разделителям"""
+    data = (
+        b"\x1eaaa\x1ffix: one\0\nsrc/a.py\0src/b.py\0"
+        b"\x1ebbb\x1fdocs: two\0\nREADME.md\0"
+        b"\x1eccc\x1fempty\0"
+    )
+    assert list(parse_log_records(data)) == [
+        ("aaa", "fix: one", ["src/a.py", "src/b.py"]),
+        ("bbb", "docs: two", ["README.md"]),
+        ("ccc", "empty", []),
+    ]
+
+
+def test_predict_from_paths():
+    """Тест: распределение типов по файлу, каталогу и расширению"""
+    index = HistoryIndex()
+    assert index.add_commit("fix: a", ["src/api/client.py"])
+    assert index.add_commit("fix: b", ["src/api/client.py"])
+    assert index.add_commit("docs: c", ["docs/guide.md"])
+    assert not index.add_commit("wip", ["src/api/client.py"])
+    assert not index.add_commit("feat: mass", [f"f{i}.py" for i in range(5)], max_files=3)
+    assert index.commits == 3
+
+    assert index.predict(["src/api/client.py"]) == pytest.approx({"fix": 1.0})
+    # Новый файл в известном каталоге: признаки каталога и расширения
+    assert index.predict(["src/api/server.py"]) == pytest.approx({"fix": 0.5})
+    assert index.predict(["assets/logo.svg"]) == {}
+    assert HistoryIndex().predict(["src/api/client.py"]) == {}
+
+
+def test_save_and_load(tmp_path: Path):
+    """Тест: индекс сохраняется в .git и читается обратно; поврежденный файл игнорируется"""
+    index = HistoryIndex(head="abc")
+    index.add_commit("refactor: move", ["lib/util.py"])
+    path = HistoryIndex.path_for(tmp_path)
+    index.save(path)
+
+    loaded = HistoryIndex.load(path)
+    assert (loaded.head, loaded.commits, loaded.features) == ("abc", 1, index.features)
+    assert [entry.name for entry in path.parent.iterdir()] == ["history.json"]
+
+    path.write_text("{broken")
+    assert HistoryIndex.load(path) is None
+    assert HistoryIndex.load(tmp_path / "missing.json") is None
+
+
+def test_prior_shifts_detected_type():
+    """Тест: добавка истории решает при отсутствии признаков в diff"""
+    detector = CommitTypeDetector()
+    scan = detector.start_scan(["calc.py"], prior={"fix": 0.3, "unknown": 1.0})
+    scan.feed("+x = 2\n")
+    assert scan.result()[0] == "fix"
+    assert detector.start_scan(["calc.py"]).result()[0] != "fix"
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def _commit(repo: Path, name: str, content: str, message: str, *flags: str) -> None:
+    (repo / name).write_text(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", *flags, "-m", message)
+
+
+@pytest.mark.asyncio
+async def test_index_rebuilt_when_head_leaves_indexed_history(tmp_path: Path):
+    """Тест: переключение веток и amend не учитывают коммиты повторно"""
+    _git(tmp_path, "init", "-q", "-b", "main")
+    _git(tmp_path, "config", "user.email", "dev@example.com")
+    _git(tmp_path, "config", "user.name", "Dev")
+    _commit(tmp_path, "base.txt", "base\n", "chore: init")
+    _git(tmp_path, "checkout", "-q", "-b", "a")
+    _commit(tmp_path, "x.py", "a\n", "feat: x on a")
+    _git(tmp_path, "checkout", "-q", "-b", "b", "main")
+    _commit(tmp_path, "x.py", "b\n", "feat: x on b")
+
+    analyzer = GitAnalyzer(str(tmp_path))
+    for branch in ("a", "b", "a", "b", "a"):
+        _git(tmp_path, "checkout", "-q", branch)
+        index = await analyzer.history_index()
+        assert index.commits == 2
+        assert index.features["p:x.py"] == {"feat": 1}
+
+    _commit(tmp_path, "x.py", "amended\n", "fix: x on a", "--amend")
+    index = await analyzer.history_index()
+    assert index.commits == 2
+    assert index.features["p:x.py"] == {"fix": 1}
+
+    # Обычный новый коммит по-прежнему дописывается к индексу
+    _commit(tmp_path, "x.py", "next\n", "fix: x again")
+    index = await analyzer.history_index()
+    assert index.commits == 3
+    assert index.features["p:x.py"] == {"fix": 2}
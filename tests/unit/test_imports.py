@@ -0,0 +1,49 @@
+"""
+Unit Tests для времени импорта CLI и модулей анализа
+"""
+
+import json
+import subprocess
+import sys
+
+# Бюджет импорта CLI (с запасом: без стека MCP импорт занимает доли секунды)
+IMPORT_BUDGET_SECONDS = 1.5
+
+# Модули стека MCP, которые не должны загружаться без сервера
+SERVER_STACK = ("mcp", "starlette", "uvicorn", "httpx", "anyio")
+
+
+def _import_in_subprocess(statement: str) -> dict:
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(json.dumps({'elapsed': elapsed, 'modules': sorted(sys.modules)}))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def test_analysis_imports_without_server_stack():
+    """Тест: модули анализа импортируются без стека MCP и в пределах бюджета"""
+    result = _import_in_subprocess("import mcp_get_text_commit.commit_text_generator")
+    loaded = [name for name in SERVER_STACK if name in result["modules"]]
+    assert loaded == []
+    assert result["elapsed"] < IMPORT_BUDGET_SECONDS
+
+
+def test_cli_client_imports_only_stdlib():
+    """Тест: CLI (тонкий клиент демона) не загружает модули анализа и pydantic"""
+    result = _import_in_subprocess("import mcp_get_text_commit.cli")
+    assert "pydantic" not in result["modules"]
+    assert "mcp_get_text_commit.commit_text_generator" not in result["modules"]
+
+
+def test_server_imported_lazily():
+    """Тест: пакет не импортирует сервер до обращения к create_server/main"""
+    result = _import_in_subprocess("import mcp_get_text_commit")
+    assert "mcp_get_text_commit.server" not in result["modules"]
+
+    result = _import_in_subprocess("import mcp_get_text_commit; mcp_get_text_commit.create_server")
+    assert "mcp_get_text_commit.server" in result["modules"]
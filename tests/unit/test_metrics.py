@@ -0,0 +1,71 @@
+"""
+Unit Tests для метрик запросов
+
+Тесты регистратора этапов и вызовов git, перцентилей и агрегации.
+"""
+
+from mcp_get_text_commit import metrics
+from mcp_get_text_commit.models import RequestMetrics
+
+
+def test_no_recorder_is_noop():
+    """Тест: без активного регистратора ничего не измеряется"""
+    assert metrics.current_recorder() is None
+    with metrics.stage("detection"):
+        pass
+    with metrics.track_git(["status"]) as record:
+        record.output_bytes = 10
+    assert metrics.current_recorder() is None
+
+
+def test_recording_stages_and_git():
+    """Тест записи этапов и вызовов git"""
+    with metrics.recording() as recorder:
+        assert metrics.current_recorder() is recorder
+        with metrics.stage("detection"):
+            pass
+        with metrics.track_git(["--literal-pathspecs", "diff", "-p"]) as record:
+            record.output_bytes = 100
+        with metrics.track_git(["status", "--porcelain=v2"]) as record:
+            record.output_bytes = 7
+    assert metrics.current_recorder() is None
+
+    result = recorder.result()
+    assert set(result.stages_ms) == {"detection", "git", "total"}
+    assert [command.command for command in result.git_commands] == [
+        "--literal-pathspecs diff -p", "status --porcelain=v2"
+    ]
+    assert result.diff_bytes == 100
+    assert result.peak_memory_bytes is None
+
+
+def test_recording_trace_memory():
+    """Тест пика памяти через tracemalloc"""
+    with metrics.recording(trace_memory=True) as recorder:
+        data = [bytes(1024) for _ in range(100)]
+    assert recorder.result().peak_memory_bytes >= 100 * 1024
+    del data
+
+
+def test_percentile():
+    """Тест перцентилей методом ближайшего ранга"""
+    values = [float(value) for value in range(1, 101)]
+    assert metrics.percentile(values, 0.5) == 50.0
+    assert metrics.percentile(values, 0.9) == 90.0
+    assert metrics.percentile(values, 0.99) == 99.0
+    assert metrics.percentile([5.0], 0.99) == 5.0
+    assert metrics.percentile([], 0.5) == 0.0
+
+
+def test_aggregator_window():
+    """Тест агрегации с окном последних значений"""
+    aggregator = metrics.MetricsAggregator(window=3)
+    for value in (100.0, 1.0, 2.0, 3.0):
+        aggregator.add(RequestMetrics(stages_ms={"total": value}, cache_hit=value == 1.0))
+
+    summary = aggregator.summary()
+    assert aggregator.requests == 4
+    assert aggregator.cache_hits == 1
+    assert summary["total"].count == 3
+    assert summary["total"].p50_ms == 2.0
+    assert summary["total"].max_ms == 3.0
@@ -0,0 +1,59 @@
+"""
+Unit Tests для загрузки правил проекта
+
+Тесты поиска вложенных rules.md и кэширования разобранных файлов.
+"""
+
+import os
+from pathlib import Path
+
+from mcp_get_text_commit.commit_generator import ConventionalCommitGenerator
+from mcp_get_text_commit.project_rules import load_rules, read_rules_file, rules_candidates
+
+
+def test_rules_candidates_for_changed_paths(tmp_path: Path):
+    """Тест: rules.md корня и каталогов измененных файлов, от общих к вложенным"""
+    sub = tmp_path / "pkg"
+    candidates = rules_candidates(sub, tmp_path, ["pkg/api/views.py", "pkg/api/urls.py", "README.md"])
+    assert candidates == [
+        sub / "rules.md",
+        tmp_path / "rules.md",
+        tmp_path / "pkg" / "api" / "rules.md",
+    ]
+    assert rules_candidates(tmp_path) == [tmp_path / "rules.md"]
+
+
+def test_rules_file_cached_by_stat(tmp_path: Path):
+    """Тест: неизмененный файл не перечитывается, измененный - перечитывается"""
+    path = tmp_path / "rules.md"
+    path.write_text("Use short subjects\n", encoding="utf-8")
+
+    first = read_rules_file(path)
+    assert first is not None and not first.mentions_todo
+    assert read_rules_file(path) is first
+
+    path.write_text("See TODO.md for open tasks\n", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = read_rules_file(path)
+    assert second is not first and second.mentions_todo
+
+    path.unlink()
+    assert read_rules_file(path) is None
+
+
+def test_nested_rules_mention_todo(tmp_path: Path):
+    """Тест: упоминание TODO.md во вложенных правилах учитывается генератором"""
+    (tmp_path / "rules.md").write_text("Root rules\n", encoding="utf-8")
+    (tmp_path / "api").mkdir()
+    (tmp_path / "api" / "rules.md").write_text("Track work in TODO.md\n", encoding="utf-8")
+
+    root_only = load_rules(rules_candidates(tmp_path, tmp_path, ["README.md"]))
+    nested = load_rules(rules_candidates(tmp_path, tmp_path, ["api/views.py"]))
+    assert not root_only.mentions_todo
+    assert nested.mentions_todo and len(nested.files) == 2
+
+    assert ConventionalCommitGenerator(nested)._mentions_todo()
+    assert not ConventionalCommitGenerator(root_only)._mentions_todo()
+    assert ConventionalCommitGenerator("see TODO.md")._mentions_todo()
+    assert load_rules(rules_candidates(tmp_path / "missing")) is None
@@ -0,0 +1,41 @@
+"""
+Unit Tests для ResultCache
+"""
+
+from mcp_get_text_commit.models import GetTextCommitResult
+from mcp_get_text_commit.result_cache import ResultCache
+
+
+def _result(text: str) -> GetTextCommitResult:
+    return GetTextCommitResult(commit_text=text, confidence=0.8, files_analyzed=1, has_changes=True)
+
+
+def test_lru_eviction_and_counters():
+    """Тест вытеснения давно не использованных записей и счетчиков"""
+    cache = ResultCache(max_entries=2)
+    cache.put("a", _result("feat: a"))
+    cache.put("b", _result("feat: b"))
+    assert cache.get("a").commit_text == "feat: a"
+
+    cache.put("c", _result("feat: c"))
+    assert cache.get("b") is None
+    assert cache.get("c").commit_text == "feat: c"
+    assert cache.stats() == {
+        "entries": 2, "max_entries": 2, "hits": 2, "misses": 1, "evictions": 1
+    }
+
+
+def test_returns_copies():
+    """Тест: изменение возвращенного результата не портит кэш"""
+    cache = ResultCache()
+    cache.put("a", _result("feat: a"))
+    cache.get("a").commit_text = "changed"
+    assert cache.get("a").commit_text == "feat: a"
+
+
+def test_disabled_cache():
+    """Тест: max_entries=0 отключает кэш"""
+    cache = ResultCache(max_entries=0)
+    cache.put("a", _result("feat: a"))
+    assert cache.get("a") is None
+    assert len(cache) == 0
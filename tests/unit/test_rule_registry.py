@@ -0,0 +1,102 @@
+"""
+Unit Tests для реестра правил типов коммитов
+
+Тесты разбора правил из pyproject.toml / .commit-types.toml, кэширования
+скомпилированного реестра и передачи его в процессы пула.
+"""
+
+import os
+import pickle
+from pathlib import Path
+
+import pytest
+
+from mcp_get_text_commit.commit_type_detector import CommitTypeDetector
+from mcp_get_text_commit.config import Settings
+from mcp_get_text_commit.diff_scoring import DiffScorer
+from mcp_get_text_commit.rule_registry import glob_to_regex, load_registry, parse_commit_types
+
+PYPROJECT = """
+[project]
+name = "demo"
+
+[tool.mcp-get-text-commit.commit-types.perf]
+patterns = ["benchmark|latency"]
+files = ["bench/**", "*_bench.py"]
+keywords = ["perf"]
+priority = 6
+
+[tool.mcp-get-text-commit.commit-types.feat]
+files = ["*Service.kt"]
+"""
+
+
+def test_glob_to_regex():
+    """Тест: glob без "/" - имя в любом каталоге, "*" не переходит через "/\""""
+    assert glob_to_regex("*.kt").search("app/src/Main.kt")
+    assert not glob_to_regex("*.kt").search("app/Main.kts")
+    assert glob_to_regex("bench/**").search("bench/io/read.py")
+    assert not glob_to_regex("bench/**").search("src/bench/read.py")
+    assert glob_to_regex("src/*.py").search("src/app.py")
+    assert not glob_to_regex("src/*.py").search("src/sub/app.py")
+    assert glob_to_regex("docs/").search("docs/guide/intro.md")
+    assert glob_to_regex("v[0-9].txt").search("v1.txt")
+
+
+def test_parse_commit_types_extends_defaults():
+    """Тест: новые типы добавляются, существующие дополняются"""
+    import tomllib
+
+    config = tomllib.loads(PYPROJECT)["tool"]["mcp-get-text-commit"]
+    commit_types = parse_commit_types(config, CommitTypeDetector.COMMIT_TYPES)
+    assert commit_types["perf"].priority == 6
+    assert commit_types["feat"].priority == CommitTypeDetector.COMMIT_TYPES["feat"].priority
+    assert len(commit_types["feat"].file_patterns) == len(CommitTypeDetector.COMMIT_TYPES["feat"].file_patterns) + 1
+    assert set(CommitTypeDetector.COMMIT_TYPES) < set(commit_types)
+
+    replaced = parse_commit_types({"replace-default-types": True, "commit-types": {"perf": {}}}, commit_types)
+    assert list(replaced) == ["perf"]
+    with pytest.raises(ValueError):
+        parse_commit_types({"commit-types": {"perf": {"patterns": ["("]}}}, commit_types)
+    with pytest.raises(ValueError):
+        parse_commit_types({"commit-types": {"perf": {"keywords": "perf"}}}, commit_types)
+
+
+def test_registry_compiled_once_and_reloaded(tmp_path: Path):
+    """Тест: реестр общий, пока источники не изменились; некорректные правила игнорируются"""
+    assert load_registry(tmp_path) is None
+
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text(PYPROJECT, encoding="utf-8")
+    registry = load_registry(tmp_path)
+    assert load_registry(tmp_path) is registry
+    assert CommitTypeDetector(registry).detect_commit_type(["bench/io.py"], "+run benchmark\n")[0] == "perf"
+
+    (tmp_path / ".commit-types.toml").write_text('[commit-types.perf]\npriority = 1\n', encoding="utf-8")
+    reloaded = load_registry(tmp_path)
+    assert reloaded is not registry
+    assert reloaded.commit_types["perf"].priority == 1
+    assert reloaded.key != registry.key
+
+    (tmp_path / ".commit-types.toml").write_text('[commit-types.perf]\npatterns = ["("]\n', encoding="utf-8")
+    os.utime(tmp_path / ".commit-types.toml", ns=(1, 1))
+    assert load_registry(tmp_path) is None
+
+
+@pytest.mark.asyncio
+async def test_registry_in_worker_pool(tmp_path: Path):
+    """Тест: реестр передается в процессы пула без сканера и собирается там один раз на версию"""
+    (tmp_path / "pyproject.toml").write_text(PYPROJECT, encoding="utf-8")
+    registry = load_registry(tmp_path)
+    restored = pickle.loads(pickle.dumps(registry))
+    assert pickle.loads(pickle.dumps(registry)) is restored
+    assert restored.commit_types.keys() == registry.commit_types.keys()
+
+    files = [f"bench/case_{index}.py" for index in range(8)]
+    diff = "".join(
+        f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n@@ -1 +1 @@\n+measure latency\n"
+        for path in files
+    )
+    scorer = DiffScorer(CommitTypeDetector(registry), Settings(parallel_threshold_bytes=0, parallel_max_workers=2))
+    score = await scorer.score(files, diff)
+    assert score.commit_type == "perf"
@@ -0,0 +1,36 @@
+"""
+Unit Tests для ScopeTrie
+"""
+
+from mcp_get_text_commit.scope_index import ScopeTrie
+
+MANIFESTS = [
+    "pyproject.toml",
+    "packages/api/pyproject.toml",
+    "packages/web/package.json",
+    "packages/web/plugins/charts/package.json",
+    "packages/web/node_modules/left-pad/package.json",
+]
+
+
+def test_lookup_nearest_package():
+    """Тест: scope файла - ближайший пакет; корневой манифест и зависимости не учитываются"""
+    trie = ScopeTrie.build(MANIFESTS)
+    assert trie.size == 3
+    assert trie.lookup("packages/api/src/app.py") == "api"
+    assert trie.lookup("packages/web/plugins/charts/index.js") == "charts"
+    assert trie.lookup("packages/web/node_modules/left-pad/index.js") == "web"
+    assert trie.lookup("packages/apiary/x.py") is None
+    assert trie.lookup("README.md") is None
+
+
+def test_scope_for_changed_paths():
+    """Тест: общий scope только для файлов одного пакета"""
+    trie = ScopeTrie.build(MANIFESTS, {"docs/": "docs", "packages/web": "frontend"})
+    assert trie.scope_for(["packages/api/a.py", "packages/api/tests/test_a.py"]) == "api"
+    assert trie.scope_for(["packages/web/src/App.tsx"]) == "frontend"
+    assert trie.scope_for(["docs/guide.md"]) == "docs"
+    assert trie.scope_for(["packages/api/a.py", "packages/web/b.ts"]) is None
+    assert trie.scope_for(["packages/api/a.py", "pyproject.toml"]) is None
+    assert trie.scope_for([]) is None
+    assert ScopeTrie.build(["pyproject.toml"]).scope_for(["src/a.py"]) is None
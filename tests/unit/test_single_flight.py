@@ -0,0 +1,89 @@
+"""
+Unit Tests для объединения одновременных вычислений
+"""
+
+import asyncio
+
+import pytest
+
+from mcp_get_text_commit.single_flight import SingleFlight
+
+
+class Computation:
+    """Вычисление, которое завершается только по release()"""
+
+    def __init__(self, result="done"):
+        self.result = result
+        self.calls = 0
+        self.cancelled = 0
+        self.released = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.released.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_concurrent_calls_share_result():
+    """Тест: одновременные вызовы с одним ключом выполняют вычисление один раз"""
+    flights = SingleFlight()
+    computation = Computation()
+    waiters = [asyncio.ensure_future(flights.run("repo", computation)) for _ in range(3)]
+    other_computation = Computation("other")
+    other = asyncio.ensure_future(flights.run("other", other_computation))
+    await asyncio.sleep(0)
+    assert len(flights) == 2
+
+    computation.released.set()
+    assert await asyncio.gather(*waiters) == ["done"] * 3
+    assert (computation.calls, flights.started, flights.joined) == (1, 2, 2)
+    assert len(flights) == 1
+    other_computation.released.set()
+    assert await other == "other"
+
+
+async def test_cancelled_waiter_keeps_shared_work():
+    """Тест: отмена одного ожидающего не прерывает вычисление для остальных; последний отменяет его"""
+    flights = SingleFlight()
+    computation = Computation()
+    first = asyncio.ensure_future(flights.run("repo", computation))
+    second = asyncio.ensure_future(flights.run("repo", computation))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    assert first.cancelled() and computation.cancelled == 0
+    computation.released.set()
+    assert await second == "done"
+
+    abandoned = Computation()
+    waiter = asyncio.ensure_future(flights.run("repo", abandoned))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await asyncio.sleep(0)
+    assert abandoned.cancelled == 1 and len(flights) == 0
+
+    # Следующий вызов начинает новое вычисление
+    fresh = Computation("again")
+    fresh.released.set()
+    assert await flights.run("repo", fresh) == "again"
+
+
+async def test_error_delivered_to_all_waiters():
+    """Тест: ошибку вычисления получают все ожидающие"""
+    flights = SingleFlight()
+    computation = Computation(ValueError("bad revision"))
+    waiters = [asyncio.ensure_future(flights.run("repo", computation)) for _ in range(2)]
+    await asyncio.sleep(0)
+    computation.released.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert [str(result) for result in results] == ["bad revision"] * 2
+    assert computation.calls == 1 and len(flights) == 0